@@ -0,0 +1,152 @@
+"""
+Broadcast throughput against a fake Bot API server.
+
+The fake server answers copyMessage after a random 50-250 ms delay and
+enforces Telegram's global flood limit (30 req/s over a sliding second),
+replying 429 + retry_after when it is exceeded — like the real API.
+
+    python benchmarks/broadcast_bench.py --users 600
+
+tests/test_benchmarks.py runs it with a handful of users so API changes
+cannot break it unnoticed.
+
+Compares the old batch-of-100 gather loop (semaphore + fixed 0.2 s sleep per
+send) with BroadcastEngine (worker pool + shared token bucket).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("ADMINS_ID", "1")
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from src.utils.broadcast import BroadcastEngine
+from src.utils.outbound import OutboundScheduler
+
+API_LIMIT = 30  # req/s
+
+
+class FakeBotAPI:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.window = deque()
+        self.accepted = 0
+        self.flooded = 0
+        self.blocked_until = 0.0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1:
+            self.window.popleft()
+        if now < self.blocked_until or len(self.window) >= self.limit:
+            self.flooded += 1
+            self.blocked_until = max(self.blocked_until, now + 1)
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+        self.window.append(now)
+        self.accepted += 1
+        await asyncio.sleep(random.uniform(0.05, 0.25))  # processing latency
+        return web.json_response({"ok": True, "result": {"message_id": self.accepted}})
+
+    async def start(self) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return runner
+
+
+def make_bot(port: int, scheduler: OutboundScheduler = None) -> Bot:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    if scheduler:
+        session.middleware(scheduler)
+    return Bot("42:BENCHMARK", session=session)
+
+
+async def recipients(n: int):
+    for user_id in range(1, n + 1):
+        yield user_id
+
+
+async def legacy(bot: Bot, users: int):
+    """The pre-engine algorithm: gather batches of 100, semaphore(20), 0.2 s sleep per send."""
+    semaphore = asyncio.Semaphore(20)
+    ok = 0
+
+    async def send(user_id: int):
+        async with semaphore:
+            for attempt in range(5):
+                try:
+                    await bot.copy_message(chat_id=user_id, from_chat_id=1, message_id=1)
+                    await asyncio.sleep(0.2)
+                    return True
+                except Exception as e:
+                    await asyncio.sleep(getattr(e, "retry_after", 1) + 2 ** attempt)
+            return False
+
+    ids = list(range(1, users + 1))
+    for i in range(0, users, 100):
+        results = await asyncio.gather(*(send(uid) for uid in ids[i:i + 100]))
+        ok += sum(1 for r in results if r)
+        await asyncio.sleep(0.1)
+    return ok
+
+
+async def engine(bot: Bot, users: int, rate: float, workers: int, scheduler: OutboundScheduler):
+    async def send(user_id: int):
+        await bot.copy_message(chat_id=user_id, from_chat_id=1, message_id=1)
+        return True
+
+    # Bucket shu o'lchovning scheduleriga ulanadi: RetryAfter engine ni ham to'xtatadi
+    stats = await BroadcastEngine(rate, workers, scheduler).run(bot, recipients(users), send)
+    return stats.success
+
+
+async def run(name: str, coro_factory, users: int, scheduler: OutboundScheduler = None):
+    server = FakeBotAPI(API_LIMIT)
+    runner = await server.start()
+    bot = make_bot(server.port, scheduler)
+    started = time.perf_counter()
+    try:
+        ok = await coro_factory(bot)
+    finally:
+        elapsed = time.perf_counter() - started
+        await bot.session.close()
+        await runner.cleanup()
+    print(f"{name:<8} sent={ok:<6} elapsed={elapsed:6.1f}s  throughput={ok / elapsed:5.1f} msg/s  "
+          f"429s={server.flooded}  ({ok / elapsed / API_LIMIT:.0%} of API limit)")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=28)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not args.skip_legacy:
+        await run("legacy", lambda bot: legacy(bot, args.users), args.users)
+    scheduler = OutboundScheduler(global_rate=API_LIMIT, chat_rate=1, chat_burst=5, group_rate=20 / 60,
+                                  edit_interval=1.5)
+    await run("engine", lambda bot: engine(bot, args.users, args.rate, args.workers, scheduler), args.users, scheduler)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+Carousel delivery time against a fake Bot API server.
+
+Downloads are simulated (``--download`` seconds per item, MEDIA_PARALLELISM
+at a time, files reported as they finish). The fake server charges
+``--upload`` seconds per file attached to a request and a flat 0.1 s for
+requests that only reference file_ids, like an album built from uploads to
+the storage chat.
+
+    python benchmarks/carousel_bench.py --items 10
+
+Compares downloading everything and then sending one album (the old path)
+with CarouselUploader, once with the storage chat on a bucket the size of the
+plain group one (capacity 5: the uploader gives up and sends directly) and
+once with its own TG_STORAGE_BURST bucket.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("ADMINS_ID", "1")
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from src.utils.downloader import CarouselUploader, send_media_files
+from src.utils.native_extractor import MEDIA_PARALLELISM
+from src.utils.outbound import outbound
+
+STORAGE_CHAT = -1001
+USER_CHAT = 7
+
+
+class FakeBotAPI:
+    def __init__(self, upload_seconds: float):
+        self.upload_seconds = upload_seconds
+        self.message_id = 0
+
+    def _message(self, chat_id: int) -> dict:
+        self.message_id += 1
+        return {
+            "message_id": self.message_id, "date": 0, "chat": {"id": chat_id, "type": "private"},
+            "photo": [{"file_id": f"f{self.message_id}", "file_unique_id": f"u{self.message_id}",
+                       "width": 1, "height": 1}],
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        uploads = sum(1 for value in form.values() if isinstance(value, web.FileField))
+        await asyncio.sleep(uploads * self.upload_seconds if uploads else 0.1)
+        chat_id = int(form["chat_id"])
+        if request.match_info["method"] == "sendMediaGroup":
+            result = [self._message(chat_id) for _ in json.loads(form["media"])]
+        else:
+            result = self._message(chat_id)
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self) -> web.AppRunner:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return runner
+
+
+async def fake_download(directory: Path, items: int, seconds: float, on_file=None):
+    semaphore = asyncio.Semaphore(MEDIA_PARALLELISM)
+
+    async def fetch(index: int) -> Path:
+        async with semaphore:
+            await asyncio.sleep(seconds)
+        path = directory / f"item_{index:02d}.jpg"
+        path.write_bytes(os.urandom(64 * 1024))
+        if on_file:
+            on_file(path)
+        return path
+
+    return list(await asyncio.gather(*(fetch(index) for index in range(items))))
+
+
+async def sequential(bot: Bot, directory: Path, args) -> int:
+    files = await fake_download(directory, args.items, args.download)
+    file_ids, _ = await send_media_files(bot, USER_CHAT, files, "title", "", "@bench")
+    return len(file_ids)
+
+
+async def pipelined(bot: Bot, directory: Path, args) -> int:
+    uploader = CarouselUploader(bot, STORAGE_CHAT)
+    try:
+        files = await fake_download(directory, args.items, args.download, uploader.submit)
+        file_ids, _ = await uploader.send(USER_CHAT, files, "title", "", "@bench")
+    finally:
+        await uploader.close()
+    return len(file_ids)
+
+
+async def run(name: str, algorithm, args, storage_burst: float):
+    server = FakeBotAPI(args.upload)
+    runner = await server.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{server.port}"))
+    session.middleware(outbound)
+    bot = Bot("42:BENCHMARK", session=session)
+    # Har bir o'lchov toza bucketlar bilan
+    outbound._chat_buckets.clear()
+    outbound._storage_chats.clear()
+    outbound.storage_burst = storage_burst
+    outbound.add_storage_chats(bot, [STORAGE_CHAT])
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        try:
+            sent = await algorithm(bot, Path(directory), args)
+        finally:
+            elapsed = time.perf_counter() - started
+            await bot.session.close()
+            await runner.cleanup()
+    print(f"{name:<20} items={sent:<3} elapsed={elapsed:5.2f}s")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--download", type=float, default=0.5, help="seconds per item")
+    parser.add_argument("--upload", type=float, default=0.3, help="seconds per uploaded file")
+    args = parser.parse_args(argv)
+
+    await run("sequential", sequential, args, storage_burst=20)
+    await run("pipelined, burst 5", pipelined, args, storage_burst=max(1.0, outbound.group_rate * 60 / 4))
+    await run("pipelined, storage", pipelined, args, storage_burst=20)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Cache-lookup and registration latency: SQLite (WAL) vs Postgres.
+
+    python benchmarks/db_bench.py --rows 20000
+    python benchmarks/db_bench.py --postgres      # DB_* sozlamalari .env / muhitdan
+
+Each backend gets the same workload through the real repositories:
+
+* lookup   — DownloadRepo.get for random cached URLs, ``--concurrency`` at once
+             (the hot path of every download request);
+* register — AccountRepo.register_many batches of ``--batch`` new users
+             (what AccountWriteBehind flushes).
+
+The Postgres run writes into the configured database; use a scratch one.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("ADMINS_ID", "1")
+
+import config
+from src.db import init_db, repository
+from src.db.database import Database
+from src.db.repository import AccountRepo, DownloadRepo
+from src.db.sqlite import SQLiteDatabase
+
+URL_PREFIX = "https://www.instagram.com/reel/bench-"
+# Boshqa jarayonlar bilan to'qnashmasligi uchun katta user_id lar
+USER_ID_BASE = 9_000_000_000
+TENANT = "bench"
+
+
+def use(database):
+    # Repozitoriylar modul darajasidagi `database` ga murojaat qiladi
+    repository.database = database
+    init_db.database = database
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return f"p50={pick(0.5):6.2f}ms  p95={pick(0.95):6.2f}ms  p99={pick(0.99):6.2f}ms  " \
+           f"mean={statistics.mean(samples) * 1000:6.2f}ms"
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def seed(rows: int):
+    now, today = datetime.now(), date.today()
+    for i in range(rows):
+        await DownloadRepo.upsert(TENANT, USER_ID_BASE, f"{URL_PREFIX}{i}", "bench", '["file"]', '["video"]', now, today)
+
+
+async def bench_lookup(rows: int, lookups: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await timed(DownloadRepo.get(TENANT, f"{URL_PREFIX}{random.randrange(rows)}"))
+
+    started = time.perf_counter()
+    samples = await asyncio.gather(*(one() for _ in range(lookups)))
+    return samples, lookups / (time.perf_counter() - started)
+
+
+async def bench_register(batches: int, batch: int, offset: int):
+    today = date.today()
+    samples = []
+    for b in range(batches):
+        first = USER_ID_BASE + offset + b * batch
+        rows = [(TENANT, user_id, "uz", today) for user_id in range(first, first + batch)]
+        samples.append(await timed(AccountRepo.register_many(rows)))
+    return samples
+
+
+async def run(name: str, database, args):
+    use(database)
+    await database.connect()
+    try:
+        await init_db.create_all_base()
+        started = time.perf_counter()
+        await seed(args.rows)
+        print(f"{name:<8} seeded {args.rows} downloads in {time.perf_counter() - started:.1f}s")
+        samples, rate = await bench_lookup(args.rows, args.lookups, args.concurrency)
+        print(f"{name:<8} lookup    {percentiles(samples)}  ({rate:,.0f} lookups/s)")
+        samples = await bench_register(args.batches, args.batch, offset=random.randrange(10 ** 8) * args.batch)
+        print(f"{name:<8} register  {percentiles(samples)}  ({args.batch} users/batch)")
+    finally:
+        await database.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--synchronous", default=config.SQLITE_SYNCHRONOUS)
+    parser.add_argument("--postgres", action="store_true", help="Postgres bilan ham solishtirish")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteDatabase(os.path.join(tmp, "bench.db"), args.synchronous, config.SQLITE_READERS)
+        await run("sqlite", sqlite, args)
+    if args.postgres:
+        postgres = Database(
+            min_size=config.DB_POOL_MIN_SIZE, max_size=config.DB_POOL_MAX_SIZE,
+            statement_timeout=config.DB_STATEMENT_TIMEOUT, command_timeout=config.DB_COMMAND_TIMEOUT,
+            database=config.DB_NAME, user=config.DB_USER, password=config.DB_PASSWORD,
+            host=config.DB_HOST, port=config.DB_PORT,
+        )
+        await run("postgres", postgres, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
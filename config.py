@@ -1,40 +1,97 @@
 import os
 
-import psycopg2
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
 
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
-dbtype = bool(os.getenv("DBTYPE"))
-DB_TYPE = "sqlite" if dbtype else "postgres"
+# postgres | sqlite. Eski DBTYPE (har qanday qiymatda SQLite ni tanlardi) endi qabul qilinmaydi
+DB_TYPE = os.getenv("DB_TYPE", "postgres").strip().lower()
+if DB_TYPE not in ("postgres", "sqlite"):
+    raise ValueError(f"DB_TYPE must be 'postgres' or 'sqlite', got {DB_TYPE!r}")
+if os.getenv("DBTYPE") is not None:
+    raise ValueError("DBTYPE is no longer supported, set DB_TYPE=sqlite or DB_TYPE=postgres")
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 
-DB_CONFIG = {
-    "dbname": DB_NAME,
-    "user": DB_USER,
-    "password": DB_PASSWORD,
-    "host": DB_HOST,
-    "port": DB_PORT
-}
-db = psycopg2.connect(
-    database=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
-db.autocommit = True
-sql = db.cursor()
+# asyncpg pool (src/db/database.py)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 5000))  # ms, server tomonda
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 10))  # sekund, klient tomonda
 
-ADMIN_ID = ADMINS = [int(admin_id) for admin_id in os.getenv("ADMINS_ID").split(",")]
+# SQLite (DB_TYPE=sqlite, src/db/sqlite.py)
+SQLITE_PATH = os.getenv("SQLITE_PATH", "my_reels.db")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", 4))
 
+# Yangi foydalanuvchilarni batch bilan yozish (src/db/write_behind.py)
+ACCOUNT_FLUSH_INTERVAL_MS = int(os.getenv("ACCOUNT_FLUSH_INTERVAL_MS", 500))
+ACCOUNT_FLUSH_MAX_ROWS = int(os.getenv("ACCOUNT_FLUSH_MAX_ROWS", 1000))
 
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(link_preview_is_disabled=True))
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+ADMIN_ID = ADMINS = [int(admin_id) for admin_id in os.getenv("ADMINS_ID", "").split(",") if admin_id.strip()]
+
+# Bir jarayonda bir nechta bot (src/utils/tenants.py). Bo'sh bo'lsa: BOT_TOKEN va ADMINS_ID dagi bitta 'main' bot
+TENANTS_FILE = os.getenv("TENANTS_FILE")  # tenants.example.json ga qarang
+BOT_SIGNATURE = os.getenv("BOT_SIGNATURE", "@my_reels_robot")  # yuborilgan media izohidagi imzo
+# Karusel elementlari yuklanayotganda shu yopiq kanal(lar)ga yuklanadi, keyin albom file_id bilan yig'iladi.
+# Bot kanal admini bo'lishi kerak; kanalga daqiqasiga ~20 xabar, shuning uchun bir nechtasini berish mumkin
+STORAGE_CHAT_IDS = [int(chat_id) for chat_id in os.getenv("STORAGE_CHAT_IDS", "").split(",") if chat_id.strip()]
+
+# FSM holatlari (src/db/fsm_storage.py): db | redis | memory. memory faqat bitta jarayon uchun
+FSM_STORAGE = os.getenv("FSM_STORAGE", "db")
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", 86400))  # sekund: tashlab ketilgan holatlar o'chadi
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Ishga tushirish rejimi: polling (bitta jarayon) yoki webhook (src/utils/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")  # https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # bo'sh bo'lsa har ishga tushishda yangisi yaratiladi
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+# Fon ishlari (broadcast, yuklashlar) faqat 0-workerda; Telegram limiti workerlar orasida bo'linadi (SENDING_PROCESSES)
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", os.cpu_count() or 1))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 100))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 30))  # sekund, to'xtashda
+
+# Yuklab olish navbati (src/utils/download_jobs.py). Alohida tugunlarda: python worker.py
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", 2))  # bitta jarayonda parallel yuklashlar
+DOWNLOAD_IN_BOT = os.getenv("DOWNLOAD_IN_BOT", "1") == "1"  # 0: bot faqat navbatga qo'shadi
+DOWNLOAD_NODES = int(os.getenv("DOWNLOAD_NODES", 0))  # worker.py jarayonlari soni, hamma tugunlarda jami
+# Yuklangan fayllar boshqa tenant botlar uchun shuncha sekund saqlanadi (src/utils/media_store.py)
+SHARED_MEDIA_TTL = float(os.getenv("SHARED_MEDIA_TTL", 300))
+
+# O'z HTTP yuklovchimiz (src/utils/native_extractor.py): ochiq post/reel lar tashqi dasturlarsiz olinadi
+NATIVE_EXTRACTOR = os.getenv("NATIVE_EXTRACTOR", "1") == "1"
+INSTAGRAM_BASE_URL = os.getenv("INSTAGRAM_BASE_URL", "https://www.instagram.com")  # sinovda: lokal fixture server
+INSTA_GRAPHQL_DOC_ID = os.getenv("INSTA_GRAPHQL_DOC_ID", "")  # bo'sh bo'lsa faqat embed sahifasi ishlatiladi
 
 INSTA_USERNAME = os.getenv("INSTA_USERNAME")
-INSTA_PASSWORD = os.getenv("INSTA_PASSWORD")
\ No newline at end of file
+INSTA_PASSWORD = os.getenv("INSTA_PASSWORD")
+
+# Telegram outbound limits (https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this)
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", 30))  # xabar / sekund, butun bot bo'yicha
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", 1))  # xabar / sekund, bitta shaxsiy chatga
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", 5))
+TG_GROUP_RATE = float(os.getenv("TG_GROUP_RATE", 20 / 60))  # guruhga daqiqasiga 20 ta
+# STORAGE_CHAT_IDS kanallari uchun zaxira: bitta karusel (20 tagacha element) daqiqalik limit ichida kutmasdan ketadi
+TG_STORAGE_BURST = float(os.getenv("TG_STORAGE_BURST", 20))
+TG_STATUS_EDIT_INTERVAL = float(os.getenv("TG_STATUS_EDIT_INTERVAL", 1.5))
+
+# Bitta token bilan bir vaqtda yuboradigan jarayonlar: TG_GLOBAL_RATE va BROADCAST_RATE ular orasida teng bo'linadi.
+# Hamma tugunda bir xil bo'lishi kerak, shuning uchun DOWNLOAD_NODES > 0 bo'lsa WEBHOOK_WORKERS ni ham aniq yozing
+SENDING_PROCESSES = (WEBHOOK_WORKERS if BOT_MODE == "webhook" else 1) + DOWNLOAD_NODES
+
+# Broadcast: global limitdan biroz pastda, oddiy foydalanuvchilarga ham joy qolsin
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", 28))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", 32))
+# Sinov (canary): standart namuna hajmi
+CANARY_SAMPLE_SIZE = int(os.getenv("CANARY_SAMPLE_SIZE", 200))
+
+# Majburiy kanal a'zoligi keshi (src/utils/membership.py), sekund
+MEMBERSHIP_TTL = int(os.getenv("MEMBERSHIP_TTL", 3600))  # a'zo: chat_member update lar yangilab turadi
+MEMBERSHIP_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_NEGATIVE_TTL", 60))  # a'zo emas
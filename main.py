@@ -1,9 +1,18 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
+import os
+import secrets
+from aiogram import Dispatcher
+from aiohttp import web
 
-from config import BOT_TOKEN, dp, bot
+from config import (
+    BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_WORKERS, DOWNLOAD_CONCURRENCY, DOWNLOAD_IN_BOT,
+)
+from src.db.database import database
+from src.db.fsm_storage import build_storage
 from src.db.init_db import create_all_base
+from src.db.write_behind import account_buffer
 from src.handlers.admins.add_admin import add_router
 from src.handlers.admins.admin import admin_router
 from src.handlers.admins.messages import msg_router
@@ -11,18 +20,54 @@ from src.handlers.others.channels import channel_router
 from src.handlers.others.groups import group_router
 from src.handlers.others.other import other_router
 from src.handlers.users.users import user_router
-from src.middlewares.middleware import RegisterUserMiddleware
+from src.middlewares.middleware import RegisterUserMiddleware, TenantMiddleware
+from src.utils.broadcast_jobs import broadcast_runner
+from src.utils.download_jobs import download_worker
+from src.utils.invalidation import invalidation_bus
+from src.utils.outbound import outbound
+from src.utils.tenants import tenants
+from src.utils.webhook import build_app, register_webhook, serve, webhook_path
 
+# Holatlar umumiy omborda: bir nechta bot jarayoni yonma-yon ishlashi mumkin
+dp = Dispatcher(storage=build_storage())
 
-async def on_startup() -> None:
+
+async def on_startup(run_jobs: bool = True) -> None:
+    await database.connect()
     await create_all_base()
+    # Yuklash paytida boshqa nodelarda bo'lgan o'zgarishlar keyin jurnaldan qo'llanadi
+    await invalidation_bus.load_baseline()
+    await tenants.load()
+    await invalidation_bus.start()
+    account_buffer.start()
+    # Webhook rejimida faqat bitta worker: aks holda har biri o'z broadcast va yuklash navbatini yuritadi
+    if not run_jobs:
+        return
+    broadcast_runner.start()
+    if DOWNLOAD_IN_BOT:
+        await download_worker.start(DOWNLOAD_CONCURRENCY)
 
 
-async def main():
-    await on_startup()
+async def on_shutdown() -> None:
+    await broadcast_runner.stop()
+    await download_worker.stop()
+    await outbound.close()
+    await account_buffer.stop()
+    await invalidation_bus.stop()
+    await database.close()
+
+
+def setup() -> None:
     logging.basicConfig(level=logging.INFO)
 
+    # Bitta scheduler hamma botlar uchun: limitlar bot.id bo'yicha alohida hisoblanadi
+    for bot in tenants.bots():
+        bot.session.middleware(outbound)
+    # Har bir update qaysi tenant botga kelganini handlerlar `tenant` argumentida oladi
+    dp.update.outer_middleware(TenantMiddleware())
     dp.update.middleware(RegisterUserMiddleware())
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     #for admin
     dp.include_router(admin_router)
@@ -37,8 +82,48 @@ async def main():
     dp.include_router(channel_router)
     dp.include_router(other_router)
 
-    await dp.start_polling(bot)
+
+async def main():
+    setup()
+    # Avval webhook rejimida ishlagan bo'lsa, getUpdates ishlashi uchun
+    for bot in tenants.bots():
+        await bot.delete_webhook()
+    # chat_member update lari faqat so'ralganda keladi (a'zolik keshi uchun)
+    await dp.start_polling(*tenants.bots(), allowed_updates=dp.resolve_used_update_types())
+
+
+def webhook_worker(index: int) -> None:
+    """
+    One webhook process (started by ``serve`` in a fresh interpreter).
+
+    Only worker 0 runs the broadcast runner and the download worker; the
+    others enqueue jobs and the NOTIFY / poll picks them up there.
+    """
+    setup()
+    dp["run_jobs"] = index == 0
+    web.run_app(build_app(dp, {tenant.name: tenant.bot for tenant in tenants}, WEBHOOK_SECRET), host=WEBHOOK_HOST, port=WEBHOOK_PORT, reuse_port=True,
+                print=None)
+
+
+def run_webhook() -> None:
+    setup()
+    # Hamma worker bir xil maxfiy kalitni muhitdan oladi
+    secret = os.environ.setdefault("WEBHOOK_SECRET", WEBHOOK_SECRET or secrets.token_urlsafe(32))
+
+    async def register():
+        try:
+            for tenant in tenants:
+                await register_webhook(tenant.bot, WEBHOOK_BASE_URL.rstrip("/") + webhook_path(tenant.name), secret,
+                                       dp.resolve_used_update_types())
+        finally:
+            await tenants.close()
+
+    asyncio.run(register())
+    serve(webhook_worker, WEBHOOK_WORKERS)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
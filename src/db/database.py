@@ -0,0 +1,98 @@
+import logging
+from typing import Any, Callable, List, Optional
+
+import asyncpg
+
+from config import (
+    DB_TYPE, DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_STATEMENT_TIMEOUT, DB_COMMAND_TIMEOUT,
+    SQLITE_PATH, SQLITE_SYNCHRONOUS, SQLITE_READERS,
+)
+
+log = logging.getLogger("database")
+
+
+class Database:
+    """
+    Thin wrapper around an asyncpg connection pool.
+
+    Handlers never touch the pool directly; they go through the repositories
+    in ``src.db.repository``. The pool is opened in ``on_startup`` and closed
+    in ``on_shutdown``.
+    """
+
+    dialect = "postgres"
+
+    def __init__(self, min_size: int, max_size: int, statement_timeout: int, command_timeout: float, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_timeout = statement_timeout
+        self.command_timeout = command_timeout
+        self.connect_kwargs = connect_kwargs
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def connect(self):
+        if self.pool:
+            return
+        self.pool = await asyncpg.create_pool(
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=self.command_timeout,
+            server_settings={"statement_timeout": str(self.statement_timeout)},  # ms
+            **self.connect_kwargs,
+        )
+        log.info(f"Database pool opened (min={self.min_size}, max={self.max_size})")
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    def acquire(self):
+        """
+        ``async with database.acquire() as conn`` — Postgres only (migrations, advisory locks).
+        Code that runs on both backends uses the query methods below; SQLite has ``transaction(fn)``.
+        """
+        return self.pool.acquire()
+
+    async def execute(self, query: str, *args) -> str:
+        return await self.pool.execute(query, *args)
+
+    async def executemany(self, query: str, args: List[tuple]):
+        return await self.pool.executemany(query, args)
+
+    async def fetch(self, query: str, *args) -> List[asyncpg.Record]:
+        return await self.pool.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args) -> Optional[asyncpg.Record]:
+        return await self.pool.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args) -> Any:
+        return await self.pool.fetchval(query, *args)
+
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> asyncpg.Connection:
+        """
+        Open a dedicated connection (outside the pool) that calls ``callback(payload)``
+        for every NOTIFY on `channel`. The caller closes it.
+        """
+        conn = await asyncpg.connect(**self.connect_kwargs)
+        await conn.add_listener(channel, lambda _conn, _pid, _channel, payload: callback(payload))
+        return conn
+
+
+if DB_TYPE == "sqlite":
+    from src.db.sqlite import SQLiteDatabase
+
+    database = SQLiteDatabase(SQLITE_PATH, SQLITE_SYNCHRONOUS, SQLITE_READERS)
+else:
+    database = Database(
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_timeout=DB_STATEMENT_TIMEOUT,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+    )
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import FSM_STORAGE, FSM_STATE_TTL, REDIS_URL
+from src.db.repository import FsmRepo
+from src.utils.metrics import metrics
+
+log = logging.getLogger("fsm-storage")
+
+PURGE_INTERVAL = 600  # sekund
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    FSM storage in public.fsm_states, shared by every bot process using the same database.
+
+    Each write pushes ``expires_at`` ``ttl`` seconds ahead; reads ignore expired
+    rows, so an admin who abandons a flow (channel add, broadcast) simply finds
+    no state next time. Expired and cleared rows are deleted in the background
+    at most once per ``PURGE_INTERVAL``.
+    """
+
+    def __init__(self, ttl: int, key_builder: Optional[KeyBuilder] = None):
+        self.ttl = ttl
+        # bot_id kalitda: bir bazani bir nechta bot ishlatsa ham holatlar aralashmaydi
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._last_purge = time.monotonic()
+        self._purge_task: Optional[asyncio.Task] = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await FsmRepo.set_state(
+            self.key_builder.build(key), state.state if isinstance(state, State) else state, self.ttl)
+        self._maybe_purge()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await FsmRepo.get(self.key_builder.build(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await FsmRepo.set_data(self.key_builder.build(key), json.dumps(data), self.ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await FsmRepo.get(self.key_builder.build(key))
+        return json.loads(row[1]) if row else {}
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL or self._purge_task:
+            return
+        self._last_purge = time.monotonic()
+        self._purge_task = asyncio.create_task(self._purge())
+
+    async def _purge(self):
+        try:
+            deleted = await FsmRepo.purge()
+            metrics.counter("fsm.purged").inc(deleted)
+        except Exception as e:
+            log.error(f"FSM purge failed: {e}")
+        finally:
+            self._purge_task = None
+
+    async def close(self) -> None:
+        # Baza ulanishi on_shutdown da yopiladi
+        if self._purge_task:
+            await self._purge_task
+
+
+def build_storage() -> BaseStorage:
+    """FSM storage selected by ``FSM_STORAGE``: db (default), redis or memory (single process only)."""
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    if FSM_STORAGE == "redis":
+        # Ixtiyoriy bog'liqlik: pip install redis. Redis protokolini tushunadigan har qanday server bo'ladi
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(
+            REDIS_URL, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=FSM_STATE_TTL, data_ttl=FSM_STATE_TTL)
+    if FSM_STORAGE != "db":
+        raise ValueError(f"Unknown FSM_STORAGE: {FSM_STORAGE!r} (db, redis or memory)")
+    return DatabaseStorage(FSM_STATE_TTL)
@@ -1,47 +1,153 @@
-from aiogram import types
-from config import db, sql
+from src.db.database import database
+from src.db.migrations import migrate
 
-
-async def create_all_base():
-    sql.execute("""CREATE TABLE IF NOT EXISTS public.accounts
+# SQLite uchun yakuniy sxema (Postgres migratsiyalarining natijasi bilan bir xil ustunlar).
+# Yangi bazada bir marta yaratiladi; JSON / TIMESTAMPTZ tiplari src/db/sqlite.py dagi konverterlar uchun.
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS accounts
     (
-        id SERIAL NOT NULL,
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant TEXT NOT NULL DEFAULT 'main',
         user_id BIGINT NOT NULL,
-        lang_code CHARACTER VARYING(10),
-        date TIMESTAMP DEFAULT now(),
-        CONSTRAINT accounts_pkey PRIMARY KEY (id)
-    )""")
-    db.commit()
-
-    sql.execute("""CREATE TABLE IF NOT EXISTS public.mandatorys
-    (
-        id SERIAL NOT NULL,
-        chat_id bigint NOT NULL,
-        title character varying,
-        username character varying,
-        types character varying,
-        CONSTRAINT channels_pkey PRIMARY KEY (id)
-    )""")
-    db.commit()
-
-    sql.execute("""CREATE TABLE IF NOT EXISTS public.admins
+        lang_code VARCHAR(10),
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        blocked_at TIMESTAMPTZ,
+        last_active_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (tenant, user_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS accounts_tenant_reachable_idx ON accounts (tenant, id) WHERE blocked_at IS NULL",
+    """CREATE INDEX IF NOT EXISTS accounts_tenant_blocked_idx
+    ON accounts (tenant, user_id) WHERE blocked_at IS NOT NULL""",
+    """CREATE INDEX IF NOT EXISTS accounts_tenant_lang_id_idx
+    ON accounts (tenant, lang_code, id) WHERE blocked_at IS NULL""",
+    "CREATE INDEX IF NOT EXISTS accounts_last_active_idx ON accounts (last_active_at) WHERE blocked_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS accounts_date_idx ON accounts (date)",
+    """CREATE TABLE IF NOT EXISTS mandatorys
+    (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant TEXT NOT NULL DEFAULT 'main',
+        chat_id BIGINT NOT NULL,
+        title VARCHAR,
+        username VARCHAR,
+        types VARCHAR,
+        invite_link TEXT,
+        UNIQUE (tenant, chat_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS admins
     (
-        id SERIAL NOT NULL,
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant TEXT NOT NULL DEFAULT 'main',
         user_id BIGINT NOT NULL,
-        date TIMESTAMP DEFAULT now(),
-        CONSTRAINT admins_pkey PRIMARY KEY (id)
-    )""")
-    db.commit()
-
-    sql.execute("""CREATE TABLE IF NOT EXISTS public.downloads
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (tenant, user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS downloads
     (
-        id SERIAL NOT NULL,
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant TEXT NOT NULL DEFAULT 'main',
         user_id BIGINT NOT NULL,
-        url TEXT UNIQUE NOT NULL,
+        url TEXT NOT NULL,
         title TEXT,
         file_id TEXT,
-        media_type TEXT,  -- Added for distinguishing video/photo
-        date TIMESTAMP DEFAULT now(),
-        CONSTRAINT downloads_pkey PRIMARY KEY (id)
-    )""")
-    db.commit()
\ No newline at end of file
+        media_type TEXT,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (tenant, url)
+    )""",
+    "CREATE INDEX IF NOT EXISTS downloads_user_id_idx ON downloads (user_id)",
+    "CREATE INDEX IF NOT EXISTS downloads_date_idx ON downloads (date)",
+    """CREATE TABLE IF NOT EXISTS stats_daily
+    (
+        tenant TEXT NOT NULL DEFAULT 'main',
+        day DATE NOT NULL,
+        lang_code VARCHAR(10) NOT NULL,
+        signups INTEGER NOT NULL DEFAULT 0,
+        downloads INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (tenant, day, lang_code)
+    )""",
+    """CREATE TABLE IF NOT EXISTS broadcast_jobs
+    (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind VARCHAR(10) NOT NULL,
+        from_chat_id BIGINT NOT NULL,
+        message_ids JSON NOT NULL,
+        status VARCHAR(12) NOT NULL DEFAULT 'scheduled',
+        scheduled_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        lease_until TIMESTAMPTZ,
+        created_by BIGINT NOT NULL,
+        status_chat_id BIGINT,
+        status_message_id BIGINT,
+        last_account_id INTEGER NOT NULL DEFAULT 0,
+        done_ahead JSON NOT NULL DEFAULT '[]',
+        total INTEGER NOT NULL DEFAULT 0,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        segment TEXT NOT NULL DEFAULT '{}',
+        tenant TEXT NOT NULL DEFAULT 'main'
+    )""",
+    "CREATE INDEX IF NOT EXISTS broadcast_jobs_status_idx ON broadcast_jobs (status, scheduled_at)",
+    """CREATE TABLE IF NOT EXISTS broadcast_failures
+    (
+        job_id INTEGER NOT NULL REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+        account_id INTEGER NOT NULL,
+        user_id BIGINT NOT NULL,
+        error TEXT,
+        PRIMARY KEY (job_id, account_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS fsm_states
+    (
+        key TEXT PRIMARY KEY,
+        state TEXT,
+        data TEXT NOT NULL DEFAULT '{}',
+        expires_at TIMESTAMPTZ NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS fsm_states_expires_idx ON fsm_states (expires_at)",
+    """CREATE TABLE IF NOT EXISTS download_jobs
+    (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id BIGINT NOT NULL,
+        chat_id BIGINT NOT NULL,
+        url TEXT NOT NULL,
+        status_message_id BIGINT,
+        status VARCHAR(10) NOT NULL DEFAULT 'queued',
+        worker TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_until TIMESTAMPTZ,
+        error TEXT,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        tenant TEXT NOT NULL DEFAULT 'main'
+    )""",
+    "CREATE INDEX IF NOT EXISTS download_jobs_pending_idx ON download_jobs (id) WHERE status IN ('queued', 'running')",
+    """CREATE INDEX IF NOT EXISTS download_jobs_finished_idx
+    ON download_jobs (finished_at) WHERE status IN ('done', 'failed')""",
+    """CREATE TABLE IF NOT EXISTS cache_events
+    (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        key TEXT,
+        origin TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS cache_events_created_idx ON cache_events (created_at)",
+    """CREATE TABLE IF NOT EXISTS broadcast_drafts
+    (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant TEXT NOT NULL,
+        chat_id BIGINT NOT NULL,
+        message_id BIGINT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS broadcast_drafts_chat_idx ON broadcast_drafts (tenant, chat_id, id)",
+]
+
+
+async def create_all_base():
+    if database.dialect == "sqlite":
+        await database.transaction(lambda conn: [conn.execute(statement) for statement in SQLITE_SCHEMA])
+        return
+    # Jadvallar va indekslar versiyalangan migratsiyalar orqali yaratiladi (src/db/migrations.py)
+    await migrate()
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+from typing import List, NamedTuple
+
+from src.db.database import database
+
+log = logging.getLogger("migrations")
+
+# Bir nechta jarayon bir vaqtda ishga tushsa, migratsiyani faqat bittasi bajaradi
+MIGRATION_LOCK_ID = 0x6D795F7265656C73  # "my_reels"
+# Katta jadvallarda indeks qurish / backfill odatiy command_timeout dan uzoq davom etadi
+MIGRATION_TIMEOUT = 3600
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: List[str]
+    # CREATE INDEX CONCURRENTLY tranzaksiya ichida ishlamaydi
+    transactional: bool = True
+
+
+MIGRATIONS = [
+    Migration(1, "base tables", [
+        """CREATE TABLE IF NOT EXISTS public.accounts
+        (
+            id SERIAL NOT NULL,
+            user_id BIGINT NOT NULL,
+            lang_code CHARACTER VARYING(10),
+            date TIMESTAMP DEFAULT now(),
+            CONSTRAINT accounts_pkey PRIMARY KEY (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS public.mandatorys
+        (
+            id SERIAL NOT NULL,
+            chat_id bigint NOT NULL,
+            title character varying,
+            username character varying,
+            types character varying,
+            CONSTRAINT channels_pkey PRIMARY KEY (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS public.admins
+        (
+            id SERIAL NOT NULL,
+            user_id BIGINT NOT NULL,
+            date TIMESTAMP DEFAULT now(),
+            CONSTRAINT admins_pkey PRIMARY KEY (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS public.downloads
+        (
+            id SERIAL NOT NULL,
+            user_id BIGINT NOT NULL,
+            url TEXT UNIQUE NOT NULL,
+            title TEXT,
+            file_id TEXT,
+            media_type TEXT,  -- Added for distinguishing video/photo
+            date TIMESTAMP DEFAULT now(),
+            CONSTRAINT downloads_pkey PRIMARY KEY (id)
+        )""",
+    ]),
+    # Dublikatlarni tozalash indeks bilan bitta qadamda: qayta urinishda ham yangi dublikatlar tozalanadi
+    Migration(2, "unique keys for upserts", [
+        """DELETE FROM public.accounts a USING public.accounts b
+        WHERE a.user_id = b.user_id AND a.id > b.id""",
+        """DELETE FROM public.mandatorys a USING public.mandatorys b
+        WHERE a.chat_id = b.chat_id AND a.id > b.id""",
+        """DELETE FROM public.admins a USING public.admins b
+        WHERE a.user_id = b.user_id AND a.id > b.id""",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS accounts_user_id_key ON public.accounts (user_id)",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS mandatorys_chat_id_key ON public.mandatorys (chat_id)",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS admins_user_id_key ON public.admins (user_id)",
+    ], transactional=False),
+    Migration(3, "downloads lookup indexes", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS downloads_user_id_idx ON public.downloads (user_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS downloads_date_idx ON public.downloads (date)",
+    ], transactional=False),
+    Migration(4, "daily stats rollup", [
+        """CREATE TABLE IF NOT EXISTS public.stats_daily
+        (
+            day DATE NOT NULL,
+            lang_code CHARACTER VARYING(10) NOT NULL,
+            signups INTEGER NOT NULL DEFAULT 0,
+            downloads INTEGER NOT NULL DEFAULT 0,
+            CONSTRAINT stats_daily_pkey PRIMARY KEY (day, lang_code)
+        )""",
+        # Mavjud ma'lumotlardan qayta hisoblash (qayta ishga tushirilsa ham to'g'ri natija beradi)
+        """INSERT INTO public.stats_daily (day, lang_code, signups)
+        SELECT date::date, COALESCE(lang_code, 'uz'), COUNT(*) FROM public.accounts GROUP BY 1, 2
+        ON CONFLICT (day, lang_code) DO UPDATE SET signups = excluded.signups""",
+        """INSERT INTO public.stats_daily (day, lang_code, downloads)
+        SELECT d.date::date, COALESCE(a.lang_code, 'uz'), COUNT(*)
+        FROM public.downloads d LEFT JOIN public.accounts a ON a.user_id = d.user_id
+        GROUP BY 1, 2
+        ON CONFLICT (day, lang_code) DO UPDATE SET downloads = excluded.downloads""",
+    ]),
+    Migration(5, "durable broadcast jobs", [
+        """CREATE TABLE IF NOT EXISTS public.broadcast_jobs
+        (
+            id SERIAL NOT NULL,
+            kind CHARACTER VARYING(10) NOT NULL,  -- 'copy' | 'forward'
+            from_chat_id BIGINT NOT NULL,
+            message_ids BIGINT[] NOT NULL,
+            status CHARACTER VARYING(12) NOT NULL DEFAULT 'scheduled',  -- scheduled/running/paused/cancelled/done
+            scheduled_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            lease_until TIMESTAMPTZ,
+            created_by BIGINT NOT NULL,
+            status_chat_id BIGINT,
+            status_message_id BIGINT,
+            -- accounts.id gacha hammasi ishlangan; undan keyingi ishlanganlar done_ahead da
+            last_account_id INTEGER NOT NULL DEFAULT 0,
+            done_ahead INTEGER[] NOT NULL DEFAULT '{}',
+            total INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            CONSTRAINT broadcast_jobs_pkey PRIMARY KEY (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS broadcast_jobs_status_idx ON public.broadcast_jobs (status, scheduled_at)",
+        """CREATE TABLE IF NOT EXISTS public.broadcast_failures
+        (
+            job_id INTEGER NOT NULL REFERENCES public.broadcast_jobs (id) ON DELETE CASCADE,
+            account_id INTEGER NOT NULL,
+            user_id BIGINT NOT NULL,
+            error TEXT,
+            CONSTRAINT broadcast_failures_pkey PRIMARY KEY (job_id, account_id)
+        )""",
+    ]),
+    Migration(6, "blocked accounts", [
+        # NULL default: Postgres 11+ ustunni jadvalni qayta yozmasdan qo'shadi
+        "ALTER TABLE public.accounts ADD COLUMN IF NOT EXISTS blocked_at TIMESTAMPTZ",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_reachable_idx
+        ON public.accounts (id) WHERE blocked_at IS NULL""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_blocked_idx
+        ON public.accounts (user_id) WHERE blocked_at IS NOT NULL""",
+    ], transactional=False),
+    Migration(7, "broadcast segments", [
+        "ALTER TABLE public.accounts ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMPTZ",
+        # Faqat yangi qatorlar uchun: mavjudlari NULL (faolligi noma'lum) bo'lib qoladi
+        "ALTER TABLE public.accounts ALTER COLUMN last_active_at SET DEFAULT now()",
+        "ALTER TABLE public.broadcast_jobs ADD COLUMN IF NOT EXISTS segment JSONB NOT NULL DEFAULT '{}'",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_lang_id_idx
+        ON public.accounts (lang_code, id) WHERE blocked_at IS NULL""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_last_active_idx
+        ON public.accounts (last_active_at) WHERE blocked_at IS NULL""",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_date_idx ON public.accounts (date)",
+    ], transactional=False),
+    Migration(8, "cached channel invite links", [
+        # Admin havola bermagan kanallar uchun bot yaratgan havola (bir marta yaratiladi)
+        "ALTER TABLE public.mandatorys ADD COLUMN IF NOT EXISTS invite_link TEXT",
+    ]),
+    Migration(9, "shared fsm storage", [
+        """CREATE TABLE IF NOT EXISTS public.fsm_states
+        (
+            key TEXT NOT NULL,
+            state TEXT,
+            data JSONB NOT NULL DEFAULT '{}',
+            expires_at TIMESTAMPTZ NOT NULL,
+            CONSTRAINT fsm_states_pkey PRIMARY KEY (key)
+        )""",
+        "CREATE INDEX IF NOT EXISTS fsm_states_expires_idx ON public.fsm_states (expires_at)",
+    ]),
+    Migration(10, "download job queue", [
+        """CREATE TABLE IF NOT EXISTS public.download_jobs
+        (
+            id BIGSERIAL NOT NULL,
+            user_id BIGINT NOT NULL,
+            chat_id BIGINT NOT NULL,
+            url TEXT NOT NULL,
+            status_message_id BIGINT,
+            status CHARACTER VARYING(10) NOT NULL DEFAULT 'queued',  -- queued/running/done/failed
+            worker TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_until TIMESTAMPTZ,
+            error TEXT,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            CONSTRAINT download_jobs_pkey PRIMARY KEY (id)
+        )""",
+        # Navbatdagi va ishlanayotgan ishlar kam: claim qisman indeks bo'yicha
+        """CREATE INDEX IF NOT EXISTS download_jobs_pending_idx
+        ON public.download_jobs (id) WHERE status IN ('queued', 'running')""",
+        """CREATE INDEX IF NOT EXISTS download_jobs_finished_idx
+        ON public.download_jobs (finished_at) WHERE status IN ('done', 'failed')""",
+    ]),
+    Migration(11, "cache invalidation log", [
+        """CREATE TABLE IF NOT EXISTS public.cache_events
+        (
+            version BIGSERIAL NOT NULL,
+            topic TEXT NOT NULL,
+            key TEXT,
+            origin TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT cache_events_pkey PRIMARY KEY (version)
+        )""",
+        "CREATE INDEX IF NOT EXISTS cache_events_created_idx ON public.cache_events (created_at)",
+    ]),
+    # Bir jarayonda bir nechta bot (src/utils/tenants.py). Mavjud qatorlar asosiy 'main' botniki
+    Migration(12, "multi-tenant bots", [
+        "ALTER TABLE public.accounts ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.mandatorys ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.admins ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.downloads ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.stats_daily ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.broadcast_jobs ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        "ALTER TABLE public.download_jobs ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'main'",
+        # stats_daily kichik jadval: kalitni bitta ALTER bilan almashtiramiz
+        """ALTER TABLE public.stats_daily DROP CONSTRAINT IF EXISTS stats_daily_pkey,
+        ADD CONSTRAINT stats_daily_pkey PRIMARY KEY (tenant, day, lang_code)""",
+        # Avval yangi indekslar, keyin eskilari: upsert lar har doim mos kalitga ega
+        """CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS accounts_tenant_user_id_key
+        ON public.accounts (tenant, user_id)""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_tenant_reachable_idx
+        ON public.accounts (tenant, id) WHERE blocked_at IS NULL""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_tenant_blocked_idx
+        ON public.accounts (tenant, user_id) WHERE blocked_at IS NOT NULL""",
+        """CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_tenant_lang_id_idx
+        ON public.accounts (tenant, lang_code, id) WHERE blocked_at IS NULL""",
+        """CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS mandatorys_tenant_chat_id_key
+        ON public.mandatorys (tenant, chat_id)""",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS admins_tenant_user_id_key ON public.admins (tenant, user_id)",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS downloads_tenant_url_key ON public.downloads (tenant, url)",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.accounts_user_id_key",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.accounts_reachable_idx",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.accounts_blocked_idx",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.accounts_lang_id_idx",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.mandatorys_chat_id_key",
+        "DROP INDEX CONCURRENTLY IF EXISTS public.admins_user_id_key",
+        "ALTER TABLE public.downloads DROP CONSTRAINT IF EXISTS downloads_url_key",
+    ], transactional=False),
+    # Albom qismlari turli webhook worker larga tushishi mumkin: yig'ish jarayonlar orasida umumiy
+    Migration(13, "broadcast draft messages", [
+        """CREATE TABLE IF NOT EXISTS public.broadcast_drafts
+        (
+            id BIGSERIAL NOT NULL,
+            tenant TEXT NOT NULL,
+            chat_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT broadcast_drafts_pkey PRIMARY KEY (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS broadcast_drafts_chat_idx ON public.broadcast_drafts (tenant, chat_id, id)",
+    ]),
+]
+
+
+async def _drop_invalid_indexes(conn):
+    """A failed CREATE INDEX CONCURRENTLY leaves an INVALID index that IF NOT EXISTS would skip."""
+    rows = await conn.fetch("""SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND NOT i.indisvalid""")
+    for row in rows:
+        log.warning(f"Dropping invalid index {row['relname']}")
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS public."{row["relname"]}"')
+
+
+async def migrate():
+    """Apply pending migrations in version order and record them in public.schema_migrations."""
+    async with database.acquire() as conn:
+        # pg_advisory_lock da kutish CONCURRENTLY bilan deadlock beradi, shuning uchun try + sleep
+        while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", MIGRATION_LOCK_ID):
+            await asyncio.sleep(1)
+        try:
+            await conn.execute("SET statement_timeout = 0")
+            await conn.execute("""CREATE TABLE IF NOT EXISTS public.schema_migrations
+            (
+                version INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT now(),
+                CONSTRAINT schema_migrations_pkey PRIMARY KEY (version)
+            )""")
+            applied = {row["version"] for row in await conn.fetch("SELECT version FROM public.schema_migrations")}
+
+            for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                if migration.version in applied:
+                    continue
+                log.info(f"Applying migration {migration.version}: {migration.name}")
+                if migration.transactional:
+                    async with conn.transaction():
+                        for statement in migration.statements:
+                            await conn.execute(statement, timeout=MIGRATION_TIMEOUT)
+                        await conn.execute(
+                            "INSERT INTO public.schema_migrations (version, name) VALUES ($1, $2)",
+                            migration.version, migration.name)
+                else:
+                    await _drop_invalid_indexes(conn)
+                    for statement in migration.statements:
+                        await conn.execute(statement, timeout=MIGRATION_TIMEOUT)
+                    await conn.execute(
+                        "INSERT INTO public.schema_migrations (version, name) VALUES ($1, $2)",
+                        migration.version, migration.name)
+        finally:
+            await conn.execute("RESET statement_timeout")
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
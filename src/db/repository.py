@@ -0,0 +1,619 @@
+from collections import Counter
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from src.db.database import database
+from src.db.segments import Segment
+
+
+CACHE_EVENTS_LOCK_ID = 0x6361636865  # "cache"
+
+
+def _sqlite() -> bool:
+    # Postgres-ga xos so'rovlar (unnest, CTE ichida INSERT, SKIP LOCKED ...) uchun SQLite varianti
+    return database.dialect == "sqlite"
+
+
+def _seconds_from_now(param: int) -> str:
+    # now() + $param sekund, ikkala dialektda ham
+    if _sqlite():
+        return f"datetime('now', '+' || ${param} || ' seconds')"
+    return f"now() + make_interval(secs => ${param})"
+
+
+def _seconds_ago(param: int) -> str:
+    if _sqlite():
+        return f"datetime('now', '-' || ${param} || ' seconds')"
+    return f"now() - make_interval(secs => ${param})"
+
+
+def _any_text(param: int) -> str:
+    # "= ANY($param)" matnlar ro'yxati uchun, ikkala dialektda ham
+    if _sqlite():
+        return f"IN (SELECT value FROM json_each(${param}))"
+    return f"= ANY(${param}::text[])"
+
+
+class AccountRepo:
+    """Foydalanuvchilar har bir bot (tenant) uchun alohida: bitta odam ikki botda ikki qator."""
+
+    @staticmethod
+    async def register_many(rows: List[tuple]):
+        """
+        Insert (tenant, user_id, lang_code, date) tuples, skipping known users.
+        The daily rollup is bumped in the same statement for the rows actually inserted.
+        """
+        if _sqlite():
+            def write(conn):
+                signups = Counter()
+                for tenant, user_id, lang_code, joined in rows:
+                    cursor = conn.execute(
+                        """INSERT INTO accounts (tenant, user_id, lang_code, date) VALUES (?, ?, ?, ?)
+                           ON CONFLICT (tenant, user_id) DO NOTHING""",
+                        (tenant, user_id, lang_code, joined))
+                    if cursor.rowcount:
+                        signups[(tenant, joined, lang_code or "uz")] += 1
+                conn.executemany(
+                    """INSERT INTO stats_daily (tenant, day, lang_code, signups) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (tenant, day, lang_code) DO UPDATE SET signups = signups + excluded.signups""",
+                    [(tenant, day, lang_code, count) for (tenant, day, lang_code), count in signups.items()])
+
+            await database.transaction(write)
+            return
+        tenants, user_ids, lang_codes, dates = zip(*rows)
+        await database.execute(
+            """WITH inserted AS (
+                INSERT INTO public.accounts (tenant, user_id, lang_code, date)
+                SELECT * FROM unnest($1::text[], $2::bigint[], $3::varchar[], $4::date[])
+                ON CONFLICT (tenant, user_id) DO NOTHING
+                RETURNING tenant, date::date AS day, COALESCE(lang_code, 'uz') AS lang_code
+            )
+            INSERT INTO public.stats_daily (tenant, day, lang_code, signups)
+            SELECT tenant, day, lang_code, COUNT(*) FROM inserted GROUP BY tenant, day, lang_code
+            ON CONFLICT (tenant, day, lang_code) DO UPDATE SET signups = stats_daily.signups + excluded.signups""",
+            list(tenants), list(user_ids), list(lang_codes), list(dates),
+        )
+
+    @staticmethod
+    async def user_ids_after(tenant: str, last_user_id: int, limit: int) -> List[int]:
+        """Keyset page over accounts.user_id of one tenant (ascending)."""
+        rows = await database.fetch(
+            "SELECT user_id FROM public.accounts WHERE tenant = $1 AND user_id > $2 ORDER BY user_id LIMIT $3",
+            tenant, last_user_id, limit,
+        )
+        return [row["user_id"] for row in rows]
+
+    @staticmethod
+    async def blocked_user_ids_after(tenant: str, last_user_id: int, limit: int) -> List[int]:
+        """Keyset page over user_ids of accounts that blocked the tenant's bot (ascending)."""
+        rows = await database.fetch(
+            """SELECT user_id FROM public.accounts
+               WHERE tenant = $1 AND blocked_at IS NOT NULL AND user_id > $2 ORDER BY user_id LIMIT $3""",
+            tenant, last_user_id, limit,
+        )
+        return [row["user_id"] for row in rows]
+
+    @staticmethod
+    async def set_blocked(rows: List[tuple]):
+        """Set (or clear) blocked_at for many (tenant, user_id, blocked) rows in one UPDATE."""
+        if _sqlite():
+            await database.executemany(
+                """UPDATE accounts SET blocked_at = CASE WHEN $3 THEN COALESCE(blocked_at, now()) END
+                   WHERE tenant = $1 AND user_id = $2""",
+                rows)
+            return
+        tenants, user_ids, blocked = zip(*rows)
+        await database.execute(
+            """UPDATE public.accounts a
+               SET blocked_at = CASE WHEN s.blocked THEN COALESCE(a.blocked_at, now()) END
+               FROM unnest($1::text[], $2::bigint[], $3::bool[]) AS s(tenant, user_id, blocked)
+               WHERE a.tenant = s.tenant AND a.user_id = s.user_id""",
+            list(tenants), list(user_ids), list(blocked),
+        )
+
+    @staticmethod
+    async def touch_many(rows: List[tuple]):
+        """Bump last_active_at of (tenant, user_id) rows."""
+        if _sqlite():
+            await database.executemany(
+                "UPDATE accounts SET last_active_at = now() WHERE tenant = $1 AND user_id = $2", rows)
+            return
+        tenants, user_ids = zip(*rows)
+        await database.execute(
+            """UPDATE public.accounts a SET last_active_at = now()
+               FROM unnest($1::text[], $2::bigint[]) AS s(tenant, user_id)
+               WHERE a.tenant = s.tenant AND a.user_id = s.user_id""",
+            list(tenants), list(user_ids))
+
+    @staticmethod
+    async def count_reachable(tenant: str, segment: Segment = Segment()) -> int:
+        where, args = segment.sql(2, database.dialect)
+        return await database.fetchval(
+            f"SELECT COUNT(*) FROM public.accounts WHERE tenant = $1 AND blocked_at IS NULL{where}", tenant, *args)
+
+    @staticmethod
+    async def sample_user_ids(tenant: str, segment: Segment, size: int, total: int) -> List[int]:
+        """
+        Random reachable users of `segment`. BERNOULLI sampling reads each page once
+        instead of sorting the whole table by random(); it oversamples a little and
+        the small sample is then shuffled and cut to `size`.
+        """
+        if _sqlite():  # kichik bazalar: oddiy random() yetarli
+            where, args = segment.sql(3, database.dialect)
+            rows = await database.fetch(
+                f"""SELECT user_id FROM accounts WHERE tenant = $1 AND blocked_at IS NULL{where}
+                    ORDER BY random() LIMIT $2""",
+                tenant, size, *args)
+            return [row["user_id"] for row in rows]
+        # Har bir qator shu ehtimol bilan olinadi: tenant va segmentga mos keladiganlar ~ size * 1.5 ta
+        percent = min(100.0, size * 150.0 / max(total, 1))
+        where, args = segment.sql(4)
+        rows = await database.fetch(
+            f"""SELECT user_id FROM public.accounts TABLESAMPLE BERNOULLI ($1)
+                WHERE tenant = $3 AND blocked_at IS NULL{where}
+                ORDER BY random() LIMIT $2""",
+            percent, size, tenant, *args,
+        )
+        return [row["user_id"] for row in rows]
+
+    @staticmethod
+    async def stream_accounts(tenant: str, after_id: int = 0, skip_ids: Sequence[int] = (),
+                              segment: Segment = Segment(),
+                              batch_size: int = 1000) -> AsyncIterator[Tuple[int, int]]:
+        """Yield reachable (id, user_id) of `segment` with id > `after_id` in id order, leaving out `skip_ids`."""
+        last_id = after_id
+        skip = list(skip_ids)
+        where, args = segment.sql(5, database.dialect)
+        not_skipped = "id NOT IN (SELECT value FROM json_each($2))" if _sqlite() else "id <> ALL($2::int[])"
+        while True:
+            rows = await database.fetch(
+                f"""SELECT id, user_id FROM public.accounts
+                    WHERE tenant = $4 AND id > $1 AND {not_skipped} AND blocked_at IS NULL{where}
+                    ORDER BY id LIMIT $3""",
+                last_id, skip, batch_size, tenant, *args,
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield row["id"], row["user_id"]
+            last_id = rows[-1]["id"]
+
+
+class ChannelRepo:
+    @staticmethod
+    async def all(tenant: str) -> List[tuple]:
+        """(chat_id, link) pairs: the admin's link, else the cached invite link created by the bot."""
+        rows = await database.fetch(
+            """SELECT chat_id, COALESCE(NULLIF(username, ''), invite_link) AS link FROM public.mandatorys
+               WHERE tenant = $1 ORDER BY id""",
+            tenant)
+        return [(row["chat_id"], row["link"]) for row in rows]
+
+    @staticmethod
+    async def set_invite_link(tenant: str, chat_id: int, link: str) -> Optional[str]:
+        """Store `link` unless another node stored one first; return the stored link."""
+        # Bir vaqtda ishga tushgan node lar har biri havola yaratadi: faqat birinchisi yoziladi
+        await database.execute(
+            """UPDATE public.mandatorys SET invite_link = $3
+               WHERE tenant = $1 AND chat_id = $2 AND invite_link IS NULL""",
+            tenant, chat_id, link)
+        return await database.fetchval(
+            "SELECT invite_link FROM public.mandatorys WHERE tenant = $1 AND chat_id = $2", tenant, chat_id)
+
+    @staticmethod
+    async def add(tenant: str, chat_id: int, link: str):
+        await database.execute(
+            """INSERT INTO public.mandatorys (tenant, chat_id, username) VALUES ($1, $2, $3)
+               ON CONFLICT (tenant, chat_id) DO NOTHING""",
+            tenant, chat_id, link)
+
+    @staticmethod
+    async def delete(tenant: str, chat_id: int):
+        await database.execute("DELETE FROM public.mandatorys WHERE tenant = $1 AND chat_id = $2", tenant, chat_id)
+
+
+class AdminRepo:
+    @staticmethod
+    async def user_ids(tenant: str) -> List[int]:
+        rows = await database.fetch("SELECT user_id FROM public.admins WHERE tenant = $1 ORDER BY id", tenant)
+        return [row["user_id"] for row in rows]
+
+    @staticmethod
+    async def exists(tenant: str, user_id: int) -> bool:
+        return await database.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM public.admins WHERE tenant = $1 AND user_id = $2)", tenant, user_id)
+
+    @staticmethod
+    async def add(tenant: str, user_id: int):
+        await database.execute(
+            "INSERT INTO public.admins (tenant, user_id) VALUES ($1, $2) ON CONFLICT (tenant, user_id) DO NOTHING",
+            tenant, user_id)
+
+    @staticmethod
+    async def delete(tenant: str, user_id: int):
+        await database.execute("DELETE FROM public.admins WHERE tenant = $1 AND user_id = $2", tenant, user_id)
+
+
+class DownloadRepo:
+    """file_id lar faqat ularni olgan botda ishlaydi, shuning uchun kesh tenant bo'yicha."""
+
+    @staticmethod
+    async def upsert(tenant: str, user_id: int, url: str, title: str, file_ids_json: str, media_types_json: str,
+                     when: datetime, day: date):
+        if _sqlite():
+            def write(conn):
+                conn.execute(
+                    """INSERT INTO downloads (tenant, user_id, url, title, file_id, media_type, date)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (tenant, url) DO UPDATE SET file_id = excluded.file_id, title = excluded.title,
+                           media_type = excluded.media_type, date = excluded.date""",
+                    (tenant, user_id, url, title, file_ids_json, media_types_json, when))
+                conn.execute(
+                    """INSERT INTO stats_daily (tenant, day, lang_code, downloads)
+                       VALUES (?, ?, COALESCE((SELECT lang_code FROM accounts WHERE tenant = ? AND user_id = ?), 'uz'), 1)
+                       ON CONFLICT (tenant, day, lang_code) DO UPDATE SET downloads = downloads + excluded.downloads""",
+                    (tenant, day, tenant, user_id))
+
+            await database.transaction(write)
+            return
+        await database.execute(
+            """WITH upserted AS (
+                INSERT INTO public.downloads (tenant, user_id, url, title, file_id, media_type, date)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (tenant, url) DO UPDATE SET file_id = excluded.file_id, title = excluded.title,
+                    media_type = excluded.media_type, date = excluded.date
+                RETURNING tenant, user_id
+            )
+            INSERT INTO public.stats_daily (tenant, day, lang_code, downloads)
+            SELECT tenant, $8::date,
+                   COALESCE((SELECT lang_code FROM public.accounts a
+                             WHERE a.tenant = upserted.tenant AND a.user_id = upserted.user_id), 'uz'), 1
+            FROM upserted
+            ON CONFLICT (tenant, day, lang_code) DO UPDATE SET downloads = stats_daily.downloads + excluded.downloads""",
+            tenant, user_id, url, title, file_ids_json, media_types_json, when, day,
+        )
+
+    @staticmethod
+    async def get(tenant: str, url: str):
+        return await database.fetchrow(
+            "SELECT file_id, title, media_type, date FROM public.downloads WHERE tenant = $1 AND url = $2",
+            tenant, url)
+
+    @staticmethod
+    async def delete(tenant: str, url: str):
+        await database.execute("DELETE FROM public.downloads WHERE tenant = $1 AND url = $2", tenant, url)
+
+    @staticmethod
+    async def count_by_user(tenant: str, user_id: int) -> int:
+        return await database.fetchval(
+            "SELECT COUNT(*) FROM public.downloads WHERE tenant = $1 AND user_id = $2", tenant, user_id)
+
+    @staticmethod
+    async def count_all(tenant: str) -> int:
+        return await database.fetchval("SELECT COUNT(*) FROM public.downloads WHERE tenant = $1", tenant)
+
+
+class StatsRepo:
+    @staticmethod
+    async def rollup(tenant: str, since: date) -> List[tuple]:
+        """
+        One read over the daily rollup: per-(day, lang) rows since `since`,
+        plus one row per language with day = None for everything older.
+        """
+        rows = await database.fetch(
+            """SELECT CASE WHEN day >= $2::date THEN day END AS day, lang_code,
+                      SUM(signups)::bigint AS signups, SUM(downloads)::bigint AS downloads
+               FROM public.stats_daily
+               WHERE tenant = $1
+               GROUP BY 1, lang_code""",
+            tenant, since,
+        )
+        return [
+            # SQLite CASE natijasini matn sifatida qaytaradi
+            (date.fromisoformat(row["day"]) if isinstance(row["day"], str) else row["day"],
+             row["lang_code"], row["signups"], row["downloads"])
+            for row in rows
+        ]
+
+
+class BroadcastJobRepo:
+    @staticmethod
+    async def create(tenant: str, kind: str, from_chat_id: int, message_ids: List[int], segment: Segment,
+                     scheduled_at: datetime, created_by: int, total: int, status_chat_id: int,
+                     status_message_id: int) -> int:
+        return await database.fetchval(
+            """INSERT INTO public.broadcast_jobs (tenant, kind, from_chat_id, message_ids, segment, scheduled_at,
+                                                  created_by, total, status_chat_id, status_message_id)
+               VALUES ($1, $2, $3, $4, $5::jsonb, $6, $7, $8, $9, $10) RETURNING id""",
+            tenant, kind, from_chat_id, message_ids, segment.to_json(), scheduled_at, created_by, total,
+            status_chat_id, status_message_id)
+
+    @staticmethod
+    async def claim_next(lease_seconds: float, tenants: List[str]):
+        """
+        Take the oldest due job of `tenants` (or a running one whose lease expired after
+        a crash) and mark it running. SKIP LOCKED keeps several bot processes from taking the same job.
+        """
+        job_id = await database.fetchval(
+            f"""UPDATE public.broadcast_jobs
+               SET status = 'running', lease_until = {_seconds_from_now(1)},
+                   started_at = COALESCE(started_at, now())
+               WHERE id = (
+                   SELECT id FROM public.broadcast_jobs
+                   WHERE ((status = 'scheduled' AND scheduled_at <= now())
+                          OR (status = 'running' AND lease_until < now()))
+                     AND tenant {_any_text(2)}
+                   ORDER BY scheduled_at, id LIMIT 1
+                   {"" if _sqlite() else "FOR UPDATE SKIP LOCKED"}
+               )
+               RETURNING id""",
+            lease_seconds, tenants)
+        return await BroadcastJobRepo.get(job_id) if job_id else None
+
+    @staticmethod
+    async def checkpoint(job_id: int, sent: int, failed: int, last_account_id: int, done_ahead: List[int],
+                         failures: List[tuple], lease_seconds: float) -> Optional[str]:
+        """
+        Persist progress in one statement: new (account_id, user_id, error) failures,
+        counters, the watermark and the lease. Returns the job status as stored now,
+        so the runner notices a pause/cancel made from another process.
+        """
+        if _sqlite():
+            def write(conn):
+                conn.executemany(
+                    """INSERT INTO broadcast_failures (job_id, account_id, user_id, error) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (job_id, account_id) DO NOTHING""",
+                    [(job_id, *failure) for failure in failures])
+                row = conn.execute(
+                    """UPDATE broadcast_jobs
+                       SET sent = sent + ?2, failed = failed + ?3,
+                           last_account_id = max(last_account_id, ?4), done_ahead = ?5,
+                           lease_until = CASE WHEN status = 'running'
+                                              THEN datetime('now', '+' || ?6 || ' seconds') END
+                       WHERE id = ?1
+                       RETURNING status""",
+                    (job_id, sent, failed, last_account_id, done_ahead, lease_seconds)).fetchone()
+                return row[0] if row else None
+
+            return await database.transaction(write)
+        account_ids, user_ids, errors = zip(*failures) if failures else ((), (), ())
+        return await database.fetchval(
+            """WITH failures AS (
+                INSERT INTO public.broadcast_failures (job_id, account_id, user_id, error)
+                SELECT $1, * FROM unnest($2::int[], $3::bigint[], $4::text[])
+                ON CONFLICT (job_id, account_id) DO NOTHING
+            )
+            UPDATE public.broadcast_jobs
+            SET sent = sent + $5, failed = failed + $6,
+                last_account_id = GREATEST(last_account_id, $7), done_ahead = $8::int[],
+                lease_until = CASE WHEN status = 'running' THEN now() + make_interval(secs => $9) END
+            WHERE id = $1
+            RETURNING status""",
+            job_id, list(account_ids), list(user_ids), list(errors), sent, failed, last_account_id,
+            done_ahead, lease_seconds)
+
+    @staticmethod
+    async def finish(job_id: int, status: str):
+        """Leave 'running' (done, or back to scheduled on shutdown); a pause/cancel set meanwhile wins."""
+        await database.execute(
+            """UPDATE public.broadcast_jobs
+               SET status = $2, lease_until = NULL,
+                   finished_at = CASE WHEN $2 = 'done' THEN now() END
+               WHERE id = $1 AND status = 'running'""",
+            job_id, status)
+
+    @staticmethod
+    async def pause(job_id: int) -> bool:
+        return await database.fetchval(
+            """UPDATE public.broadcast_jobs SET status = 'paused', lease_until = NULL
+               WHERE id = $1 AND status IN ('scheduled', 'running') RETURNING true""", job_id) or False
+
+    @staticmethod
+    async def resume(job_id: int) -> bool:
+        return await database.fetchval(
+            "UPDATE public.broadcast_jobs SET status = 'scheduled' WHERE id = $1 AND status = 'paused' RETURNING true",
+            job_id) or False
+
+    @staticmethod
+    async def cancel(job_id: int) -> bool:
+        return await database.fetchval(
+            """UPDATE public.broadcast_jobs SET status = 'cancelled', lease_until = NULL, finished_at = now()
+               WHERE id = $1 AND status IN ('scheduled', 'running', 'paused') RETURNING true""", job_id) or False
+
+    @staticmethod
+    async def get(job_id: int):
+        return await database.fetchrow("SELECT * FROM public.broadcast_jobs WHERE id = $1", job_id)
+
+    @staticmethod
+    async def recent(tenant: str, limit: int = 10):
+        return await database.fetch(
+            "SELECT * FROM public.broadcast_jobs WHERE tenant = $1 ORDER BY id DESC LIMIT $2", tenant, limit)
+
+    @staticmethod
+    async def failed_user_ids(job_id: int, after_account_id: int, limit: int) -> List[tuple]:
+        """Keyset page of (account_id, user_id) failures of a job."""
+        rows = await database.fetch(
+            """SELECT account_id, user_id FROM public.broadcast_failures
+               WHERE job_id = $1 AND account_id > $2 ORDER BY account_id LIMIT $3""",
+            job_id, after_account_id, limit)
+        return [(row["account_id"], row["user_id"]) for row in rows]
+
+
+class BroadcastDraftRepo:
+    """Admin xabarnoma uchun yuborayotgan xabarlar (src/handlers/admins/messages.py), har bir chat uchun."""
+
+    @staticmethod
+    async def add(tenant: str, chat_id: int, message_id: int) -> int:
+        return await database.fetchval(
+            """INSERT INTO public.broadcast_drafts (tenant, chat_id, message_id)
+               VALUES ($1, $2, $3) RETURNING id""",
+            tenant, chat_id, message_id)
+
+    @staticmethod
+    async def take_if_latest(tenant: str, chat_id: int, draft_id: int, max_age_seconds: float) -> List[int]:
+        """
+        Delete the chat's drafts and return their message ids (ascending), unless a
+        newer draft than `draft_id` arrived meanwhile — then its handler takes them.
+        Drafts older than `max_age_seconds` (left behind by a crashed process) are dropped.
+        """
+        rows = await database.fetch(
+            f"""DELETE FROM public.broadcast_drafts
+                WHERE tenant = $1 AND chat_id = $2 AND NOT EXISTS (
+                    SELECT 1 FROM public.broadcast_drafts
+                    WHERE tenant = $1 AND chat_id = $2 AND id > $3
+                )
+                RETURNING message_id, created_at >= {_seconds_ago(4)} AS fresh""",
+            tenant, chat_id, draft_id, max_age_seconds)
+        return sorted(row["message_id"] for row in rows if row["fresh"])
+
+
+class FsmRepo:
+    """aiogram FSM holati va ma'lumotlari (src/db/fsm_storage.py); muddati o'tgan qatorlar ko'rinmaydi."""
+
+    @staticmethod
+    async def get(key: str) -> Optional[tuple]:
+        row = await database.fetchrow(
+            "SELECT state, data FROM public.fsm_states WHERE key = $1 AND expires_at > now()", key)
+        return (row["state"], row["data"]) if row else None
+
+    @staticmethod
+    async def set_state(key: str, state: Optional[str], ttl: int):
+        await database.execute(
+            f"""INSERT INTO public.fsm_states (key, state, expires_at) VALUES ($1, $2, {_seconds_from_now(3)})
+                ON CONFLICT (key) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at,
+                    data = CASE WHEN fsm_states.expires_at > now() THEN fsm_states.data ELSE '{{}}' END""",
+            key, state, ttl)
+
+    @staticmethod
+    async def set_data(key: str, data_json: str, ttl: int):
+        # Muddati o'tgan qatorning eski holati yangi ma'lumot bilan tirilib qolmasin
+        await database.execute(
+            f"""INSERT INTO public.fsm_states (key, data, expires_at) VALUES ($1, $2::jsonb, {_seconds_from_now(3)})
+                ON CONFLICT (key) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at,
+                    state = CASE WHEN fsm_states.expires_at > now() THEN fsm_states.state END""",
+            key, data_json, ttl)
+
+    @staticmethod
+    async def purge() -> int:
+        """Delete expired rows and cleared ones (no state, empty data)."""
+        status = await database.execute(
+            """DELETE FROM public.fsm_states
+               WHERE expires_at <= now() OR (state IS NULL AND data = '{}')""")
+        return int(status.split()[-1])
+
+
+class DownloadJobRepo:
+    """Yuklab olish navbati (src/utils/download_jobs.py): bot qo'shadi, download worker lar oladi."""
+
+    @staticmethod
+    async def enqueue(tenant: str, user_id: int, chat_id: int, url: str, status_message_id: int) -> int:
+        if _sqlite():
+            return await database.fetchval(
+                """INSERT INTO download_jobs (tenant, user_id, chat_id, url, status_message_id)
+                   VALUES ($1, $2, $3, $4, $5) RETURNING id""",
+                tenant, user_id, chat_id, url, status_message_id)
+        # NOTIFY tranzaksiya bilan birga: worker yozuv ko'rinmasdan uyg'onmaydi
+        return await database.fetchval(
+            """WITH job AS (
+                   INSERT INTO public.download_jobs (tenant, user_id, chat_id, url, status_message_id)
+                   VALUES ($1, $2, $3, $4, $5) RETURNING id
+               )
+               SELECT id, pg_notify('download_jobs', id::text) FROM job""",
+            tenant, user_id, chat_id, url, status_message_id)
+
+    @staticmethod
+    async def claim(worker: str, lease_seconds: float, tenants: List[str]):
+        """
+        Take the oldest queued job of `tenants` (the bots this worker can send with),
+        or a running one whose worker stopped renewing its lease.
+        """
+        job_id = await database.fetchval(
+            f"""UPDATE public.download_jobs
+               SET status = 'running', worker = $2, attempts = attempts + 1,
+                   lease_until = {_seconds_from_now(1)}, started_at = now()
+               WHERE id = (
+                   SELECT id FROM public.download_jobs
+                   WHERE ((status = 'queued' AND (lease_until IS NULL OR lease_until <= now()))
+                          OR (status = 'running' AND lease_until < now()))
+                     AND tenant {_any_text(3)}
+                   ORDER BY id LIMIT 1
+                   {"" if _sqlite() else "FOR UPDATE SKIP LOCKED"}
+               )
+               RETURNING id""",
+            lease_seconds, worker, tenants)
+        if not job_id:
+            return None
+        return await database.fetchrow("SELECT * FROM public.download_jobs WHERE id = $1", job_id)
+
+    @staticmethod
+    async def heartbeat(job_id: int, worker: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if the job was taken over by another worker."""
+        return await database.fetchval(
+            f"""UPDATE public.download_jobs SET lease_until = {_seconds_from_now(3)}
+                WHERE id = $1 AND worker = $2 AND status = 'running' RETURNING true""",
+            job_id, worker, lease_seconds) or False
+
+    @staticmethod
+    async def release(job_id: int, worker: str, error: str, delay_seconds: float) -> bool:
+        """Put a failed job back in the queue; it can be claimed again after `delay_seconds`."""
+        # Navbatdagi ish uchun lease_until — "shu vaqtdan oldin olinmasin"
+        return await database.fetchval(
+            f"""UPDATE public.download_jobs
+                SET status = 'queued', worker = NULL, error = $3, lease_until = {_seconds_from_now(4)}
+                WHERE id = $1 AND worker = $2 AND status = 'running' RETURNING true""",
+            job_id, worker, error, delay_seconds) or False
+
+    @staticmethod
+    async def finish(job_id: int, worker: str, status: str, error: Optional[str] = None):
+        await database.execute(
+            """UPDATE public.download_jobs SET status = $3, error = $4, lease_until = NULL, finished_at = now()
+               WHERE id = $1 AND worker = $2 AND status = 'running'""",
+            job_id, worker, status, error)
+
+    @staticmethod
+    async def purge_finished(older_than_seconds: int) -> int:
+        status = await database.execute(
+            f"""DELETE FROM public.download_jobs
+                WHERE status IN ('done', 'failed') AND finished_at < {_seconds_ago(1)}""",
+            older_than_seconds)
+        return int(status.split()[-1])
+
+
+class CacheEventRepo:
+    """Keshlarni bekor qilish jurnali (src/utils/invalidation.py); version tartibi = commit tartibi."""
+
+    @staticmethod
+    async def publish(topic: str, key: Optional[str], origin: str) -> int:
+        if _sqlite():
+            return await database.fetchval(
+                "INSERT INTO cache_events (topic, key, origin) VALUES ($1, $2, $3) RETURNING version",
+                topic, key, origin)
+        # Lock commitgacha ushlanadi: kichik version katta versiondan keyin ko'rinib qolmaydi
+        return await database.fetchval(
+            """WITH lock AS (SELECT pg_advisory_xact_lock($4)),
+               event AS (
+                   INSERT INTO public.cache_events (topic, key, origin)
+                   SELECT $1, $2, $3 FROM lock RETURNING version
+               )
+               SELECT version, pg_notify('cache_events', version::text) FROM event""",
+            topic, key, origin, CACHE_EVENTS_LOCK_ID)
+
+    @staticmethod
+    async def latest() -> int:
+        return await database.fetchval("SELECT COALESCE(MAX(version), 0) FROM public.cache_events")
+
+    @staticmethod
+    async def oldest() -> Optional[int]:
+        return await database.fetchval("SELECT MIN(version) FROM public.cache_events")
+
+    @staticmethod
+    async def after(version: int, limit: int):
+        return await database.fetch(
+            "SELECT version, topic, key, origin FROM public.cache_events WHERE version > $1 ORDER BY version LIMIT $2",
+            version, limit)
+
+    @staticmethod
+    async def purge(older_than_seconds: int) -> int:
+        status = await database.execute(
+            f"DELETE FROM public.cache_events WHERE created_at < {_seconds_ago(1)}", older_than_seconds)
+        return int(status.split()[-1])
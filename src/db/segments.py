@@ -0,0 +1,102 @@
+import json
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+# Admin yozadigan kalitlar (o'zbekcha va inglizcha)
+LANG_KEYS = ("til", "lang")
+ACTIVE_KEYS = ("faol", "active")
+FROM_KEYS = ("dan", "from")
+TO_KEYS = ("gacha", "to")
+
+
+class Segment(NamedTuple):
+    """Broadcast audience filter over public.accounts; the empty segment means everyone reachable."""
+
+    langs: Tuple[str, ...] = ()
+    active_days: Optional[int] = None
+    joined_from: Optional[date] = None
+    joined_to: Optional[date] = None  # shu kun ham kiradi
+
+    @classmethod
+    def parse(cls, text: str) -> "Segment":
+        """Parse ``til=ru,en faol=30 dan=2024-01-01 gacha=2024-06-30``; raises ValueError."""
+        values = {}
+        for token in text.replace("\n", " ").split():
+            key, sep, value = token.partition("=")
+            key = key.lower()
+            if not sep or not value:
+                raise ValueError(f"'{token}' kalit=qiymat ko'rinishida emas")
+            if key in LANG_KEYS:
+                values["langs"] = tuple(sorted({v.strip().lower() for v in value.split(",") if v.strip()}))
+            elif key in ACTIVE_KEYS:
+                if not value.isdigit() or int(value) <= 0:
+                    raise ValueError(f"'{token}': kunlar soni musbat butun son bo'lishi kerak")
+                values["active_days"] = int(value)
+            elif key in FROM_KEYS or key in TO_KEYS:
+                try:
+                    day = datetime.strptime(value, "%Y-%m-%d").date()
+                except ValueError:
+                    raise ValueError(f"'{token}': sana YYYY-MM-DD ko'rinishida bo'lishi kerak")
+                values["joined_from" if key in FROM_KEYS else "joined_to"] = day
+            else:
+                raise ValueError(f"Noma'lum filtr: '{key}'")
+        return cls(**values)
+
+    def describe(self) -> str:
+        parts = []
+        if self.langs:
+            parts.append(f"til: {', '.join(self.langs)}")
+        if self.active_days:
+            parts.append(f"oxirgi {self.active_days} kunda faol")
+        if self.joined_from or self.joined_to:
+            parts.append(f"ro'yxatdan o'tgan: {self.joined_from or '…'} — {self.joined_to or '…'}")
+        return "; ".join(parts) or "hamma"
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "langs": list(self.langs),
+            "active_days": self.active_days,
+            "joined_from": self.joined_from.isoformat() if self.joined_from else None,
+            "joined_to": self.joined_to.isoformat() if self.joined_to else None,
+        })
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> "Segment":
+        data = json.loads(raw) if raw else {}
+        return cls(
+            langs=tuple(data.get("langs") or ()),
+            active_days=data.get("active_days"),
+            joined_from=date.fromisoformat(data["joined_from"]) if data.get("joined_from") else None,
+            joined_to=date.fromisoformat(data["joined_to"]) if data.get("joined_to") else None,
+        )
+
+    def sql(self, first_param: int, dialect: str = "postgres") -> Tuple[str, List]:
+        """
+        WHERE fragment (starting with AND) and its arguments, numbered from `first_param`.
+        Each condition has its own index (lang_code, id) / date / last_active_at.
+        """
+        sqlite = dialect == "sqlite"
+        clauses, args = [], []
+
+        def param(value) -> str:
+            args.append(value)
+            return f"${first_param + len(args) - 1}"
+
+        if self.langs:
+            if sqlite:
+                clauses.append(f"lang_code IN (SELECT value FROM json_each({param(list(self.langs))}))")
+            else:
+                clauses.append(f"lang_code = ANY({param(list(self.langs))}::varchar[])")
+        if self.active_days:
+            if sqlite:
+                clauses.append(f"last_active_at >= datetime('now', '-' || {param(self.active_days)} || ' days')")
+            else:
+                clauses.append(f"last_active_at >= now() - make_interval(days => {param(self.active_days)})")
+        if self.joined_from:
+            clauses.append(f"date >= {param(self.joined_from)}::date")
+        if self.joined_to:
+            if sqlite:
+                clauses.append(f"date < date({param(self.joined_to)}, '+1 day')")
+            else:
+                clauses.append(f"date < {param(self.joined_to)}::date + 1")
+        return "".join(f" AND {clause}" for clause in clauses), args
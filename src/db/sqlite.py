@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, List, Optional, TypeVar
+
+log = logging.getLogger("database")
+
+T = TypeVar("T")
+
+# Postgres matnini SQLite ga moslash: $1 -> ?1, public.jadval -> jadval, ::tip kastlar olib tashlanadi
+_PARAM_RE = re.compile(r"\$(\d+)")
+_CAST_RE = re.compile(r"::\w+(\[\])?")
+
+
+def _utc_text(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(" ", timespec="seconds")
+
+
+def _parse_timestamp(raw: bytes) -> datetime:
+    return datetime.fromisoformat(raw.decode())
+
+
+def _parse_timestamptz(raw: bytes) -> datetime:
+    value = datetime.fromisoformat(raw.decode())
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Vaqtlar UTC "YYYY-MM-DD HH:MM:SS" matni sifatida saqlanadi: now() bilan matn sifatida solishtirsa bo'ladi
+sqlite3.register_adapter(datetime, _utc_text)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(list, json.dumps)
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+sqlite3.register_converter("TIMESTAMPTZ", _parse_timestamptz)
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()[:10]))
+sqlite3.register_converter("JSON", lambda raw: json.loads(raw))
+
+
+def translate(query: str) -> str:
+    return _CAST_RE.sub("", _PARAM_RE.sub(r"?\1", query.replace("public.", "")))
+
+
+class SQLiteDatabase:
+    """
+    SQLite backend with the query interface of ``Database`` (``execute``,
+    ``fetch*``, ``listen``), for single-node deployments. There is no
+    ``acquire()``: multi-statement writes go through ``transaction(fn)``.
+
+    The file runs in WAL mode, so readers never block the writer. All writes go
+    through one dedicated writer thread (SQLite allows a single writer anyway);
+    SELECTs run on a small pool of reader threads, each with its own connection.
+    Repositories pass Postgres-style SQL (``$1``, ``public.``, ``::casts``) which
+    is translated here; statements without a SQLite equivalent have dialect
+    branches in ``src.db.repository``.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str, synchronous: str, readers: int, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.synchronous = synchronous
+        self.readers = readers
+        self.busy_timeout_ms = busy_timeout_ms
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._reader: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            # WAL bilan NORMAL: tranzaksiyalar buzilmaydi, faqat elektr uzilsa oxirgilari yo'qolishi mumkin
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.create_function("now", 0, lambda: _utc_text(datetime.now(timezone.utc)))
+            conn.create_function("greatest", 2, max)
+            self._local.conn = conn
+            self._connections.append(conn)
+        return conn
+
+    async def connect(self):
+        if self._writer:
+            return
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._reader = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+        await self._run(self._writer, lambda conn: None)  # WAL rejimi fayl yaratilganda yoqiladi
+        log.info(f"SQLite database opened ({self.path}, readers={self.readers})")
+
+    async def close(self):
+        for executor in (self._writer, self._reader):
+            if executor:
+                executor.shutdown(wait=True)
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+        self._writer = self._reader = None
+
+    async def _run(self, executor: ThreadPoolExecutor, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(executor, lambda: fn(self._connection()))
+
+    def _executor_for(self, query: str) -> ThreadPoolExecutor:
+        return self._reader if query.lstrip().upper().startswith("SELECT") else self._writer
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``fn(conn)`` on the writer thread inside BEGIN IMMEDIATE ... COMMIT."""
+        def run(conn: sqlite3.Connection) -> T:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        return await self._run(self._writer, run)
+
+    async def execute(self, query: str, *args) -> str:
+        query = translate(query)
+        cursor = await self._run(self._writer, lambda conn: conn.execute(query, args))
+        return f"{query.split(None, 1)[0].upper()} {cursor.rowcount}"
+
+    async def executemany(self, query: str, args: List[tuple]):
+        query = translate(query)
+        await self.transaction(lambda conn: conn.executemany(query, args))
+
+    async def fetch(self, query: str, *args) -> List[sqlite3.Row]:
+        query = translate(query)
+        return await self._run(self._executor_for(query), lambda conn: conn.execute(query, args).fetchall())
+
+    async def fetchrow(self, query: str, *args) -> Optional[sqlite3.Row]:
+        query = translate(query)
+        return await self._run(self._executor_for(query), lambda conn: conn.execute(query, args).fetchone())
+
+    async def fetchval(self, query: str, *args) -> Any:
+        row = await self.fetchrow(query, *args)
+        return row[0] if row is not None else None
+
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> None:
+        # SQLite da LISTEN/NOTIFY yo'q: chaqiruvchilar so'rov bilan tekshirib turadi (polling)
+        return None
@@ -0,0 +1,151 @@
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional, Set, Tuple
+
+from config import ACCOUNT_FLUSH_INTERVAL_MS, ACCOUNT_FLUSH_MAX_ROWS
+from src.db.repository import AccountRepo
+from src.utils.invalidation import invalidation_bus
+from src.utils.metrics import metrics
+
+log = logging.getLogger("write-behind")
+
+# Faollik vaqti soatiga bir martadan ko'p yozilmaydi
+TOUCH_INTERVAL = 3600
+
+
+class AccountWriteBehind:
+    """
+    Buffers new registrations and writes them as one multi-row insert,
+    every `interval_ms` or as soon as `max_rows` are waiting. Blocked/unblocked
+    flags found while sending and last-activity touches (at most one per user
+    per ``TOUCH_INTERVAL``) go the same way as batched UPDATEs.
+
+    Written registrations and blocked flags are published on the
+    invalidation bus so other bot processes update their ``known_users`` /
+    ``blocked_users``. A failed flush puts the rows back into the buffer; ``stop()`` flushes
+    whatever is left, so a clean shutdown loses nothing.
+    """
+
+    def __init__(self, interval_ms: int, max_rows: int):
+        self.interval = interval_ms / 1000
+        self.max_rows = max_rows
+        # Kalit: (tenant, user_id) — bitta odam har bir botda alohida foydalanuvchi
+        self._buffer: Dict[Tuple[str, int], Tuple[str, date]] = {}
+        self._blocked: Dict[Tuple[str, int], bool] = {}  # oxirgi holat
+        self._touched: Set[Tuple[str, int]] = set()
+        self._touched_recently: Set[Tuple[str, int]] = set()
+        self._touch_window = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def add(self, tenant: str, user_id: int, lang_code: str, joined: date):
+        self._buffer.setdefault((tenant, user_id), (lang_code, joined))
+        metrics.gauge("accounts.buffered").set(len(self._buffer))
+        if len(self._buffer) >= self.max_rows:
+            self._wakeup.set()
+
+    def set_blocked(self, tenant: str, user_id: int, blocked: bool = True):
+        self._blocked[(tenant, user_id)] = blocked
+        if len(self._blocked) >= self.max_rows:
+            self._wakeup.set()
+
+    def touch(self, tenant: str, user_id: int):
+        now = time.monotonic()
+        if now - self._touch_window >= TOUCH_INTERVAL:
+            self._touched_recently.clear()
+            self._touch_window = now
+        key = (tenant, user_id)
+        if key in self._touched_recently:
+            return
+        self._touched_recently.add(key)
+        self._touched.add(key)
+        if len(self._touched) >= self.max_rows:
+            self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            while self._buffer:
+                batch = dict(list(self._buffer.items())[:self.max_rows])
+                for key in batch:
+                    del self._buffer[key]
+                started = time.perf_counter()
+                try:
+                    await AccountRepo.register_many(
+                        [(tenant, user_id, lang_code, joined)
+                         for (tenant, user_id), (lang_code, joined) in batch.items()]
+                    )
+                except Exception as e:
+                    log.error(f"Account flush failed ({len(batch)} rows), will retry: {e}")
+                    metrics.counter("accounts.flush_errors").inc()
+                    for key, row in batch.items():
+                        self._buffer.setdefault(key, row)
+                    break
+                finally:
+                    metrics.gauge("accounts.buffered").set(len(self._buffer))
+                metrics.histogram("accounts.flush_latency_ms").observe((time.perf_counter() - started) * 1000)
+                metrics.histogram("accounts.flush_batch_size").observe(len(batch))
+                metrics.counter("accounts.flushed_rows").inc(len(batch))
+                registered = defaultdict(list)
+                for tenant, user_id in batch:
+                    registered[tenant].append(user_id)
+                for tenant, user_ids in registered.items():
+                    await invalidation_bus.publish("known_users", json.dumps([tenant, user_ids]))
+            # Ro'yxatdan o'tish avval yoziladi: blok holati mavjud qatorni yangilaydi
+            while self._blocked and not self._buffer:
+                changes = dict(list(self._blocked.items())[:self.max_rows])
+                for key in changes:
+                    del self._blocked[key]
+                rows = [(tenant, user_id, blocked) for (tenant, user_id), blocked in changes.items()]
+                try:
+                    await AccountRepo.set_blocked(rows)
+                except Exception as e:
+                    log.error(f"Blocked flags flush failed ({len(changes)} rows), will retry: {e}")
+                    metrics.counter("accounts.flush_errors").inc()
+                    for key, blocked in changes.items():
+                        self._blocked.setdefault(key, blocked)
+                    break
+                metrics.counter("accounts.blocked_updates").inc(len(changes))
+                await invalidation_bus.publish("blocked", json.dumps(rows))
+            while self._touched and not self._buffer:
+                touched = list(self._touched)[:self.max_rows]
+                self._touched.difference_update(touched)
+                try:
+                    await AccountRepo.touch_many(touched)
+                except Exception as e:
+                    # Faollik vaqti muhim emas: qayta urinmaymiz
+                    log.warning(f"Activity touch failed ({len(touched)} rows): {e}")
+                    metrics.counter("accounts.flush_errors").inc()
+                    break
+                metrics.counter("accounts.touched").inc(len(touched))
+
+    async def stop(self):
+        # Taskni bekor qilmaymiz: yozilayotgan batch yo'qolmasin
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer or self._blocked:
+            log.error(f"{len(self._buffer)} registrations and {len(self._blocked)} blocked flags "
+                      f"could not be written on shutdown")
+
+
+account_buffer = AccountWriteBehind(ACCOUNT_FLUSH_INTERVAL_MS, ACCOUNT_FLUSH_MAX_ROWS)
@@ -0,0 +1,13 @@
+from typing import Union
+
+from aiogram.filters import BaseFilter
+from aiogram.types import CallbackQuery, Message
+
+from src.utils.tenants import Tenant
+
+
+class IsAdmin(BaseFilter):
+    """The sender is an admin of the bot the update came to (``admins`` of the tenant)."""
+
+    async def __call__(self, event: Union[Message, CallbackQuery], tenant: Tenant) -> bool:
+        return event.from_user is not None and tenant.is_admin(event.from_user.id)
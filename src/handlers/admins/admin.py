@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
 
-import psycopg2
 import pytz
 from aiogram import Router, F
 from aiogram.exceptions import AiogramError
@@ -13,8 +12,11 @@ from aiogram.fsm.state import StatesGroup, State
 from dateutil.relativedelta import relativedelta
 
 from src.keyboards.buttons import AdminPanel
-from config import sql, ADMIN_ID, DB_CONFIG, bot
+from src.db.repository import StatsRepo
+from src.filters.admin import IsAdmin
 from src.keyboards.keyboard_func import PanelFunc
+from src.utils.metrics import metrics
+from src.utils.tenants import Tenant
 
 admin_router = Router()
 
@@ -30,61 +32,60 @@ class Form(StatesGroup):
 
 
 # Admin panelga kirish
-@admin_router.message(Command("panel", "admin"), F.from_user.id.in_(ADMIN_ID), F.chat.type == ChatType.PRIVATE)#,
+@admin_router.message(Command("panel", "admin"), IsAdmin(), F.chat.type == ChatType.PRIVATE)#,
 async def panel_handler(message: Message) -> None:
     await message.answer("panel", reply_markup=await AdminPanel.admin_menu())
 
 
+# Ichki metrikalar (flush latency, batch size va h.k.)
+@admin_router.message(Command("metrics"), IsAdmin(), F.chat.type == ChatType.PRIVATE)
+async def metrics_handler(message: Message) -> None:
+    await message.answer(f"<pre>{metrics.render()}</pre>", parse_mode="html")
+
+
 markup = ReplyKeyboardMarkup(resize_keyboard=True, keyboard=[[KeyboardButton(text="🔙Orqaga qaytish")]])
-@admin_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@admin_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def backs(message: Message, state: FSMContext):
     await message.reply("Orqaga qaytildi", reply_markup=await AdminPanel.admin_menu())
     await state.clear()
 
 
 # Statistika
-@admin_router.message(F.text == "📊Statistika", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def new(message: Message):
+@admin_router.message(F.text == "📊Statistika", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def new(message: Message, tenant: Tenant):
     now = datetime.now(pytz.timezone("Asia/Tashkent")).date()
 
     # Oxirgi 3 oy: joriy oy va undan oldingi 2 ta oy
     current_month = now.replace(day=1)
     months = [current_month - relativedelta(months=i) for i in range(3)]
 
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
+    # Bitta so'rov: kunlik rollup jadvalidan (accounts jadvali hajmiga bog'liq emas)
+    rows = await StatsRepo.rollup(tenant.name, months[-1])
 
-    # Jami foydalanuvchilar
-    cur.execute("SELECT COUNT(*) FROM accounts")
-    all_users = cur.fetchone()[0]
-
-    # Oxirgi 3 oydagi jami foydalanuvchilar
-    cur.execute("SELECT COUNT(*) FROM accounts WHERE date >= %s", (months[-1],))
-    last_3_months = cur.fetchone()[0]
+    all_users = sum(signups for _, _, signups, _ in rows)
+    all_downloads = sum(downloads for _, _, _, downloads in rows)
+    last_3_months = sum(signups for day, _, signups, _ in rows if day is not None)
 
     # Har bir oy bo‘yicha statistikalar
-    month_counts = {}
-    for month in months:
-        cur.execute(
-            "SELECT COUNT(*) FROM accounts WHERE date >= %s AND date < %s",
-            (month, month + relativedelta(months=1))
-        )
-        month_counts[month.strftime("%B")] = cur.fetchone()[0] or 0  # Oy nomlari
-
-    # Oxirgi 7 kun statistikasi
-    last_7_days = {}
-    for i in range(7):
-        date_str = (now - timedelta(days=i)).strftime("%Y-%m-%d")
-        cur.execute("SELECT COUNT(*) FROM accounts WHERE date = %s", (date_str,))
-        last_7_days[date_str] = cur.fetchone()[0] or 0
-
-    cur.close()
-    conn.close()
+    month_counts = {month.strftime("%B"): 0 for month in months}  # Oy nomlari
+    last_7_days = {(now - timedelta(days=i)).strftime("%Y-%m-%d"): 0 for i in range(7)}
+    languages = {}
+    for day, lang_code, signups, downloads in rows:
+        languages[lang_code] = languages.get(lang_code, 0) + signups
+        if day is None:
+            continue
+        month_name = day.replace(day=1).strftime("%B")
+        if month_name in month_counts:
+            month_counts[month_name] += signups
+        day_str = day.strftime("%Y-%m-%d")
+        if day_str in last_7_days:
+            last_7_days[day_str] += signups
 
     # Xabarni tayyorlash
     stats_text = (
         f"📊 *Foydalanuvchi Statistikasi:*\n\n"
-        f"🔹 *Jami foydalanuvchilar:* {all_users}\n\n"
+        f"🔹 *Jami foydalanuvchilar:* {all_users}\n"
+        f"📥 *Jami yuklanmalar:* {all_downloads}\n\n"
         f"📅 *Oxirgi 3 oy:* (Jami {last_3_months} ta)\n"
     )
     for month, count in month_counts.items():
@@ -94,28 +95,32 @@ async def new(message: Message):
     for day, count in last_7_days.items():
         stats_text += f" - {day}: {count} ta\n"
 
+    stats_text += "\n🌐 *Tillar bo'yicha:*\n"
+    for lang_code, count in sorted(languages.items(), key=lambda item: -item[1])[:10]:
+        stats_text += f" - {lang_code}: {count} ta\n"
+
     await message.answer(stats_text, parse_mode="Markdown")
 
 
 # Kanallar bo'limi
-@admin_router.message(F.text == '🔧Kanallar', F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@admin_router.message(F.text == '🔧Kanallar', F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def new(msg: Message):
     await msg.answer("Tanlang", reply_markup=await AdminPanel.admin_channel())
 
 
-@admin_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID), Form.ch_add or Form.ch_delete)
+@admin_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin(), Form.ch_add or Form.ch_delete)
 async def backs(message: Message, state: FSMContext):
     await message.reply("Orqaga qaytildi", reply_markup=await AdminPanel.admin_channel())
     await state.clear()
 
 
-@admin_router.message(F.text == "➕Kanal qo'shish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@admin_router.message(F.text == "➕Kanal qo'shish", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def channel_add(message: Message, state: FSMContext):
     keyboard = []
     keyboard.extend([
         [KeyboardButton(text="🔙Orqaga qaytish")]
     ])
-    await bot.send_message(message.chat.id,
+    await message.bot.send_message(message.chat.id,
                             text="Kanal ulash bo'limi. \nBotga kanal ulashning 3 ta usuli bor:\n"
                                  "1. https://t.me/coder_admin kanal havolasini shu tartibda yuboring.\n"
                                  "2. @coder_admin username ni shu tartibda yuboring",
@@ -124,8 +129,8 @@ async def channel_add(message: Message, state: FSMContext):
     await state.set_state(Form.ch_add)
 
 
-@admin_router.message(Form.ch_add, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def channel_add1(message: Message, state: FSMContext):
+@admin_router.message(Form.ch_add, F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def channel_add1(message: Message, state: FSMContext, tenant: Tenant):
     if message.chat_shared:
         pass
         # try:
@@ -153,19 +158,17 @@ async def channel_add1(message: Message, state: FSMContext):
     elif "https://t.me/" in message.text:
         chat_link = "@"+message.text.split("https://t.me/", 1)[1]
         try:
-            chat = await bot.get_chat(chat_link)
+            chat = await message.bot.get_chat(chat_link)
         except Exception as e:
             print(e)
             await state.clear()
-            await bot.send_message(chat_id=message.chat.id,
+            await message.bot.send_message(chat_id=message.chat.id,
                                    text="Bot kanalga <b>admin emas!</b> yoki havolani qayta ishlashda muammolar bo'lyapti. Iltimos havolani va adminlikni tekshirib qaytadan urining",
                                    reply_markup=await AdminPanel.admin_channel(),
                                    parse_mode="html")
         else:
             channel_id = chat.id
-            sql.execute(f"SELECT chat_id FROM public.mandatorys WHERE chat_id = {channel_id}")
-            data = sql.fetchone()
-            if data is None:
+            if channel_id not in tenant.channels:
                 await message.reply("Kanal username qabul qilindi, endi taklif havolasini yuboring. U https://t.me/+ deb boshlanadi. Buni kanal havolalari bo'limida yaratasiz.", reply_markup=markup)
                 await state.update_data(channel_id=str(channel_id))
                 await state.set_state(Form.for_username)
@@ -175,18 +178,16 @@ async def channel_add1(message: Message, state: FSMContext):
     elif message.text[0] == "@":
         chat_link = "@"+message.text[1:]
         try:
-            chat = await bot.get_chat(chat_link)
+            chat = await message.bot.get_chat(chat_link)
         except Exception:
             await state.clear()
-            await bot.send_message(chat_id=message.chat.id,
+            await message.bot.send_message(chat_id=message.chat.id,
                                    text="Bot kanalga <b>admin emas!</b> yoki havolani qayta ishlashda muammolar bo'lyapti. Iltimos havolani va adminlikni tekshirib qaytadan urining",
                                    reply_markup=await AdminPanel.admin_channel(),
                                    parse_mode="html")
         else:
             channel_id = chat.id
-            sql.execute(f"SELECT chat_id FROM public.mandatorys WHERE chat_id = {channel_id}")
-            data = sql.fetchone()
-            if data is None:
+            if channel_id not in tenant.channels:
                 await message.reply(
                     "Kanal username qabul qilindi, endi taklif havolasini yuboring. U https://t.me/+ deb boshlanadi. Buni kanal havolalari bo'limida yaratasiz.",
                     reply_markup=markup)
@@ -198,13 +199,13 @@ async def channel_add1(message: Message, state: FSMContext):
     else:
         await message.answer("Kanal <b>username</b> yuboring", reply_markup=markup, parse_mode="html")
 
-@admin_router.message(Form.for_username, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def channel_add1(message: Message, state: FSMContext):
+@admin_router.message(Form.for_username, F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def channel_add1(message: Message, state: FSMContext, tenant: Tenant):
     link = message.text
     if "https://t.me/" in link:
         data = await state.get_data()
         channel_id = data["channel_id"]
-        await PanelFunc.channel_add(channel_id, link)
+        await PanelFunc.channel_add(tenant, channel_id, link)
         await state.clear()
         await message.reply("Kanal qo'shildi🎉🎉", reply_markup=await AdminPanel.admin_channel())
     else:
@@ -213,24 +214,22 @@ async def channel_add1(message: Message, state: FSMContext):
             reply_markup=markup)
 
 
-@admin_router.message(F.text == "❌Kanalni olib tashlash", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@admin_router.message(F.text == "❌Kanalni olib tashlash", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def channel_delete(message: Message, state: FSMContext):
     await message.reply("O'chiriladigan kanalning userini yuboring.\nMisol uchun @coder_admin", reply_markup=markup)
     await state.set_state(Form.ch_delete)
 
 
-@admin_router.message(Form.ch_delete, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def channel_delete2(message: Message, state: FSMContext):
-    all_details = await bot.get_chat(message.text)
+@admin_router.message(Form.ch_delete, F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def channel_delete2(message: Message, state: FSMContext, tenant: Tenant):
+    all_details = await message.bot.get_chat(message.text)
     channel_id = all_details.id
-    sql.execute(f"""SELECT chat_id FROM public.mandatorys WHERE chat_id = '{channel_id}'""")
-    data = sql.fetchone()
 
-    if data is None:
+    if channel_id not in tenant.channels:
         await message.reply("Bunday kanal yo'q", reply_markup=await AdminPanel.admin_channel())
     else:
         if message.text[0] == '@':
-            await PanelFunc.channel_delete(channel_id)
+            await PanelFunc.channel_delete(tenant, channel_id)
             await state.clear()
             await message.reply("Kanal muvaffaqiyatli o'chirildi", reply_markup=await AdminPanel.admin_channel())
         else:
@@ -240,9 +239,10 @@ async def channel_delete2(message: Message, state: FSMContext):
     await state.clear()
 
 
-@admin_router.message(F.text == "📋 Kanallar ro'yxati", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def channel_list(message: Message):
-    if len(await PanelFunc.channel_list()) > 3:
-        await message.answer(await PanelFunc.channel_list(), parse_mode='html')
+@admin_router.message(F.text == "📋 Kanallar ro'yxati", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def channel_list(message: Message, tenant: Tenant):
+    text = await PanelFunc.channel_list(tenant)
+    if len(text) > 3:
+        await message.answer(text, parse_mode='html')
     else:
         await message.answer("Hozircha kanallar yo'q")
\ No newline at end of file
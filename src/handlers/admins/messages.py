@@ -1,17 +1,23 @@
 import asyncio
-import os
-import aiofiles
 import logging
-from aiogram import Router, F, Bot
+import math
+import re
+from datetime import datetime
+from typing import List
+from aiogram import Router, F
 from aiogram.enums import ChatType
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from aiogram.types import Message, KeyboardButton, ReplyKeyboardMarkup, BufferedInputFile
-from aiogram.exceptions import (
-    TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
-)
-from config import ADMIN_ID, sql, bot
+from aiogram.types import Message, KeyboardButton, ReplyKeyboardMarkup, CallbackQuery
+from config import CANARY_SAMPLE_SIZE
+from src.db.repository import AccountRepo, BroadcastDraftRepo, BroadcastJobRepo
+from src.db.segments import Segment
+from src.filters.admin import IsAdmin
 from src.keyboards.buttons import AdminPanel
+from src.utils.broadcast import CanaryReport, run_canary
+from src.utils.broadcast_jobs import TASHKENT, broadcast_runner, job_text
+from src.utils.outbound import outbound
+from src.utils.tenants import Tenant
 
 # Logging configuration
 logging.basicConfig(
@@ -26,20 +32,17 @@ logger = logging.getLogger(__name__)
 
 msg_router = Router()
 
-# Semaphore to limit concurrent requests
-semaphore = asyncio.Semaphore(20)
-
-# Files for logging failed users
-FAILED_USERS_FILE = "failed_users.txt"
-TEST_FAILED_COPY_FILE = "test_failed_copy.txt"
-TEST_FAILED_FORWARD_FILE = "test_failed_forward.txt"
+# Albom qismlari va ketma-ket yuborilgan xabarlar bitta xabarnomaga yig'iladi (public.broadcast_drafts orqali)
+COLLECT_WINDOW = 1.5  # sekund: shuncha vaqt yangi xabar kelmasa, yig'ish tugaydi
+DRAFT_MAX_AGE = 60  # sekund: to'xtab qolgan jarayondan qolgan qismlar keyingi xabarnomaga qo'shilmaydi
+MAX_BATCH_MESSAGES = 100  # copyMessages/forwardMessages limiti
 
 # === STATES (FSM) === #
 class MsgState(StatesGroup):
     forward_msg = State()
     send_msg = State()
-    test_copy_msg = State()
-    test_forward_msg = State()
+    segment = State()
+    schedule = State()
 
 # === BACK BUTTON === #
 markup = ReplyKeyboardMarkup(
@@ -47,243 +50,183 @@ markup = ReplyKeyboardMarkup(
     keyboard=[[KeyboardButton(text="🔙Orqaga qaytish")]]
 )
 
-# === LOGGER: Write failed user to file === #
-async def log_failed_user(user_id: int, filename: str):
-    async with aiofiles.open(filename, mode="a") as f:
-        await f.write(f"{user_id}\n")
-    logger.info(f"Failed user {user_id} logged to {filename}")
-
-# === SAFE SEND FUNCTIONS === #
-async def send_copy_safe(user_id: int, message: Message, semaphore: asyncio.Semaphore, is_test: bool = False, test_filename: str = None):
-    async with semaphore:
-        for attempt in range(5):
-            try:
-                sent_msg = await bot.copy_message(
-                    chat_id=user_id,
-                    from_chat_id=message.chat.id,
-                    message_id=message.message_id
-                )
-                if is_test:
-                    await bot.delete_message(chat_id=user_id, message_id=sent_msg.message_id)
-                logger.info(f"Successfully sent copy to user {user_id}")
-                await asyncio.sleep(0.2)  # Minimum delay for copy
-                return True
-            except TelegramRetryAfter as e:
-                logger.warning(f"RetryAfter for user {user_id}: waiting {e.retry_after}s")
-                await asyncio.sleep(e.retry_after + (2 ** attempt))
-            except (TelegramForbiddenError, TelegramNotFound):
-                logger.error(f"User {user_id} blocked or not found")
-                await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                await asyncio.sleep(0.2)
-                return False
-            except TelegramBadRequest as e:
-                if "message to copy not found" in str(e).lower():
-                    logger.error(f"Message to copy not found for user {user_id}")
-                    await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                    await asyncio.sleep(0.2)
-                    return False
-                if attempt < 4:
-                    logger.warning(f"BadRequest for user {user_id}, attempt {attempt + 1}: {e}")
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    logger.error(f"Failed to send copy to user {user_id}: {e}")
-                    await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                    await asyncio.sleep(0.2)
-                    return False
-            except Exception as e:
-                logger.error(f"Unexpected error sending copy to {user_id} (attempt {attempt + 1}): {e}")
-                if attempt < 4:
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                    await asyncio.sleep(0.2)
-                    return False
-        logger.error(f"Failed to send copy to user {user_id} after 5 attempts")
-        await asyncio.sleep(0.2)
-        return False
-
-async def send_forward_safe(user_id: int, message: Message, semaphore: asyncio.Semaphore, is_test: bool = False, test_filename: str = None):
-    async with semaphore:
-        for attempt in range(5):
-            try:
-                sent_msg = await bot.forward_message(
-                    chat_id=user_id,
-                    from_chat_id=message.chat.id,
-                    message_id=message.message_id
-                )
-                if is_test:
-                    await bot.delete_message(chat_id=user_id, message_id=sent_msg.message_id)
-                logger.info(f"Successfully sent forward to user {user_id}")
-                await asyncio.sleep(0.5)  # Minimum delay for forward
-                return True
-            except TelegramRetryAfter as e:
-                logger.warning(f"RetryAfter for user {user_id}: waiting {e.retry_after}s")
-                await asyncio.sleep(e.retry_after + (2 ** attempt))
-            except (TelegramForbiddenError, TelegramNotFound):
-                logger.error(f"User {user_id} blocked or not found")
-                await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                await asyncio.sleep(0.5)
-                return False
-            except TelegramBadRequest as e:
-                if attempt < 4:
-                    logger.warning(f"BadRequest for user {user_id}, attempt {attempt + 1}: {e}")
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    logger.error(f"Failed to send forward to user {user_id}: {e}")
-                    await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                    await asyncio.sleep(0.5)
-                    return False
-            except Exception as e:
-                logger.error(f"Unexpected error sending forward to {user_id} (attempt {attempt + 1}): {e}")
-                if attempt < 4:
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    await log_failed_user(user_id, test_filename if is_test else FAILED_USERS_FILE)
-                    await asyncio.sleep(0.5)
-                    return False
-        logger.error(f"Failed to send forward to user {user_id} after 5 attempts")
-        await asyncio.sleep(0.5)
-        return False
-
-# === BROADCAST FUNCTION === #
-async def broadcast(user_ids: list[int], message: Message, send_func, is_test: bool = False, test_filename: str = None):
-    total = len(user_ids)
-    success = 0
-    failed = 0
-    status_msg = await message.answer("📤 Yuborish boshlandi...")
-    batch_size = 100
-    update_interval = 1000  # Update every 1000 users
-    # For more frequent updates, use update_interval = 100 and increase sleep to 1 second:
-    # update_interval = 100
-
-    # Clear the log file at the start if it exists
-    filename = test_filename if is_test else FAILED_USERS_FILE
-    if os.path.exists(filename):
-        os.remove(filename)
-        logger.info(f"Cleared log file: {filename}")
-
-    for i in range(0, total, batch_size):
-        batch = user_ids[i:i + batch_size]
-        tasks = [send_func(uid, message, semaphore, is_test, test_filename) for uid in batch]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for result in results:
-            if result is True:
-                success += 1
-            else:
-                failed += 1
-
-        # Update progress
-        if (i + batch_size) % update_interval == 0 or (i + batch_size) >= total:
-            try:
-                await status_msg.edit_text(
-                    f"📬 {'Sinov' if is_test else 'Xabar'} yuborilmoqda...\n\n"
-                    f"✅ Yuborilgan: {success} ta\n"
-                    f"❌ Yuborilmagan: {failed} ta\n"
-                    f"📦 Jami: {total} ta\n"
-                    f"📊 Progres: {min(i + batch_size, total)}/{total}"
-                )
-            except Exception as e:
-                logger.error(f"Failed to update status message: {e}")
-
-        # Sleep between batches (optional, as per-user delays are handled in send functions)
-        await asyncio.sleep(0.1)
-        logger.info(f"Processed batch {i//batch_size + 1}/{total//batch_size + 1}")
-
-    # Final status message
-    await message.answer(
-        f"✅ {'Sinov' if is_test else 'Xabar'} yuborildi\n\n"
-        f"📤 Yuborilgan: {success} ta\n"
-        f"❌ Yuborilmagan: {failed} ta",
-        reply_markup=await AdminPanel.admin_msg()
-    )
-    logger.info(f"Broadcast completed: {success} successful, {failed} failed, total: {total}")
-
-    # Send the failed users file if it exists
-    if os.path.exists(filename):
-        async with aiofiles.open(filename, "rb") as f:
-            data = await f.read()
-            file = BufferedInputFile(data, filename)
-            await message.answer_document(
-                file,
-                caption=f"❌ {'Sinov' if is_test else 'Xabar'} yuborishda xato bo‘lgan foydalanuvchilar"
-            )
-            logger.info(f"Sent failed users file: {filename}")
-
-    return success, failed
-
-# === DATABASE PAGINATION === #
-async def get_user_ids_paginated(batch_size: int = 1000):
-    offset = 0
-    user_ids = []
-    while True:
-        sql.execute(f"SELECT user_id FROM public.accounts LIMIT {batch_size} OFFSET {offset}")
-        rows = sql.fetchall()
-        if not rows:
-            break
-        user_ids.extend([row[0] for row in rows])
-        offset += batch_size
-        logger.info(f"Fetched {len(rows)} user IDs at offset {offset}")
-    return user_ids
-
 # === HANDLERS === #
-@msg_router.message(F.text == "✍Xabarlar", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@msg_router.message(F.text == "✍Xabarlar", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def panel_handler(message: Message) -> None:
     await message.answer("Xabarlar bo'limi!", reply_markup=await AdminPanel.admin_msg())
     logger.info(f"Admin {message.from_user.id} accessed messages panel")
 
-@msg_router.message(F.text == "📨Forward xabar yuborish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@msg_router.message(F.text == "📨Forward xabar yuborish", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def start_forward(message: Message, state: FSMContext):
-    await message.answer("Forward yuboriladigan xabarni yuboring", reply_markup=markup)
+    await message.answer("Forward yuboriladigan xabar(lar)ni yuboring — albom yoki bir nechta xabar ham bo'ladi", reply_markup=markup)
     await state.set_state(MsgState.forward_msg)
     logger.info(f"Admin {message.from_user.id} started forward message")
 
-@msg_router.message(MsgState.forward_msg, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def send_forward_to_all(message: Message, state: FSMContext):
-    await state.clear()
-    user_ids = await get_user_ids_paginated()
-    await broadcast(user_ids, message, send_forward_safe)
-    logger.info(f"Admin {message.from_user.id} completed forward broadcast")
+@msg_router.message(MsgState.forward_msg, F.text != "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def send_forward_to_all(message: Message, state: FSMContext, tenant: Tenant):
+    await collect_messages(message, state, tenant, "forward")
 
-@msg_router.message(F.text == "📬Oddiy xabar yuborish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+@msg_router.message(F.text == "📬Oddiy xabar yuborish", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def start_text_send(message: Message, state: FSMContext):
-    await message.answer("Yuborilishi kerak bo'lgan xabarni yuboring", reply_markup=markup)
+    await message.answer("Yuborilishi kerak bo'lgan xabar(lar)ni yuboring — albom yoki bir nechta xabar ham bo'ladi", reply_markup=markup)
     await state.set_state(MsgState.send_msg)
     logger.info(f"Admin {message.from_user.id} started copy message")
 
-@msg_router.message(MsgState.send_msg, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def send_text_to_all(message: Message, state: FSMContext):
-    await state.clear()
-    user_ids = await get_user_ids_paginated()
-    await broadcast(user_ids, message, send_copy_safe)
-    logger.info(f"Admin {message.from_user.id} completed copy broadcast")
-
-@msg_router.message(F.text == "🧪Sinov: Copy yuborish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def test_copy_broadcast(message: Message, state: FSMContext):
-    await message.answer("🧪 Sinov: Oddiy xabarni yuboring (copy), yuboriladi va darhol o‘chiriladi:")
-    await state.set_state(MsgState.test_copy_msg)
-    logger.info(f"Admin {message.from_user.id} started test copy broadcast")
-
-@msg_router.message(MsgState.test_copy_msg, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def handle_test_copy(message: Message, state: FSMContext):
-    await state.clear()
-    user_ids = await get_user_ids_paginated()
-    await broadcast(user_ids, message, send_copy_safe, is_test=True, test_filename=TEST_FAILED_COPY_FILE)
-    logger.info(f"Admin {message.from_user.id} completed test copy broadcast")
+@msg_router.message(MsgState.send_msg, F.text != "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def send_text_to_all(message: Message, state: FSMContext, tenant: Tenant):
+    await collect_messages(message, state, tenant, "copy")
+
+async def collect_messages(message: Message, state: FSMContext, tenant: Tenant, kind: str):
+    """
+    Every message is stored as a draft of the admin's chat; album parts and
+    further messages that arrive within COLLECT_WINDOW of each other form one
+    batch. The handler of the last one (no newer draft after the window) takes
+    the batch, which is broadcast as one copyMessages/forwardMessages call.
+    Drafts live in the DB, so parts handled by different webhook workers
+    still end up in the same batch.
+    """
+    draft_id = await BroadcastDraftRepo.add(tenant.name, message.chat.id, message.message_id)
+    await asyncio.sleep(COLLECT_WINDOW)
+    message_ids = await BroadcastDraftRepo.take_if_latest(tenant.name, message.chat.id, draft_id, DRAFT_MAX_AGE)
+    if not message_ids:
+        return  # keyingi xabar kelgan: to'plamni uning handleri oladi
+    await ask_segment(message, state, kind, message_ids[:MAX_BATCH_MESSAGES])
+
+async def ask_segment(message: Message, state: FSMContext, kind: str, message_ids: List[int]):
+    await state.update_data(kind=kind, from_chat_id=message.chat.id, message_ids=message_ids)
+    await state.set_state(MsgState.segment)
+    await message.answer(
+        f"📦 {len(message_ids)} ta xabar qabul qilindi\n\n"
+        "👥 Kimga yuborilsin?\n\n"
+        "👥 Hammaga tugmasini bosing yoki filtr yozing (bir nechtasini birga ham):\n"
+        "til=ru,en — foydalanuvchi tili\n"
+        "faol=30 — oxirgi 30 kunda botdan foydalanganlar\n"
+        "dan=2024-01-01 gacha=2024-06-30 — ro'yxatdan o'tgan sana",
+        reply_markup=await AdminPanel.segment_menu()
+    )
 
-@msg_router.message(F.text == "🧪Sinov: Forward yuborish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def test_forward_broadcast(message: Message, state: FSMContext):
-    await message.answer("🧪 Sinov: Forward xabar yuboring, darhol o‘chiriladi:")
-    await state.set_state(MsgState.test_forward_msg)
-    logger.info(f"Admin {message.from_user.id} started test forward broadcast")
+@msg_router.message(MsgState.segment, F.text != "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def choose_segment(message: Message, state: FSMContext, tenant: Tenant):
+    try:
+        segment = Segment() if message.text == "👥 Hammaga" else Segment.parse(message.text or "")
+    except ValueError as e:
+        await message.answer(f"❗ {e}")
+        return
+    total = await AccountRepo.count_reachable(tenant.name, segment)
+    if not total:
+        await message.answer(f"❗ {segment.describe()}: mos foydalanuvchi yo'q. Boshqa filtr yozing.")
+        return
+    await state.update_data(segment=segment.to_json(), total=total)
+    await message.answer(f"👥 {segment.describe()}: {total} ta foydalanuvchi")
+    await ask_schedule(message, state)
+
+async def ask_schedule(message: Message, state: FSMContext):
+    await state.set_state(MsgState.schedule)
+    await message.answer(
+        "🕒 Qachon yuborilsin?\n\n"
+        "🚀 Hozir tugmasini bosing yoki vaqtni YYYY-MM-DD HH:MM ko'rinishida yuboring (Toshkent vaqti).\n"
+        f"🧪 Sinov — avval {CANARY_SAMPLE_SIZE} ta tasodifiy foydalanuvchiga yuborib, darhol o'chiradi "
+        "(hajmni o'zingiz bering: 🧪 500 yoki 🧪 2%).",
+        reply_markup=await AdminPanel.schedule_menu()
+    )
 
-@msg_router.message(MsgState.test_forward_msg, F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
-async def handle_test_forward(message: Message, state: FSMContext):
+def canary_text(report: CanaryReport, total: int) -> str:
+    stats = report.stats
+    lines = [
+        f"🧪 Sinov natijasi ({stats.processed} ta namuna)\n",
+        f"✅ Yetkazildi: {stats.success} ta",
+        f"❌ Xato: {stats.failed} ta ({report.failure_ratio:.1%})",
+    ]
+    lines += [f"   • {kind}: {count}" for kind, count in report.errors.most_common(5)]
+    eta = report.eta_seconds(total)
+    lines += [
+        f"⏱ Kechikish: p50 {report.latency(0.5):.0f} ms, p95 {report.latency(0.95):.0f} ms",
+        f"⚡ Tezlik: {stats.rate:.1f} xabar/s",
+        f"\n📈 To'liq yuborish ({total} ta): ~{eta / 60:.0f} daqiqa, ~{report.expected_failures(total)} ta xato kutiladi",
+    ]
+    return "\n".join(lines)
+
+@msg_router.message(MsgState.schedule, F.text.startswith("🧪"), F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def canary_broadcast(message: Message, state: FSMContext, tenant: Tenant):
+    data = await state.get_data()
+    segment, total = Segment.from_json(data["segment"]), data["total"]
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(%?)", message.text)
+    if not match:
+        size = CANARY_SAMPLE_SIZE
+    elif match.group(2):
+        size = math.ceil(total * min(float(match.group(1)), 100) / 100)
+    else:
+        size = int(float(match.group(1)))
+    size = max(1, min(size, total))
+
+    status_msg = await message.answer(f"🧪 Sinov: {size} ta namunaga yuborilmoqda...")
+    user_ids = await AccountRepo.sample_user_ids(tenant.name, segment, size, total)
+    report = await run_canary(tenant, data["kind"], data["from_chat_id"], data["message_ids"], user_ids)
+    # Sinovda topilgan bloklaganlar endi hisobga kirmaydi
+    total = await AccountRepo.count_reachable(tenant.name, segment)
+    await state.update_data(total=total)
+    outbound.edit_status(status_msg, canary_text(report, total))
+    logger.info(f"Admin {message.from_user.id} canary {data['kind']} on {len(user_ids)} users: "
+                f"{report.stats.success} ok, {report.stats.failed} failed, {report.stats.rate:.1f} msg/s")
+
+@msg_router.message(MsgState.schedule, F.text != "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def schedule_broadcast(message: Message, state: FSMContext, tenant: Tenant):
+    if message.text == "🚀 Hozir":
+        scheduled_at = datetime.now(TASHKENT)
+    else:
+        try:
+            scheduled_at = TASHKENT.localize(datetime.strptime((message.text or "").strip(), "%Y-%m-%d %H:%M"))
+        except ValueError:
+            await message.answer("❗ Vaqt formati noto'g'ri. Masalan: 2025-01-31 20:00")
+            return
+        if scheduled_at < datetime.now(TASHKENT):
+            await message.answer("❗ Bu vaqt o'tib ketgan. Kelajakdagi vaqtni kiriting yoki 🚀 Hozir ni bosing.")
+            return
+
+    data = await state.get_data()
     await state.clear()
-    user_ids = await get_user_ids_paginated()
-    await broadcast(user_ids, message, send_forward_safe, is_test=True, test_filename=TEST_FAILED_FORWARD_FILE)
-    logger.info(f"Admin {message.from_user.id} completed test forward broadcast")
-
-@msg_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, F.from_user.id.in_(ADMIN_ID))
+    await message.answer("✅ Xabarnoma navbatga qo'yildi", reply_markup=await AdminPanel.admin_msg())
+    status_msg = await message.answer("⏳")
+    job_id = await BroadcastJobRepo.create(
+        tenant.name, data["kind"], data["from_chat_id"], data["message_ids"], Segment.from_json(data["segment"]), scheduled_at,
+        message.from_user.id, data["total"], status_msg.chat.id, status_msg.message_id,
+    )
+    job = await BroadcastJobRepo.get(job_id)
+    outbound.edit_status(status_msg, job_text(job), reply_markup=AdminPanel.broadcast_controls(job_id, job["status"]))
+    broadcast_runner.wake()
+    logger.info(f"Admin {message.from_user.id} scheduled {data['kind']} broadcast #{job_id} at {scheduled_at}")
+
+@msg_router.message(F.text == "📋 Xabarnomalar", F.chat.type == ChatType.PRIVATE, IsAdmin())
+async def list_broadcasts(message: Message, tenant: Tenant):
+    jobs = await BroadcastJobRepo.recent(tenant.name, 5)
+    if not jobs:
+        await message.answer("Hali xabarnomalar yo'q")
+        return
+    for job in reversed(jobs):
+        await message.answer(job_text(job), reply_markup=AdminPanel.broadcast_controls(job["id"], job["status"]))
+
+@msg_router.callback_query(F.data.startswith("bc:"), IsAdmin())
+async def control_broadcast(call: CallbackQuery, tenant: Tenant):
+    _, action, job_id = call.data.split(":")
+    job_id = int(job_id)
+    actions = {"pause": BroadcastJobRepo.pause, "resume": BroadcastJobRepo.resume, "cancel": BroadcastJobRepo.cancel}
+    job = await BroadcastJobRepo.get(job_id)
+    # Boshqa botning xabarnomasini boshqarib bo'lmaydi
+    if action not in actions or not job or job["tenant"] != tenant.name:
+        await call.answer()
+        return
+    changed = await actions[action](job_id)
+    if changed and action == "resume":
+        broadcast_runner.wake()
+    elif changed:
+        broadcast_runner.interrupt(job_id)
+    job = await BroadcastJobRepo.get(job_id)
+    await call.answer("✅ Bajarildi" if changed else "Holat allaqachon o'zgargan")
+    if job:
+        outbound.edit_status(call.message, job_text(job), reply_markup=AdminPanel.broadcast_controls(job_id, job["status"]))
+    logger.info(f"Admin {call.from_user.id} {action} broadcast #{job_id}: {'ok' if changed else 'no-op'}")
+
+@msg_router.message(F.text == "🔙Orqaga qaytish", F.chat.type == ChatType.PRIVATE, IsAdmin())
 async def back_to_menu(message: Message, state: FSMContext):
     await state.clear()
     await message.answer("Orqaga qaytildi", reply_markup=await AdminPanel.admin_msg())
@@ -1,4 +1,19 @@
+import json
+
 from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from src.utils.invalidation import invalidation_bus
+from src.utils.membership import is_member, membership
+from src.utils.tenants import Tenant
 
 channel_router = Router()
-# some code...
\ No newline at end of file
+
+
+# Bot admin bo'lgan majburiy kanallarda kimdir qo'shilsa/chiqsa, kesh darhol yangilanadi
+@channel_router.chat_member()
+async def mandatory_member_changed(event: ChatMemberUpdated, tenant: Tenant):
+    if event.chat.id in tenant.channels:
+        user_id, member = event.new_chat_member.user.id, is_member(event.new_chat_member)
+        membership.set(user_id, event.chat.id, member)
+        await invalidation_bus.publish("membership", json.dumps([user_id, event.chat.id, member]))
@@ -2,7 +2,6 @@ from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 
-from config import bot
 from src.keyboards.buttons import UserPanels
 
 other_router = Router()
@@ -24,6 +23,6 @@ async def handle_hello(callback: CallbackQuery):
         await callback.message.delete()
     except Exception as e:
         try:
-            await bot.delete_message(chat_id=callback.from_user.id, message_id=callback.inline_message_id )
+            await callback.bot.delete_message(chat_id=callback.from_user.id, message_id=callback.inline_message_id )
         except:
             pass
\ No newline at end of file
@@ -1,7 +1,7 @@
 from aiogram import types
 from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardButton, KeyboardButton, InlineKeyboardMarkup
 
-from config import sql, bot
+from src.utils.tenants import Tenant
 
 
 class AdminPanel:
@@ -65,10 +65,7 @@ class AdminPanel:
                     KeyboardButton(text="📬Oddiy xabar yuborish"),
                 ],
                 [
-                    KeyboardButton(text="🧪Sinov: Copy yuborish"),
-                    KeyboardButton(text="🧪Sinov: Forward yuborish")
-                ],
-                [
+                    KeyboardButton(text="📋 Xabarnomalar"),
                     KeyboardButton(text="🔙Orqaga qaytish"),
                 ]
             ],
@@ -76,24 +73,44 @@ class AdminPanel:
         )
         return admin_channel
 
+    @staticmethod
+    def broadcast_controls(job_id: int, status: str):
+        """Pause/resume/cancel buttons of a broadcast job (none once it is finished)."""
+        row = []
+        if status in ("scheduled", "running"):
+            row.append(InlineKeyboardButton(text="⏸ To'xtatish", callback_data=f"bc:pause:{job_id}"))
+        elif status == "paused":
+            row.append(InlineKeyboardButton(text="▶️ Davom ettirish", callback_data=f"bc:resume:{job_id}"))
+        else:
+            return None
+        row.append(InlineKeyboardButton(text="⛔ Bekor qilish", callback_data=f"bc:cancel:{job_id}"))
+        return InlineKeyboardMarkup(inline_keyboard=[row])
+
+    @staticmethod
+    async def segment_menu():
+        return ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text="👥 Hammaga")],
+                [KeyboardButton(text="🔙Orqaga qaytish")],
+            ],
+            resize_keyboard=True,
+        )
+
+    @staticmethod
+    async def schedule_menu():
+        return ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text="🚀 Hozir"), KeyboardButton(text="🧪 Sinov")],
+                [KeyboardButton(text="🔙Orqaga qaytish")],
+            ],
+            resize_keyboard=True,
+        )
+
 
 class UserPanels:
     @staticmethod
-    async def join_btn(user_id):
-        sql.execute("SELECT chat_id FROM public.mandatorys")
-        rows = sql.fetchall()
-        join_inline = []
-        title = 1
-        for row in rows:
-            all_details = await bot.get_chat(chat_id=row[0])
-            url = all_details.invite_link
-            if not url:
-                url = await bot.export_chat_invite_link(row[0])
-            join_inline.append([InlineKeyboardButton(text=f"{title} - kanal", url=url)])
-            title += 1
-        join_inline.append([InlineKeyboardButton(text="✅Obuna bo'ldim", callback_data="check")])
-        button = InlineKeyboardMarkup(inline_keyboard=join_inline)
-        return button
+    async def join_btn(tenant: Tenant):
+        return tenant.channels.join_keyboard(tenant.channels.chat_ids())
 
 
     @staticmethod
@@ -4,94 +4,72 @@ from aiogram import Bot
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, User, FSInputFile, Message
 
-from config import sql, db, bot, ADMIN_ID
+from src.db.repository import ChannelRepo, AdminRepo
+from src.utils.chat_info import chat_info
+from src.utils.invalidation import invalidation_bus
+from src.utils.membership import membership
+from src.utils.tenants import Tenant
 
 
 class CheckData:
     @staticmethod
-    async def check_member(bot: Bot, user_id: int):
-        sql.execute("SELECT chat_id FROM public.mandatorys")
-        mandatory = sql.fetchall()
-        if not mandatory:
+    async def check_member(tenant: Tenant, user_id: int, fresh: bool = False):
+        mandatory = tenant.channels.chat_ids()
+        if not mandatory or tenant.is_admin(user_id):
             return True, []
 
-        channels = []
-        for chat_id in mandatory:
-            try:
-                r = await bot.get_chat_member(chat_id=chat_id[0], user_id=user_id)
-                if r.status == "left" and user_id not in ADMIN_ID:
-                    channels.append(chat_id[0])
-                print(channels)
-            except Exception as e:
-                print(f"Xatolik: {e}")
+        channels = await membership.missing_channels(tenant.bot, user_id, mandatory, fresh=fresh)
         return (len(channels) == 0), channels
 
     @staticmethod
-    async def channels_btn(channels: list):
-        keyboard = []
-        for index, channel_id in enumerate(channels, 1):
-            sql.execute("SELECT username FROM public.mandatorys WHERE chat_id=%s", (channel_id,))
-            link = sql.fetchone()
-            if link:
-                keyboard.append([
-                    InlineKeyboardButton(
-                        text=f"📢 Kanal-{index}",
-                        url=link[0]
-                    )
-                ])
-        keyboard.append([InlineKeyboardButton(text="✅Qo'shildim", callback_data="check")])
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+    async def channels_btn(tenant: Tenant, channels: list):
+        return tenant.channels.join_keyboard(channels)
 
 
 class PanelFunc:
     @staticmethod
-    async def channel_add(chat_id, link):
-        sql.execute(f"INSERT INTO public.mandatorys( chat_id, username ) VALUES({chat_id}, '{link}');")
-        db.commit()
+    async def channel_add(tenant: Tenant, chat_id, link):
+        await ChannelRepo.add(tenant.name, int(chat_id), link)
+        await tenant.channels.load()
+        await invalidation_bus.publish("channels", tenant.name)
 
     @staticmethod
-    async def channel_delete(id):
-        sql.execute(f'''DELETE FROM public.mandatorys WHERE chat_id = '{id}' ''')
-        db.commit()
+    async def channel_delete(tenant: Tenant, id):
+        await ChannelRepo.delete(tenant.name, int(id))
+        await tenant.channels.load()
+        await invalidation_bus.publish("channels", tenant.name)
 
     @staticmethod
-    async def channel_list():
-        sql.execute("SELECT chat_id, username from public.mandatorys")
+    async def channel_list(tenant: Tenant):
         str = ''
-        for row in sql.fetchall():
-            chat_id = row[0]
-            try:
-                all_details = await bot.get_chat(chat_id=chat_id)
-                title = all_details.title
-                channel_id = all_details.id
-                channel_id = row[1]
-                info = all_details.description
-                str += f"------------------------------------------------\nKanal useri: > @{all_details.username}\nKamal nomi: > {title}\nKanal id si: > {channel_id}\nKanal haqida: > {info}\n"
-            except Exception as e:
-                str += f"Kanalni admin qiling\n\nError: {e}"
+        chats = await chat_info.get_many(tenant.bot, tenant.channels.chat_ids())
+        for chat_id, all_details in chats.items():
+            if isinstance(all_details, Exception):
+                str += f"Kanalni admin qiling\n\nError: {all_details}"
+                continue
+            title = all_details.title
+            channel_id = tenant.channels.link(chat_id)
+            info = all_details.description
+            str += f"------------------------------------------------\nKanal useri: > @{all_details.username}\nKamal nomi: > {title}\nKanal id si: > {channel_id}\nKanal haqida: > {info}\n"
         return str
 
     @staticmethod
-    async def admin_add(chat_id):
-        sql.execute(f"INSERT INTO public.admins( user_id ) VALUES({chat_id});")
-        db.commit()
+    async def admin_add(tenant: Tenant, chat_id):
+        await AdminRepo.add(tenant.name, int(chat_id))
 
     @staticmethod
-    async def admin_delete(id):
-        sql.execute(f'''DELETE FROM public.admins WHERE user_id = '{id}' ''')
-        db.commit()
+    async def admin_delete(tenant: Tenant, id):
+        await AdminRepo.delete(tenant.name, int(id))
 
     @staticmethod
-    async def admin_list():
-        sql.execute("SELECT user_id from public.admins")
+    async def admin_list(tenant: Tenant):
         str = ""
-        for row in sql.fetchall():
-            chat_id = row[0]
-            try:
-                user: User = await bot.get_chat(chat_id)
-                username = f"@{user.username}" if user.username else "❌ Topilmadi"
-                full_name = user.full_name
-                str += f"👤 Foydalanuvchi:\n🔹 Ism: {full_name}\n🔹 Username: {username}\n🔹 ID: <code>{user.id}</code>\n\n"
-            except Exception as e:
+        users = await chat_info.get_many(tenant.bot, await AdminRepo.user_ids(tenant.name))
+        for chat_id, user in users.items():
+            if isinstance(user, Exception):
                 str += f"xatolik:\n" + f"🔹 ID: <code>{chat_id}</code>\n\n"
+                continue
+            username = f"@{user.username}" if user.username else "❌ Topilmadi"
+            full_name = user.full_name
+            str += f"👤 Foydalanuvchi:\n🔹 Ism: {full_name}\n🔹 Username: {username}\n🔹 ID: <code>{user.id}</code>\n\n"
         return str
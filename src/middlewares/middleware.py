@@ -1,36 +1,39 @@
 from aiogram.types import Update
 from aiogram.dispatcher.middlewares.base import BaseMiddleware
-import psycopg2
 from datetime import datetime
 import pytz
-from config import DB_CONFIG
+
+from src.db.write_behind import account_buffer
+from src.utils.tenants import tenants
+
+
+class TenantMiddleware(BaseMiddleware):
+    # Update qaysi botga kelgan bo'lsa, o'sha botning sozlamalari (kanallar, adminlar, imzo)
+    async def __call__(self, handler, event: Update, data: dict):
+        data["tenant"] = tenants.for_bot(data["bot"])
+        return await handler(event, data)
+
 
 class RegisterUserMiddleware(BaseMiddleware):
     async def __call__(self, handler, event: Update, data: dict):
-        if not event.message:
+        if not event.message or not event.message.from_user:
             return await handler(event, data)  # Middleware davom etsin
 
         user = event.message.from_user
         user_id = user.id
-        date = datetime.now(pytz.timezone("Asia/Tashkent")).date()
-        lang_code = user.language_code if user.language_code else "uz"
-
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-
-        # **1️⃣ SQL Injection xavfsizligi uchun f-string emas, parametr ishlatilmoqda**
-        cur.execute("SELECT user_id FROM public.accounts WHERE user_id = %s", (user_id,))
-        if not cur.fetchone():  # Foydalanuvchi bazada bo‘lmasa
-            cur.execute("DELETE FROM public.accounts WHERE user_id = %s", (user_id,))
-            conn.commit()
-
-            cur.execute(
-                "INSERT INTO accounts (user_id, lang_code, date) VALUES (%s, %s, %s)",
-                (user_id, lang_code, date)
-            )
-            conn.commit()
+        tenant = data["tenant"]
 
-        cur.close()
-        conn.close()
+        # Ko'p holatda foydalanuvchi allaqachon bor: bazaga umuman murojaat qilinmaydi
+        if user_id not in tenant.known_users:
+            date = datetime.now(pytz.timezone("Asia/Tashkent")).date()
+            lang_code = user.language_code if user.language_code else "uz"
+            account_buffer.add(tenant.name, user_id, lang_code, date)  # bazaga batch bilan yoziladi
+            tenant.known_users.add(user_id)
+        else:
+            account_buffer.touch(tenant.name, user_id)  # segmentlar uchun oxirgi faollik
+        if user_id in tenant.blocked_users:
+            # Bloklagan foydalanuvchi qaytdi: yana xabarnomalar oladi
+            account_buffer.set_blocked(tenant.name, user_id, False)
+            tenant.blocked_users.discard(user_id)
 
-        return await handler(event, data)  # **2️⃣ Xatolik tuzatildi, middleware davom etadi**
\ No newline at end of file
+        return await handler(event, data)  # **2️⃣ Xatolik tuzatildi, middleware davom etadi**
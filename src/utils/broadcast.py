@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+
+from config import BROADCAST_RATE, BROADCAST_WORKERS, SENDING_PROCESSES
+from src.db.write_behind import account_buffer
+from src.utils.metrics import metrics
+from src.utils.outbound import OutboundScheduler, TokenBucket, outbound
+from src.utils.tenants import Tenant
+
+log = logging.getLogger("broadcast")
+
+PROGRESS_INTERVAL = 5  # sekund
+SEND_ATTEMPTS = 5
+
+T = TypeVar("T")
+
+
+def mark_blocked(tenant: Tenant, user_id: int):
+    """Exclude the user from future broadcasts until they write to the bot again."""
+    account_buffer.set_blocked(tenant.name, user_id, True)
+    tenant.blocked_users.add(user_id)
+    metrics.counter("broadcast.blocked").inc()
+
+
+async def deliver(tenant: Tenant, kind: str, user_id: int, from_chat_id: int, message_ids: List[int],
+                  delete: bool = False) -> Optional[str]:
+    """
+    Copy or forward the broadcast message(s) to one user; several messages
+    (ascending ids, at most 100) go out in one copyMessages/forwardMessages call.
+    Returns None when delivered, otherwise the reason it was given up on.
+    Pacing and RetryAfter are handled by the engine bucket and the outbound scheduler.
+    """
+    bot = tenant.bot
+    error = None
+    for attempt in range(SEND_ATTEMPTS):
+        try:
+            if len(message_ids) == 1:
+                send = bot.copy_message if kind == "copy" else bot.forward_message
+                sent = await send(chat_id=user_id, from_chat_id=from_chat_id, message_id=message_ids[0])
+                sent_ids = [sent.message_id]
+            else:
+                # Albom / bir nechta xabar: bitta so'rov, albomlar guruhlanganicha qoladi
+                send = bot.copy_messages if kind == "copy" else bot.forward_messages
+                sent = await send(chat_id=user_id, from_chat_id=from_chat_id, message_ids=message_ids)
+                sent_ids = [m.message_id for m in sent]
+            log.info(f"Successfully sent {kind} to user {user_id}")
+            break
+        except TelegramRetryAfter as e:
+            # Bucket allaqachon global to'xtatilgan — navbat kelganda qayta urinamiz
+            log.warning(f"RetryAfter for user {user_id}: {e.retry_after}s")
+            error = str(e)
+        except (TelegramForbiddenError, TelegramNotFound) as e:
+            log.error(f"User {user_id} blocked or not found")
+            mark_blocked(tenant, user_id)
+            return str(e)
+        except TelegramBadRequest as e:
+            if "chat not found" in str(e).lower():
+                log.error(f"Chat of user {user_id} not found")
+                mark_blocked(tenant, user_id)
+                return str(e)
+            if "message to copy not found" in str(e).lower():
+                log.error(f"Message to copy not found for user {user_id}")
+                return str(e)
+            log.warning(f"BadRequest for user {user_id}, attempt {attempt + 1}: {e}")
+            error = str(e)
+            if attempt < SEND_ATTEMPTS - 1:
+                await asyncio.sleep(2 ** attempt)
+        except Exception as e:
+            log.error(f"Unexpected error sending {kind} to {user_id} (attempt {attempt + 1}): {e}")
+            error = str(e)
+            if attempt < SEND_ATTEMPTS - 1:
+                await asyncio.sleep(2 ** attempt)
+    else:
+        log.error(f"Failed to send {kind} to user {user_id} after {SEND_ATTEMPTS} attempts")
+        return error
+    if delete:
+        # O'chirish qayta urinish siklidan tashqarida: uning xatosi xabarni qayta yubormaydi
+        try:
+            await bot.delete_messages(chat_id=user_id, message_ids=sent_ids)
+        except Exception as e:
+            log.error(f"Failed to delete canary {kind} for user {user_id}: {e}")
+    return None
+
+
+class BroadcastStats:
+    def __init__(self):
+        self.success = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.success + self.failed
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class BroadcastEngine:
+    """
+    Sliding-window broadcast: `workers` tasks pull recipients from a bounded
+    queue and each send takes a token from one shared bucket, so a slow send
+    only occupies its own worker. The bucket is linked to the outbound
+    scheduler (`scheduler`, the process-wide ``outbound`` by default), which
+    pauses it for everyone when Telegram answers RetryAfter to `bot`.
+
+    Setting `stop` ends the run early: sends already in flight complete,
+    queued recipients are dropped without being passed to `send`.
+    """
+
+    def __init__(self, rate: float, workers: int, scheduler: OutboundScheduler = outbound):
+        self.rate = rate
+        self.workers = workers
+        self.scheduler = scheduler
+
+    async def run(self, bot: Bot, recipients: AsyncIterator[T], send: Callable[[T], Awaitable[bool]],
+                  on_progress: Optional[Callable[[BroadcastStats], None]] = None,
+                  stop: Optional[asyncio.Event] = None) -> BroadcastStats:
+        bucket = TokenBucket(self.rate, 1)  # burstsiz, tekis oqim
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        stats = BroadcastStats()
+        last_progress = time.monotonic()
+
+        def stopped() -> bool:
+            return stop is not None and stop.is_set()
+
+        async def produce():
+            try:
+                async for item in recipients:
+                    if stopped():
+                        break
+                    await queue.put(item)
+            finally:
+                for _ in range(self.workers):
+                    await queue.put(None)
+
+        async def work():
+            nonlocal last_progress
+            while (item := await queue.get()) is not None:
+                if stopped():
+                    continue  # navbatni bo'shatamiz, producer to'siqda qolmasin
+                await bucket.acquire()
+                if stopped():
+                    continue
+                started = time.perf_counter()
+                try:
+                    ok = await send(item)
+                except Exception as e:
+                    log.error(f"Broadcast send to {item} crashed: {e}")
+                    ok = False
+                metrics.histogram("broadcast.send_latency_ms").observe((time.perf_counter() - started) * 1000)
+                if ok:
+                    stats.success += 1
+                    metrics.counter("broadcast.sent").inc()
+                else:
+                    stats.failed += 1
+                    metrics.counter("broadcast.failed").inc()
+                if on_progress and time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    on_progress(stats)
+
+        self.scheduler.linked_buckets[bot.id].add(bucket)
+        producer = asyncio.create_task(produce())
+        try:
+            await asyncio.gather(*(work() for _ in range(self.workers)))
+            await producer
+        finally:
+            producer.cancel()
+            self.scheduler.linked_buckets[bot.id].discard(bucket)
+        metrics.gauge("broadcast.last_rate").set(round(stats.rate, 2))
+        log.info(f"Broadcast finished: {stats.success} ok, {stats.failed} failed, {stats.rate:.1f} msg/s")
+        return stats
+
+
+class CanaryReport:
+    """Outcome of a sampled send, extrapolated to the full audience."""
+
+    def __init__(self, sample_size: int):
+        self.sample_size = sample_size
+        self.latencies: List[float] = []  # ms, yuborish + o'chirish
+        self.errors: Counter = Counter()
+        self.stats = BroadcastStats()
+
+    @property
+    def failure_ratio(self) -> float:
+        return self.stats.failed / self.stats.processed if self.stats.processed else 0.0
+
+    def latency(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def eta_seconds(self, total: int) -> float:
+        return total / self.stats.rate if self.stats.rate else 0.0
+
+    def expected_failures(self, total: int) -> int:
+        return round(total * self.failure_ratio)
+
+
+def _error_kind(error: str) -> str:
+    # "Telegram server says - Forbidden: bot was blocked by the user" -> "Forbidden: bot was ..."
+    return error.split(" - ", 1)[-1][:80]
+
+
+async def run_canary(tenant: Tenant, kind: str, from_chat_id: int, message_ids: List[int], user_ids: List[int]) -> CanaryReport:
+    """
+    Send to a small sample through the normal engine and delete right away,
+    measuring throughput, latency and the error mix.
+    """
+    report = CanaryReport(len(user_ids))
+
+    async def recipients():
+        for user_id in user_ids:
+            yield user_id
+
+    async def send(user_id: int) -> bool:
+        started = time.perf_counter()
+        error = await deliver(tenant, kind, user_id, from_chat_id, message_ids, delete=True)
+        report.latencies.append((time.perf_counter() - started) * 1000)
+        if error is not None:
+            report.errors[_error_kind(error)] += 1
+        return error is None
+
+    report.stats = await broadcast_engine.run(tenant.bot, recipients(), send)
+    return report
+
+
+# Jarayonning global ulushiga mos: oddiy javoblarga ham joy qoladi
+broadcast_engine = BroadcastEngine(BROADCAST_RATE / SENDING_PROCESSES, BROADCAST_WORKERS)
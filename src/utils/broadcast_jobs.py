@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Set
+
+import pytz
+from aiogram.types import BufferedInputFile
+
+from src.db.repository import AccountRepo, BroadcastJobRepo
+from src.db.segments import Segment
+from src.keyboards.buttons import AdminPanel
+from src.utils.broadcast import BroadcastStats, broadcast_engine, deliver
+from src.utils.outbound import outbound
+from src.utils.tenants import Tenant, tenants
+
+log = logging.getLogger("broadcast-jobs")
+
+POLL_INTERVAL = 5  # sekund: rejalashtirilgan vaqti kelgan ishlarni tekshirish
+CHECKPOINT_ROWS = 500
+CHECKPOINT_INTERVAL = 2  # sekund
+LEASE_SECONDS = 60  # jarayon o'lsa, shuncha vaqtdan keyin ishni boshqasi oladi
+FAILED_PAGE_SIZE = 10_000
+
+STATUS_LABELS = {
+    "scheduled": "🗓 Rejalashtirilgan",
+    "running": "📬 Yuborilmoqda",
+    "paused": "⏸ To'xtatilgan",
+    "cancelled": "⛔ Bekor qilingan",
+    "done": "✅ Yakunlangan",
+}
+TASHKENT = pytz.timezone("Asia/Tashkent")
+
+
+def job_text(job) -> str:
+    processed = job["sent"] + job["failed"]
+    return (
+        f"{STATUS_LABELS.get(job['status'], job['status'])} — xabarnoma #{job['id']} ({job['kind']})\n\n"
+        f"👥 Kimga: {Segment.from_json(job['segment']).describe()}\n"
+        f"🕒 Boshlanish: {job['scheduled_at'].astimezone(TASHKENT):%Y-%m-%d %H:%M}\n"
+        f"✅ Yuborilgan: {job['sent']} ta\n"
+        f"❌ Yuborilmagan: {job['failed']} ta\n"
+        f"📊 Progres: {processed}/{job['total']}"
+    )
+
+
+class _Checkpoint:
+    """
+    Progress of the running job that is not yet in the DB.
+
+    Recipients are issued in accounts.id order but finish out of order, so the
+    watermark is the longest finished prefix of what was issued; ids finished
+    beyond it are stored as ``done_ahead`` and skipped on resume.
+    """
+
+    def __init__(self, job):
+        self.watermark = job["last_account_id"]
+        self.done_ahead: Set[int] = set(job["done_ahead"])
+        self.issued: Deque[int] = deque()
+        self.sent = 0
+        self.failed = 0
+        self.failures: List[tuple] = []
+
+    @property
+    def pending_rows(self) -> int:
+        return self.sent + self.failed
+
+    def issue(self, account_id: int):
+        self.issued.append(account_id)
+
+    def record(self, account_id: int, user_id: int, error: Optional[str]):
+        self.done_ahead.add(account_id)
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+            self.failures.append((account_id, user_id, error[:500]))
+
+    async def flush(self, job_id: int) -> Optional[str]:
+        while self.issued and self.issued[0] in self.done_ahead:
+            self.watermark = self.issued.popleft()
+            self.done_ahead.discard(self.watermark)
+        # Oldingi ishga tushirishdan qolgan, watermark ortda qolgan idlar kerak emas
+        self.done_ahead = {i for i in self.done_ahead if i > self.watermark}
+        sent, failed, failures = self.sent, self.failed, self.failures
+        self.sent, self.failed, self.failures = 0, 0, []
+        try:
+            return await BroadcastJobRepo.checkpoint(
+                job_id, sent, failed, self.watermark, sorted(self.done_ahead), failures, LEASE_SECONDS)
+        except Exception:
+            self.sent += sent
+            self.failed += failed
+            self.failures = failures + self.failures
+            raise
+
+
+class BroadcastJobRunner:
+    """
+    Background loop that runs broadcast jobs stored in public.broadcast_jobs.
+
+    Progress is checkpointed every ``CHECKPOINT_ROWS`` results or
+    ``CHECKPOINT_INTERVAL`` seconds, so after a restart a job continues where
+    it stopped; only sends made after the last checkpoint of a crashed process
+    can be repeated. Pause and cancel are plain status updates that the runner
+    picks up at its next checkpoint (immediately when made in this process).
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._current_id: Optional[int] = None
+        self._current_stop: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        self._wakeup.set()
+
+    def interrupt(self, job_id: int):
+        """Stop the job if it is running here (after a pause/cancel from the admin panel)."""
+        if self._current_id == job_id and self._current_stop:
+            self._current_stop.set()
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._current_stop:
+            self._current_stop.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                job = await BroadcastJobRepo.claim_next(LEASE_SECONDS, tenants.names())
+            except Exception as e:
+                log.error(f"Claiming broadcast job failed: {e}")
+                job = None
+            if job:
+                try:
+                    await self._execute(job)
+                except Exception as e:
+                    log.error(f"Broadcast job #{job['id']} crashed: {e}")
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            self._wakeup.clear()
+
+    async def _execute(self, job):
+        job_id = job["id"]
+        # claim_next() faqat shu jarayondagi tenantlarning ishlarini beradi
+        tenant = tenants.get(job["tenant"])
+        log.info(f"Running {tenant.name} broadcast job #{job_id} from account {job['last_account_id']}")
+        checkpoint = _Checkpoint(job)
+        stop = asyncio.Event()
+        self._current_id, self._current_stop = job_id, stop
+        status = "running"
+        base_sent, base_failed = job["sent"], job["failed"]
+
+        def progress(stats: BroadcastStats) -> dict:
+            return {**dict(job), "status": status,
+                    "sent": base_sent + stats.success, "failed": base_failed + stats.failed}
+
+        def show(state: dict):
+            if job["status_chat_id"]:
+                outbound.edit_status_by_id(
+                    tenant.bot, job["status_chat_id"], job["status_message_id"], job_text(state),
+                    reply_markup=AdminPanel.broadcast_controls(job_id, state["status"]))
+
+        async def recipients():
+            async for account_id, user_id in AccountRepo.stream_accounts(
+                    tenant.name, checkpoint.watermark, sorted(checkpoint.done_ahead),
+                    Segment.from_json(job["segment"])):
+                checkpoint.issue(account_id)
+                yield account_id, user_id
+
+        async def send(item) -> bool:
+            account_id, user_id = item
+            error = await deliver(tenant, job["kind"], user_id, job["from_chat_id"], job["message_ids"])
+            checkpoint.record(account_id, user_id, error)
+            if checkpoint.pending_rows >= CHECKPOINT_ROWS:
+                flush_now.set()
+            return error is None
+
+        async def save():
+            nonlocal status
+            try:
+                stored = await checkpoint.flush(job_id)
+            except Exception as e:
+                log.error(f"Broadcast job #{job_id} checkpoint failed, will retry: {e}")
+                return
+            if stored != "running":
+                status = stored
+                stop.set()
+
+        async def checkpointer():
+            while not done.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(flush_now.wait(), CHECKPOINT_INTERVAL)
+                flush_now.clear()
+                await save()
+
+        flush_now, done = asyncio.Event(), asyncio.Event()
+        saver = asyncio.create_task(checkpointer())
+        try:
+            await broadcast_engine.run(
+                tenant.bot, recipients(), send, on_progress=lambda st: show(progress(st)), stop=stop)
+        finally:
+            done.set()
+            flush_now.set()
+            await saver
+            await save()
+            self._current_id, self._current_stop = None, None
+
+        if status == "running":
+            status = "scheduled" if stop.is_set() else "done"
+            await BroadcastJobRepo.finish(job_id, status)
+        final = await BroadcastJobRepo.get(job_id)
+        show(dict(final))
+        log.info(f"Broadcast job #{job_id} {final['status']} at account {checkpoint.watermark}: "
+                 f"{final['sent']} ok, {final['failed']} failed")
+        if final["status"] == "done":
+            await self._report(tenant, final)
+
+    async def _report(self, tenant: Tenant, job):
+        chat_id = job["status_chat_id"] or job["created_by"]
+        await tenant.bot.send_message(
+            chat_id,
+            f"✅ Xabarnoma #{job['id']} yuborildi\n\n"
+            f"📤 Yuborilgan: {job['sent']} ta\n"
+            f"❌ Yuborilmagan: {job['failed']} ta",
+        )
+        lines, last = [], 0
+        while page := await BroadcastJobRepo.failed_user_ids(job["id"], last, FAILED_PAGE_SIZE):
+            lines.extend(str(user_id) for _, user_id in page)
+            last = page[-1][0]
+        if lines:
+            await tenant.bot.send_document(
+                chat_id,
+                BufferedInputFile("\n".join(lines).encode(), f"failed_users_{job['id']}.txt"),
+                caption="❌ Xabar yuborishda xato bo‘lgan foydalanuvchilar",
+            )
+
+
+broadcast_runner = BroadcastJobRunner()
@@ -0,0 +1,80 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.db.repository import ChannelRepo
+
+log = logging.getLogger("channels")
+
+INVITE_LINK_NAME = "my_reels"
+
+
+class ChannelRegistry:
+    """
+    Mandatory channels of one tenant and their links, kept in memory.
+
+    Loaded once at startup and reloaded by ``PanelFunc.channel_add`` /
+    ``channel_delete`` (on other nodes via the "channels" invalidation
+    event), so the membership check never queries the DB.
+    ``version`` changes on every reload; the join keyboards built from the
+    channel set are cached per version, so the gate message costs no Bot API
+    calls.
+    """
+
+    def __init__(self, tenant: str, bot: Bot):
+        self.tenant = tenant
+        self.bot = bot
+        self._links: Dict[int, Optional[str]] = {}
+        self._keyboards: Dict[Tuple[int, ...], InlineKeyboardMarkup] = {}
+        self.version = 0
+
+    async def load(self):
+        links = dict(await ChannelRepo.all(self.tenant))
+        for chat_id, link in links.items():
+            if not link:
+                links[chat_id] = await self._create_invite_link(chat_id)
+        self._links = links
+        self._keyboards = {}
+        self.version += 1
+        self.join_keyboard(self.chat_ids())  # to'liq klaviatura oldindan tayyor
+        log.info(f"Loaded {len(self._links)} mandatory channels of {self.tenant} (version {self.version})")
+
+    async def _create_invite_link(self, chat_id: int) -> Optional[str]:
+        # export_chat_invite_link asosiy havolani bekor qiladi, shuning uchun alohida havola yaratamiz
+        try:
+            invite = await self.bot.create_chat_invite_link(chat_id=chat_id, name=INVITE_LINK_NAME)
+        except Exception as e:
+            log.error(f"Could not create invite link for {chat_id}: {e}")
+            return None
+        stored = await ChannelRepo.set_invite_link(self.tenant, chat_id, invite.invite_link)
+        if stored != invite.invite_link:
+            # Boshqa node havolasi saqlangan: bizniki ortiqcha, kanalda to'planib qolmasin
+            try:
+                await self.bot.revoke_chat_invite_link(chat_id=chat_id, invite_link=invite.invite_link)
+            except Exception as e:
+                log.warning(f"Could not revoke extra invite link for {chat_id}: {e}")
+        return stored
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._links
+
+    def chat_ids(self) -> List[int]:
+        return list(self._links)
+
+    def link(self, chat_id: int) -> Optional[str]:
+        return self._links.get(chat_id)
+
+    def join_keyboard(self, chat_ids: List[int]) -> InlineKeyboardMarkup:
+        """Join buttons for `chat_ids` plus the check button, built once per channel set."""
+        key = tuple(chat_ids)
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            rows = [
+                [InlineKeyboardButton(text=f"📢 Kanal-{index}", url=link)]
+                for index, link in enumerate(map(self.link, chat_ids), 1) if link
+            ]
+            rows.append([InlineKeyboardButton(text="✅Qo'shildim", callback_data="check")])
+            keyboard = self._keyboards[key] = InlineKeyboardMarkup(inline_keyboard=rows)
+        return keyboard
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Tuple, Union
+
+from aiogram import Bot
+from aiogram.types import ChatFullInfo
+
+CHAT_INFO_TTL = 600  # sekund
+MAX_CONCURRENCY = 10
+# Shundan oshsa muddati o'tganlar, keyin eng eskilari o'chiriladi
+ENTRY_LIMIT = 10000
+
+
+class ChatInfoCache:
+    """
+    ``get_chat`` results with a TTL; misses are fetched concurrently, at most ``MAX_CONCURRENCY`` at a time.
+    Entries are per (bot, chat): tenant bots see the same chat with different rights and invite links.
+    """
+
+    def __init__(self, ttl: float, concurrency: int):
+        self.ttl = ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._entries: Dict[Tuple[int, int], Tuple[ChatFullInfo, float]] = {}  # (bot_id, chat_id)
+
+    async def _fetch(self, bot: Bot, chat_id: int) -> Union[ChatFullInfo, Exception]:
+        async with self._semaphore:
+            try:
+                chat = await bot.get_chat(chat_id=chat_id)
+            except Exception as e:
+                return e  # xatolar keshlanmaydi
+        now = time.monotonic()
+        if len(self._entries) >= ENTRY_LIMIT:
+            self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+            while len(self._entries) >= ENTRY_LIMIT:
+                del self._entries[next(iter(self._entries))]
+        self._entries[(bot.id, chat_id)] = (chat, now + self.ttl)
+        return chat
+
+    async def get_many(self, bot: Bot, chat_ids: Iterable[int]) -> Dict[int, Union[ChatFullInfo, Exception]]:
+        """Chat info (or the error it failed with) for every id, in the given order."""
+        now = time.monotonic()
+        chat_ids = list(chat_ids)
+        result = {}
+        misses = []
+        for chat_id in chat_ids:
+            entry = self._entries.get((bot.id, chat_id))
+            if entry and entry[1] > now:
+                result[chat_id] = entry[0]
+            else:
+                misses.append(chat_id)
+        fetched = await asyncio.gather(*(self._fetch(bot, chat_id) for chat_id in misses))
+        result.update(zip(misses, fetched))
+        return {chat_id: result[chat_id] for chat_id in chat_ids}
+
+    def invalidate(self, bot: Bot, chat_id: int):
+        self._entries.pop((bot.id, chat_id), None)
+
+
+chat_info = ChatInfoCache(CHAT_INFO_TTL, MAX_CONCURRENCY)
@@ -0,0 +1,291 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+
+from config import SHARED_MEDIA_TTL
+from src.db.database import database
+from src.db.repository import DownloadJobRepo
+from src.utils.downloader import CarouselUploader, cache_download, downloader, get_cached_file, send_cached
+from src.utils.media_store import MediaStore
+from src.utils.metrics import metrics
+from src.utils.outbound import outbound
+from src.utils.tenants import Tenant, tenants
+
+log = logging.getLogger("download-jobs")
+
+POLL_INTERVAL = 5  # sekund: NOTIFY kelmasa ham (yoki SQLite da) navbat shuncha vaqtda tekshiriladi
+LEASE_SECONDS = 120  # worker o'lsa, ishni shuncha vaqtdan keyin boshqasi oladi
+HEARTBEAT_INTERVAL = 30
+MAX_ATTEMPTS = 3  # xato bilan tugagan yoki worker o'lib qolgan urinishlar, jami
+RETRY_DELAY = 15  # sekund, har urinishda ortadi: xato bergan ish navbatga shuncha vaqtdan keyin qaytadi
+STOP_TIMEOUT = 60  # to'xtashda boshlangan yuklashlarni shuncha kutamiz
+PURGE_INTERVAL = 3600
+KEEP_FINISHED_SECONDS = 86400
+VIDEOS_DIR = Path("videos")
+
+# Yuklangan fayllar shu jarayondagi hamma tenant botlar uchun umumiy
+media_store = MediaStore(VIDEOS_DIR / "shared", SHARED_MEDIA_TTL)
+
+
+def _user_error(error: Exception) -> str:
+    error_msg = str(error).lower()
+    if isinstance(error, TelegramBadRequest):
+        return "⚠️ <b>Yuklashda muammo</b>\n\n" \
+               "Fayl Telegram tomonidan qabul qilinmadi.\n" \
+               "Sabab: Fayl hajmi yoki formati mos emas."
+    if "private" in error_msg or "login required" in error_msg:
+        return "🔒 <b>Shaxsiy akkaunt</b>\n\n" \
+               "Bu kontent shaxsiy akkauntda joylashgan.\n" \
+               "Faqat ochiq akkauntlardan yuklay olamiz."
+    if "not found" in error_msg:
+        return "❌ <b>Kontent topilmadi</b>\n\n" \
+               "Bu havola mavjud emas yoki o'chirilgan."
+    if "rate limit" in error_msg or "401" in error_msg:
+        return "⏳ <b>Vaqtincha cheklash</b>\n\n" \
+               "Instagram tomonidan vaqtincha cheklash.\n" \
+               "Bir necha daqiqadan so'ng urinib ko'ring."
+    return "⚠️ <b>Yuklashda xatolik</b>\n\n" \
+           "Havola noto'g'ri yoki kontent mavjud emas.\n" \
+           "Boshqa havola bilan urinib ko'ring."
+
+
+async def process_download(tenant: Tenant, job):
+    """Download `job['url']`, send the files to the user's chat and cache their file_ids."""
+    bot, chat_id, message_id, url = tenant.bot, job["chat_id"], job["status_message_id"], job["url"]
+
+    def status(text: str):
+        if message_id:
+            outbound.edit_status_by_id(bot, chat_id, message_id, text, parse_mode="HTML")
+
+    # Oldingi urinish yoki boshqa foydalanuvchi bu havolani allaqachon yuklagan bo'lishi mumkin
+    cached = await get_cached_file(tenant.name, url)
+    if cached:
+        try:
+            await send_cached(bot, chat_id, *cached, tenant.signature)
+            if message_id:
+                outbound.delete_later_by_id(bot, chat_id, message_id, 0)
+            return
+        except TelegramBadRequest:
+            log.warning("Cached file is invalid, downloading fresh")
+
+    download_start = time.time()
+    status("🔄 <b>Yuklanmoqda...</b>\n📡 Instagram'dan ma'lumot olinmoqda")
+    # Karusel elementlari yuklanishi bilan Telegram'ga ham yuklanib boradi
+    uploader = CarouselUploader(bot, tenant.storage_chat())
+    download = functools.partial(downloader.download_instagram, on_file=uploader.submit)
+    try:
+        # Boshqa tenant shu havolani hozirgina yuklagan bo'lsa, fayllar qayta yuklanmaydi
+        async with media_store.use(url, download) as (files, title, description):
+            status("🔄 <b>Yuklanmoqda...</b>\n📤 Telegram'ga yuborilmoqda")
+            sent_file_ids, media_types = await uploader.send(chat_id, files, title, description, tenant.signature)
+    finally:
+        await uploader.close()
+    if sent_file_ids:
+        await cache_download(tenant.name, job["user_id"], url, title, sent_file_ids, media_types)
+
+    download_time = round(time.time() - download_start, 1)
+    metrics.histogram("downloads.seconds").observe(download_time)
+    log.info(f"Successfully processed {url} for {tenant.name} in {download_time}s")
+    status(f"✅ <b>Muvaffaqiyatli yuklandi!</b>\n"
+           f"⏱️ Vaqt: {download_time}s\n"
+           f"📁 Fayllar: {len(files)}")
+    if message_id:
+        outbound.delete_later_by_id(bot, chat_id, message_id, 3)
+
+
+class DownloadWorker:
+    """
+    Consumes public.download_jobs: the bot only enqueues a URL, the download and
+    upload happen here — in the bot process itself or in separate ``worker.py``
+    processes on any number of nodes.
+
+    Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` under a lease that a
+    heartbeat keeps extending; if a worker dies its job is taken over once the
+    lease runs out, and a worker that finds its lease lost cancels the
+    download. A failed download goes back to the queue with a growing delay
+    until it has been tried ``MAX_ATTEMPTS`` times. Idle loops sleep until a
+    NOTIFY on ``download_jobs`` (sent by the enqueueing statement) or
+    ``POLL_INTERVAL``; a dropped LISTEN connection is reopened, like the
+    invalidation bus does.
+    """
+
+    def __init__(self):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._listener = None
+        self._listening = False
+        self._listen_task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    async def start(self, concurrency: int):
+        await self._listen()
+        # SQLite da listen() None qaytaradi: faqat so'rov bilan ishlaymiz
+        if database.dialect != "sqlite":
+            self._listen_task = asyncio.create_task(self._keep_listening())
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(concurrency)]
+        log.info(f"Download worker {self.name} started ({concurrency} slots)")
+
+    async def _listen(self):
+        try:
+            self._listener = await database.listen("download_jobs", lambda payload: self.wake())
+        except Exception as e:
+            # Har POLL_INTERVAL da qayta urinamiz, lekin logni to'ldirmaymiz
+            if self._listening or self._listen_task is None:
+                log.warning(f"LISTEN download_jobs failed, polling every {POLL_INTERVAL}s: {e}")
+            self._listening = False
+            return
+        if self._listen_task and not self._listening:
+            log.info("LISTEN download_jobs reconnected")
+            # Ulanish yo'q paytda qo'shilgan ishlar
+            self.wake()
+        self._listening = True
+
+    async def _close_listener(self):
+        if self._listener:
+            with contextlib.suppress(Exception):
+                await self._listener.close()
+            self._listener = None
+
+    async def _keep_listening(self):
+        while not self._stopping:
+            await asyncio.sleep(POLL_INTERVAL)
+            if self._listener is None or self._listener.is_closed():
+                if self._listening:
+                    log.warning("LISTEN download_jobs connection lost, reconnecting")
+                    self._listening = False
+                await self._close_listener()
+                await self._listen()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            # Tugamagan ishlar lease tugagach boshqa workerga o'tadi
+            _, pending = await asyncio.wait(self._tasks, timeout=STOP_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        # Qolgan umumiy fayllar serverda qolmasin
+        media_store.clear()
+        await downloader.close_session()
+        if self._listen_task:
+            self._listen_task.cancel()
+            await asyncio.gather(self._listen_task, return_exceptions=True)
+            self._listen_task = None
+        await self._close_listener()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                job = await DownloadJobRepo.claim(self.name, LEASE_SECONDS, tenants.names())
+            except Exception as e:
+                log.error(f"Claiming download job failed: {e}")
+                job = None
+            if job:
+                try:
+                    await self._execute(job)
+                except Exception as e:
+                    log.error(f"Download job #{job['id']} crashed: {e}")
+                continue
+            media_store.purge()
+            await self._maybe_purge()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            self._wakeup.clear()
+
+    async def _heartbeat(self, job_id: int, work: asyncio.Task):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                if not await DownloadJobRepo.heartbeat(job_id, self.name, LEASE_SECONDS):
+                    # Ishni boshqa worker olgan: foydalanuvchiga ikki marta yubormaslik uchun to'xtatamiz
+                    log.warning(f"Download job #{job_id} lease lost, cancelling it")
+                    work.cancel()
+                    return
+            except Exception as e:
+                log.error(f"Download job #{job_id} heartbeat failed: {e}")
+
+    async def _execute(self, job):
+        job_id = job["id"]
+        if job["attempts"] > MAX_ATTEMPTS:
+            await self._fail(job, Exception(f"gave up after {MAX_ATTEMPTS} attempts"))
+            return
+        # claim() faqat shu jarayondagi tenantlarning ishlarini beradi
+        work = asyncio.create_task(process_download(tenants.get(job["tenant"]), job))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, work))
+        try:
+            await work
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                raise  # worker to'xtatilmoqda
+            metrics.counter("downloads.lease_lost").inc()
+        except Exception as e:
+            log.error(f"Download error for {job['url']} (attempt {job['attempts']}): {e}")
+            if job["attempts"] >= MAX_ATTEMPTS:
+                await self._fail(job, e)
+            else:
+                await self._retry(job, e)
+        else:
+            await DownloadJobRepo.finish(job_id, self.name, "done")
+        finally:
+            heartbeat.cancel()
+
+    async def _retry(self, job, error: Exception):
+        metrics.counter("downloads.retried").inc()
+        try:
+            released = await DownloadJobRepo.release(job["id"], self.name, str(error)[:500],
+                                                     RETRY_DELAY * job["attempts"])
+        except Exception as e:
+            # Lease tugagach ish baribir qayta olinadi
+            log.error(f"Requeueing download job #{job['id']} failed: {e}")
+            return
+        if released and job["status_message_id"]:
+            outbound.edit_status_by_id(tenants.get(job["tenant"]).bot, job["chat_id"], job["status_message_id"],
+                                       "🔄 <b>Qayta urinilmoqda...</b>\n⏱️ Iltimos kuting", parse_mode="HTML")
+
+    async def _fail(self, job, error: Exception):
+        metrics.counter("downloads.failed").inc()
+        with contextlib.suppress(Exception):
+            await DownloadJobRepo.finish(job["id"], self.name, "failed", str(error)[:500])
+        tenant = tenants.get(job["tenant"])
+        if job["status_message_id"]:
+            outbound.edit_status_by_id(tenant.bot, job["chat_id"], job["status_message_id"], _user_error(error),
+                                       parse_mode="HTML")
+        if not tenant.admins:
+            return
+        with contextlib.suppress(Exception):
+            await tenant.bot.send_message(
+                tenant.admins[0],
+                f"❌ <b>Download Error</b>\n"
+                f"URL: {job['url']}\n"
+                f"User: {job['user_id']}\n"
+                f"Error: {error}",
+                parse_mode="HTML"
+            )
+
+    async def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            deleted = await DownloadJobRepo.purge_finished(KEEP_FINISHED_SECONDS)
+            metrics.counter("downloads.jobs_purged").inc(deleted)
+        except Exception as e:
+            log.error(f"Download jobs purge failed: {e}")
+
+
+download_worker = DownloadWorker()
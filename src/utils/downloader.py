@@ -0,0 +1,559 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import pytz
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, InputMediaPhoto, InputMediaVideo
+
+from config import (
+    INSTA_USERNAME, INSTA_PASSWORD, DOWNLOAD_CONCURRENCY, INSTAGRAM_BASE_URL, INSTA_GRAPHQL_DOC_ID, NATIVE_EXTRACTOR,
+)
+from src.db.repository import DownloadRepo
+from src.utils.native_extractor import MEDIA_PARALLELISM, NativeExtractor
+from src.utils.outbound import outbound
+
+log = logging.getLogger("insta-bot")
+
+COOKIE_FILE_PATH = "/home/myreels/my_reels/instagram_cookies.txt"
+
+# Cache expiry: 7 days
+CACHE_EXPIRY_DAYS = 7
+MAX_RETRIES = 3
+RETRY_DELAY = 2
+MAX_CONCURRENT_DOWNLOADS = DOWNLOAD_CONCURRENCY
+
+# User agents for requests
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+]
+
+executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+
+MEDIA_SUFFIXES = ('.jpg', '.jpeg', '.png', '.webp', '.mp4', '.avi', '.mov', '.mkv')
+
+# Yuklovchi har bir fayl tayyor bo'lishi bilan shu funksiyani chaqiradi (karusel yuklanayotganda yuborish uchun)
+OnFile = Callable[[Path], None]
+
+
+async def _run_streaming(cmd: List[str], on_line: Callable[[str], None]) -> Tuple[int, str]:
+    """Run `cmd`, passing every stdout line to `on_line` as soon as it is printed."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    # stderr ni parallel o'qiymiz: bufer to'lib, jarayon to'xtab qolmasin
+    stderr = asyncio.create_task(process.stderr.read())
+    try:
+        async for line in process.stdout:
+            on_line(line.decode('utf-8', errors='replace').strip())
+        await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    finally:
+        errors = (await stderr).decode('utf-8', errors='replace')
+    return process.returncode, errors
+
+
+def _report_file(on_file: Optional[OnFile], line: str):
+    path = Path(line)
+    if on_file and line and path.suffix.lower() in MEDIA_SUFFIXES and path.is_file():
+        on_file(path)
+
+
+# ----------------------- Database Operations -----------
+async def cache_download(tenant: str, user_id: int, url: str, title: str, file_ids: List[str], media_types: List[str]):
+    """Cache downloaded media with multiple file support"""
+    try:
+        # Convert lists to JSON strings for storage
+        file_ids_json = json.dumps(file_ids)
+        media_types_json = json.dumps(media_types)
+
+        day = datetime.now(pytz.timezone("Asia/Tashkent")).date()  # statistika kuni
+        await DownloadRepo.upsert(tenant, user_id, url, title, file_ids_json, media_types_json, datetime.now(), day)
+        log.info(f"Cached download for URL: {url}")
+    except Exception as e:
+        log.error(f"Cache save error: {e}")
+
+
+async def get_cached_file(tenant: str, url: str) -> Optional[Tuple[List[str], str, List[str]]]:
+    """Get cached file with expiry check"""
+    try:
+        row = await DownloadRepo.get(tenant, url)
+        if row:
+            cached_date = row[3]
+            if datetime.now() - cached_date < timedelta(days=CACHE_EXPIRY_DAYS):
+                # Parse JSON strings back to lists
+                file_ids = json.loads(row[0]) if isinstance(row[0], str) else [row[0]]
+                media_types = json.loads(row[2]) if isinstance(row[2], str) else [row[2]]
+                return file_ids, row[1], media_types
+            else:
+                # Remove expired cache
+                await DownloadRepo.delete(tenant, url)
+    except Exception as e:
+        log.error(f"Cache retrieve error: {e}")
+    return None
+
+
+# ----------------------- Downloaders -------------------
+
+class InstagramDownloader:
+    def __init__(self):
+        self.session = None
+        self.native = NativeExtractor(lambda: self.session, INSTAGRAM_BASE_URL, INSTA_GRAPHQL_DOC_ID)
+
+    async def create_session(self):
+        """Create the long-lived aiohttp session (pooled keep-alive connections, closed on shutdown)"""
+        if not self.session:
+            headers = {
+                'User-Agent': USER_AGENTS[0],
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+            }
+            # Katta videolar uzoq yuklanadi: umumiy emas, ulanish va o'qish uchun timeout
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+            connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_DOWNLOADS * MEDIA_PARALLELISM * 2,
+                                             ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(headers=headers, timeout=timeout, connector=connector)
+
+    async def close_session(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def download_with_native(self, url: str, temp_dir: Path,
+                                   on_file: Optional[OnFile] = None) -> Tuple[List[Path], str, str]:
+        """Resolve and stream public posts over the pooled session (src/utils/native_extractor.py)"""
+        await self.create_session()
+        return await self.native.download(url, temp_dir, on_file)
+
+    async def download_with_ytdlp(self, url: str, temp_dir: Path,
+                                  on_file: Optional[OnFile] = None) -> Tuple[List[Path], str, str]:
+        """Download using yt-dlp"""
+        try:
+            output_template = str(temp_dir / '%(title)s.%(ext)s')
+
+            cmd = [
+                'yt-dlp',
+                '--no-warnings',
+                '--extract-flat', 'false',
+                '--write-info-json',
+                # Karuselning har bir elementi tayyor bo'lganda uning yo'li chiqariladi
+                '--print', 'after_move:filepath',
+                '--output', output_template,
+                url
+            ]
+            if os.path.exists(COOKIE_FILE_PATH):
+                cmd.extend(['--cookies', COOKIE_FILE_PATH])  # Cookie faylini qo'shish
+
+            returncode, stderr = await _run_streaming(cmd, functools.partial(_report_file, on_file))
+
+            if returncode == 0:
+                files = sorted([f for f in temp_dir.iterdir()
+                                if f.is_file() and not f.name.endswith(('.json', '.txt'))])
+
+                if files:
+                    # Try to extract title from info.json
+                    info_files = list(temp_dir.glob('*.info.json'))
+                    title = "Instagram Media"
+                    description = ""
+
+                    if info_files:
+                        try:
+                            with open(info_files[0], 'r', encoding='utf-8') as f:
+                                info = json.load(f)
+                                title = info.get('title', 'Instagram Media')
+                                description = info.get('description', '')
+                        except:
+                            pass
+
+                    return files, title, description
+
+            raise Exception(f"yt-dlp failed: {stderr}")
+
+        except Exception as e:
+            log.error(f"yt-dlp error: {e}")
+            raise
+
+    async def download_with_gallerydl(self, url: str, temp_dir: Path,
+                                      on_file: Optional[OnFile] = None) -> Tuple[List[Path], str, str]:
+        """Download using gallery-dl"""
+        try:
+            config = {
+                'extractor': {
+                    'instagram': {
+                        'directory': [str(temp_dir)],
+                        'filename': '{category}_{id}.{extension}'
+                    }
+                }
+            }
+            if os.path.exists(COOKIE_FILE_PATH):
+                config['extractor']['instagram']['cookies'] = COOKIE_FILE_PATH  # Cookie faylini qo'shish
+
+            config_file = temp_dir / 'config.json'
+            with open(config_file, 'w') as f:
+                json.dump(config, f)
+
+            cmd = [
+                'gallery-dl',
+                '--config', str(config_file),
+                url
+            ]
+
+            # gallery-dl har bir yuklangan fayl yo'lini chiqaradi ("# " — avval yuklangan)
+            returncode, stderr = await _run_streaming(
+                cmd, lambda line: _report_file(on_file, line.removeprefix('# ')))
+
+            if returncode == 0:
+                files = sorted([f for f in temp_dir.iterdir()
+                                if f.is_file() and not f.name.endswith(('.json', '.txt'))])
+
+                if files:
+                    return files, "Instagram Media", ""  # TODO: Metadata dan title olish mumkin
+
+            raise Exception(f"gallery-dl failed: {stderr}")
+
+        except Exception as e:
+            log.error(f"gallery-dl error: {e}")
+            raise
+
+    async def download_with_instaloader(self, url: str, temp_dir: Path,
+                                        on_file: Optional[OnFile] = None) -> Tuple[List[Path], str, str]:
+        """Download using instaloader with improved error handling (files are only known at the end)"""
+
+        def _download():
+            import instaloader
+
+            # Configure instaloader with optimized settings
+            L = instaloader.Instaloader(
+                download_pictures=True,
+                download_videos=True,
+                download_video_thumbnails=False,
+                download_geotags=False,
+                download_comments=False,
+                save_metadata=False,
+                compress_json=False,
+                filename_pattern="{shortcode}",
+                max_connection_attempts=3,
+                request_timeout=30,
+                rate_controller=None
+            )
+            # --- YANGI QISM: Instaloaderga login qilish ---
+            SESSION_FILE = temp_dir / f"{INSTA_USERNAME}.session"  # Har bir foydalanuvchi uchun alohida sessiya
+
+            if not INSTA_USERNAME or not INSTA_PASSWORD:
+                log.warning("INSTA_USERNAME or INSTA_PASSWORD not set for Instaloader. May fail.")
+                # Agar login ma'lumotlari yo'q bo'lsa, anonim urinishni davom ettirish
+            else:
+                try:
+                    L.load_session_from_file(INSTA_USERNAME, filename=SESSION_FILE)
+                    log.info(f"Instaloader session loaded for {INSTA_USERNAME}.")
+                except FileNotFoundError:
+                    log.info(f"Instaloader session file not found for {INSTA_USERNAME}. Logging in...")
+                    L.login(INSTA_USERNAME, INSTA_PASSWORD)
+                    L.save_session_to_file(SESSION_FILE)  # Sessiyani saqlash
+                    log.info(f"Instaloader logged in and session saved for {INSTA_USERNAME}.")
+                except Exception as e:
+                    log.error(f"Instaloader login/session error: {e}")
+                    # Login xatosi bo'lsa, keyingi metodga o'tish yoki xato qaytarish
+                    raise Exception(f"Instaloader login failed: {e}")
+            # --- YANGI QISM TUGADI ---
+            # Add some delay to avoid rate limits
+            time.sleep(2)
+
+            # Extract shortcode from URL
+            shortcode_match = re.search(r'/([A-Za-z0-9_-]+)/?(?:\?.*)?$', url)
+            if not shortcode_match:
+                raise Exception("Cannot extract shortcode from URL")
+
+            shortcode = shortcode_match.group(1)
+
+            try:
+                post = instaloader.Post.from_shortcode(L.context, shortcode)
+                L.download_post(post, target=temp_dir)
+
+                title = f"{post.owner_username} - {(post.caption[:50] + '...') if post.caption else 'Instagram media'}"
+                description = post.caption or ""
+
+                files = sorted([f for f in temp_dir.iterdir()
+                                if f.is_file() and not f.name.endswith(('.txt', '.json', '.xz'))
+                                and not f.name.startswith('.')])
+
+                return files, title, description
+
+            except Exception as e:
+                error_msg = str(e).lower()
+                if any(phrase in error_msg for phrase in ['login required', '403', '401', 'private', 'not found']):
+                    if 'login required' in error_msg or '403' in error_msg:
+                        raise Exception("Content is private or login required")
+                    elif '401' in error_msg:
+                        raise Exception("Rate limited or unauthorized")
+                    elif 'not found' in error_msg:
+                        raise Exception("Content not found")
+                raise Exception(f"Instaloader error: {e}")
+
+        try:
+            result = await asyncio.get_event_loop().run_in_executor(executor, _download)
+            return result
+        except Exception as e:
+            log.error(f"Instaloader error: {e}")
+            raise
+
+    async def download_instagram(self, url: str, temp_dir: Path,
+                                 on_file: Optional[OnFile] = None) -> Tuple[List[Path], str, str]:
+        """
+        Download Instagram content using multiple methods with fallback.
+        `on_file` is called for every file as soon as it is complete, so uploading can start
+        before the whole carousel is downloaded; the returned list is the final result.
+        """
+        # (nomi, metod, urinishlar soni): o'z yuklovchimiz bir marta, yiqilsa tashqi dasturlar
+        methods = [
+            ("yt-dlp", self.download_with_ytdlp, MAX_RETRIES),
+            ("gallery-dl", self.download_with_gallerydl, MAX_RETRIES),
+            ("instaloader", self.download_with_instaloader, MAX_RETRIES),
+        ]
+        if NATIVE_EXTRACTOR:
+            methods.insert(0, ("native", self.download_with_native, 1))
+
+        last_error = None
+
+        for method_name, method, attempts in methods:
+            for attempt in range(attempts):
+                try:
+                    log.info(f"Trying {method_name} (attempt {attempt + 1})")
+
+                    result = await method(url, temp_dir, on_file)
+
+                    if result[0]:  # If files were downloaded
+                        log.info(f"Successfully downloaded with {method_name}")
+                        return result
+
+                except Exception as e:
+                    last_error = e
+                    log.warning(f"{method_name} attempt {attempt + 1} failed: {e}")
+
+                    if attempt < attempts - 1:
+                        await asyncio.sleep(RETRY_DELAY * (attempt + 1))
+
+        # If all methods failed
+        error_msg = f"All download methods failed. Last error: {last_error}"
+        log.error(error_msg)
+        raise Exception(error_msg)
+
+
+# ----------------------- Global downloader instance ----
+downloader = InstagramDownloader()
+
+
+async def send_cached(bot: Bot, chat_id: int, file_ids: List[str], title: str, media_types: List[str],
+                      signature: str):
+    """Send already uploaded files by file_id (raises TelegramBadRequest if they are no longer valid)."""
+    await send_albums(bot, chat_id, file_ids, media_types, f"🎬 <b>{title}</b>\n\n📥 {signature} (Cache)")
+
+
+# ----------------------- Sending ----------------------
+
+def media_caption(title: str, description: str, signature: str) -> str:
+    short_desc = (description[:200] + "...") if len(description) > 200 else description
+    return f"🎬 <b>{title}</b>\n\n📝 {short_desc}\n\n📥 {signature}" if short_desc else f"🎬 <b>{title}</b>\n\n📥 {signature}"
+
+
+async def send_media_files(bot: Bot, chat_id: int, files: List[Path], title: str, description: str,
+                           signature: str) -> Tuple[List[str], List[str]]:
+    """Send media files to user and return file IDs"""
+    sent_file_ids = []
+    media_types = []
+
+    caption = media_caption(title, description, signature)
+
+    try:
+        if len(files) == 1:
+            # Single file
+            file_path = files[0]
+            if file_path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+                sent = await bot.send_photo(
+                    chat_id=chat_id,
+                    photo=FSInputFile(file_path),
+                    caption=caption,
+                    parse_mode="HTML"
+                )
+                if sent.photo:
+                    sent_file_ids.append(sent.photo[-1].file_id)
+                    media_types.append("photo")
+            elif file_path.suffix.lower() in ('.mp4', '.avi', '.mov', '.mkv'):
+                sent = await bot.send_video(
+                    chat_id=chat_id,
+                    video=FSInputFile(file_path),
+                    caption=caption,
+                    parse_mode="HTML"
+                )
+                if sent.video:
+                    sent_file_ids.append(sent.video.file_id)
+                    media_types.append("video")
+
+        elif len(files) <= 10:
+            # Multiple files (up to 10) - use media group
+            media_list = []
+            for i, file_path in enumerate(files[:10]):
+                if file_path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+                    media_list.append(InputMediaPhoto(
+                        media=FSInputFile(file_path),
+                        caption=caption if i == 0 else None,
+                        parse_mode="HTML" if i == 0 else None
+                    ))
+                elif file_path.suffix.lower() in ('.mp4', '.avi', '.mov', '.mkv'):
+                    media_list.append(InputMediaVideo(
+                        media=FSInputFile(file_path),
+                        caption=caption if i == 0 else None,
+                        parse_mode="HTML" if i == 0 else None
+                    ))
+
+            if media_list:
+                sent_messages = await bot.send_media_group(chat_id=chat_id, media=media_list)
+                for msg in sent_messages:
+                    if msg.photo:
+                        sent_file_ids.append(msg.photo[-1].file_id)
+                        media_types.append("photo")
+                    elif msg.video:
+                        sent_file_ids.append(msg.video.file_id)
+                        media_types.append("video")
+
+        else:
+            # More than 10 files - send individually with minimal captions
+            for i, file_path in enumerate(files):
+                file_caption = f"🎬 {title} ({i + 1}/{len(files)})" if i < 5 else None
+
+                if file_path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+                    sent = await bot.send_photo(
+                        chat_id=chat_id,
+                        photo=FSInputFile(file_path),
+                        caption=file_caption
+                    )
+                    if sent.photo:
+                        sent_file_ids.append(sent.photo[-1].file_id)
+                        media_types.append("photo")
+                elif file_path.suffix.lower() in ('.mp4', '.avi', '.mov', '.mkv'):
+                    sent = await bot.send_video(
+                        chat_id=chat_id,
+                        video=FSInputFile(file_path),
+                        caption=file_caption
+                    )
+                    if sent.video:
+                        sent_file_ids.append(sent.video.file_id)
+                        media_types.append("video")
+                # Tezlik cheklovi outbound scheduler tomonidan boshqariladi
+
+    except Exception as e:
+        log.error(f"Error sending media files: {e}")
+        raise
+
+    return sent_file_ids, media_types
+
+
+async def send_albums(bot: Bot, chat_id: int, file_ids: List[str], media_types: List[str], caption: str):
+    """Send already uploaded files as albums of up to 10, the caption on the first item."""
+    items = [
+        InputMediaPhoto(media=file_id) if media_type == "photo" else InputMediaVideo(media=file_id)
+        for file_id, media_type in zip(file_ids, media_types)
+    ]
+    if len(items) == 1:
+        send = bot.send_photo if media_types[0] == "photo" else bot.send_video
+        await send(chat_id, file_ids[0], caption=caption, parse_mode="HTML")
+        return
+    items[0].caption, items[0].parse_mode = caption, "HTML"
+    for start in range(0, len(items), 10):
+        await bot.send_media_group(chat_id=chat_id, media=items[start:start + 10])
+
+
+class CarouselUploader:
+    """
+    Uploads carousel items to a storage chat while the rest are still downloading.
+
+    The downloader reports every finished file (``submit`` is its ``on_file``);
+    from the second file on, each one is uploaded to ``storage_chat`` right
+    away, so the total time is about max(download, upload) instead of the sum.
+    ``send`` then assembles the user's albums from the collected file_ids.
+    Single files, downloads this bot did not stream (another tenant's, or
+    instaloader's) and bots without a storage chat go through
+    ``send_media_files`` as before — a single item gains nothing and would
+    only spend the storage chat's ~20 messages/minute limit. The storage chat
+    has its own bucket (``TG_STORAGE_BURST``); uploads only start while it has
+    tokens for them, and when the items left do not fit, the carousel goes
+    straight to the user instead of waiting ~3 s per item.
+    """
+
+    def __init__(self, bot: Bot, storage_chat: Optional[int]):
+        self.bot = bot
+        self.storage_chat = storage_chat
+        self._waiting: List[Path] = []
+        self._uploads: Dict[Path, asyncio.Task] = {}
+
+    def submit(self, path: Path):
+        if self.storage_chat is None or path in self._uploads or path in self._waiting:
+            return
+        self._waiting.append(path)
+        if len(self._waiting) + len(self._uploads) < 2:
+            return  # bitta fayl bo'lishi mumkin: to'g'ridan-to'g'ri foydalanuvchiga yuboriladi
+        if not self._fits(len(self._waiting)):
+            return
+        for waiting in self._waiting:
+            self._uploads[waiting] = asyncio.create_task(self._upload(waiting))
+        self._waiting.clear()
+
+    def _fits(self, count: int) -> bool:
+        # Token yetmasa yuklash kanal limitini kutadi: foydalanuvchiga to'g'ridan-to'g'ri yuborish tezroq
+        return count <= outbound.available(self.bot, self.storage_chat)
+
+    async def _upload(self, path: Path) -> Tuple[str, str]:
+        if path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+            sent = await self.bot.send_photo(self.storage_chat, FSInputFile(path), disable_notification=True)
+            return sent.photo[-1].file_id, "photo"
+        sent = await self.bot.send_video(self.storage_chat, FSInputFile(path), disable_notification=True)
+        return sent.video.file_id, "video"
+
+    async def send(self, chat_id: int, files: List[Path], title: str, description: str,
+                   signature: str) -> Tuple[List[str], List[str]]:
+        """Deliver `files` (the final download result) to `chat_id` and return their file_ids."""
+        files = [path for path in files if path.suffix.lower() in MEDIA_SUFFIXES]
+        if not self._uploads or len(files) < 2 or not self._fits(sum(path not in self._uploads for path in files)):
+            await self.close()
+            return await send_media_files(self.bot, chat_id, files, title, description, signature)
+
+        file_ids, media_types = [], []
+        for path in files:
+            upload = self._uploads.pop(path, None) or asyncio.create_task(self._upload(path))
+            try:
+                file_id, media_type = await upload
+            except TelegramBadRequest:
+                raise
+            except Exception as e:
+                # Masalan, qayta urinishda fayl almashtirilgan: bir marta yana yuklaymiz
+                log.warning(f"Storage upload of {path.name} failed, retrying: {e}")
+                file_id, media_type = await self._upload(path)
+            file_ids.append(file_id)
+            media_types.append(media_type)
+        await send_albums(self.bot, chat_id, file_ids, media_types, media_caption(title, description, signature))
+        return file_ids, media_types
+
+    async def close(self):
+        """Drop uploads of files that did not make it into the result (e.g. a failed attempt)."""
+        for upload in self._uploads.values():
+            upload.cancel()
+        await asyncio.gather(*self._uploads.values(), return_exceptions=True)
+        self._uploads.clear()
@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import inspect
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from src.db.database import database
+from src.db.repository import CacheEventRepo
+from src.utils.metrics import metrics
+
+log = logging.getLogger("invalidation")
+
+POLL_INTERVAL = 5  # sekund: NOTIFY yo'qolsa (yoki SQLite da) jurnal shuncha vaqtda tekshiriladi
+BATCH_SIZE = 500
+PURGE_INTERVAL = 3600
+KEEP_EVENTS_SECONDS = 86400  # shundan uzoq uzilgan node to'liq qayta yuklanadi
+
+Callback = Callable[..., Union[None, Awaitable[None]]]
+
+
+async def _call(fn: Callback, *args):
+    result = fn(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+class InvalidationBus:
+    """
+    Keeps the in-process caches of every bot process in step.
+
+    ``publish`` appends ``(topic, key)`` to public.cache_events; the row's
+    ``version`` grows in commit order and the same statement sends a NOTIFY,
+    so every node wakes up, reads the events after the last version it has
+    applied and hands them to the topic's ``on_event``. Events from this
+    process are skipped — the cache was updated before publishing.
+
+    Versions may have gaps (a rolled back publish still uses up its
+    sequence value), so events are applied in order without expecting
+    consecutive numbers. Only when the log was purged past the last applied
+    version (the node was away longer than ``KEEP_EVENTS_SECONDS``) does
+    every topic's ``resync`` reload the cache from the database. A dropped
+    LISTEN connection is reopened and the node catches up from the log, so
+    a lost NOTIFY only delays an update by ``POLL_INTERVAL``.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex[:12]
+        self._topics: Dict[str, Tuple[Callback, Callback]] = {}
+        self._version: Optional[int] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listener = None
+        self._listening = False
+        self._stopping = False
+        self._last_purge = 0.0
+
+    def subscribe(self, topic: str, on_event: Callback, resync: Callback):
+        """`on_event(key)` applies one change; `resync()` reloads the whole cache."""
+        self._topics[topic] = (on_event, resync)
+
+    async def publish(self, topic: str, key: Optional[str] = None):
+        try:
+            await CacheEventRepo.publish(topic, key, self.origin)
+            metrics.counter("cache.published").inc()
+        except Exception as e:
+            # Boshqa nodelar eskirgan keshda qoladi: faqat log, so'rovni buzmaymiz
+            log.error(f"Publishing {topic} invalidation failed: {e}")
+            metrics.counter("cache.publish_errors").inc()
+
+    async def load_baseline(self):
+        """Call before the caches load: events after this version are applied on top."""
+        self._version = await CacheEventRepo.latest()
+
+    async def start(self):
+        if self._version is None:
+            await self.load_baseline()
+        await self._listen()
+        self._task = asyncio.create_task(self._run())
+        log.info(f"Invalidation bus {self.origin} started at version {self._version}")
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self._close_listener()
+
+    async def _listen(self):
+        try:
+            self._listener = await database.listen("cache_events", lambda payload: self._wakeup.set())
+        except Exception as e:
+            # Har POLL_INTERVAL da qayta urinamiz, lekin logni to'ldirmaymiz
+            if self._listening or self._task is None:
+                log.warning(f"LISTEN cache_events failed, polling every {POLL_INTERVAL}s: {e}")
+            self._listening = False
+            return
+        if self._task and not self._listening:
+            log.info("LISTEN cache_events reconnected")
+        self._listening = True
+
+    async def _close_listener(self):
+        if self._listener:
+            with contextlib.suppress(Exception):
+                await self._listener.close()
+            self._listener = None
+
+    async def _run(self):
+        while not self._stopping:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            self._wakeup.clear()
+            # SQLite da listen() None qaytaradi: faqat so'rov bilan ishlaymiz
+            if database.dialect != "sqlite" and (self._listener is None or self._listener.is_closed()):
+                await self._close_listener()
+                await self._listen()
+            try:
+                await self._catch_up()
+            except Exception as e:
+                log.error(f"Applying cache events failed: {e}")
+            await self._maybe_purge()
+
+    async def _catch_up(self):
+        while True:
+            events = await CacheEventRepo.after(self._version, BATCH_SIZE)
+            if not events:
+                return
+            # Bo'shliq odatda bekor qilingan tranzaksiya: jurnal bizning versiyamizdan keyin tozalangan bo'lsagina
+            # hodisalar haqiqatan yo'qolgan, unda hamma keshni bazadan qayta yuklaymiz
+            if events[0]["version"] > self._version + 1 and await CacheEventRepo.oldest() > self._version + 1:
+                log.warning(f"Cache events after {self._version} were purged, resyncing")
+                latest = await CacheEventRepo.latest()
+                await self.resync()
+                self._version = latest
+                continue
+            for event in events:
+                if event["origin"] != self.origin:
+                    await self._apply(event["topic"], event["key"])
+                self._version = event["version"]
+
+    async def _apply(self, topic: str, key: Optional[str]):
+        handlers = self._topics.get(topic)
+        if handlers is None:
+            return
+        on_event, resync = handlers
+        try:
+            await _call(on_event, key)
+            metrics.counter("cache.applied").inc()
+        except Exception as e:
+            log.error(f"Applying {topic} event failed, reloading: {e}")
+            await _call(resync)
+
+    async def resync(self):
+        """Reload every subscribed cache from the database."""
+        metrics.counter("cache.resyncs").inc()
+        for topic, (_, resync) in self._topics.items():
+            try:
+                await _call(resync)
+            except Exception as e:
+                log.error(f"Resyncing {topic} failed: {e}")
+
+    async def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            deleted = await CacheEventRepo.purge(KEEP_EVENTS_SECONDS)
+            metrics.counter("cache.events_purged").inc(deleted)
+        except Exception as e:
+            log.error(f"Cache events purge failed: {e}")
+
+
+invalidation_bus = InvalidationBus()
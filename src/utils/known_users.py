@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Awaitable, Callable, List, Optional, Set
+
+log = logging.getLogger("known-users")
+
+MERGE_THRESHOLD = 100_000
+LOAD_BATCH_SIZE = 50_000
+
+
+def _merge_sorted(ids: array, added: List[int], removed: Set[int]) -> array:
+    merged = array("q")
+    last = None
+    for user_id in heapq.merge(ids, added):
+        if user_id != last and user_id not in removed:
+            merged.append(user_id)
+        last = user_id
+    return merged
+
+
+class UserIdSet:
+    """
+    In-memory set of user ids loaded from the DB.
+
+    Ids are kept in a sorted ``array('q')`` (8 bytes per user, so ~80 MB for
+    10M users) and looked up with bisect. Changes made after startup go to
+    small ``set``s first (added / removed) and are merged into the array in a
+    worker thread once they grow past ``MERGE_THRESHOLD``.
+    """
+
+    def __init__(self, name: str, load_page: Callable[[int, int], Awaitable[List[int]]]):
+        self.name = name
+        self._load_page = load_page
+        self._ids = array("q")
+        self._recent: Set[int] = set()
+        self._removed: Set[int] = set()
+        self._merging: Optional[Set[int]] = None  # birlashtirilayotgan _recent nusxasi
+        self._merge_task = None
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._recent) - len(self._removed)
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self._removed:
+            return False
+        if user_id in self._recent:
+            return True
+        return self._in_array(user_id)
+
+    def _in_array(self, user_id: int) -> bool:
+        i = bisect_left(self._ids, user_id)
+        return i < len(self._ids) and self._ids[i] == user_id
+
+    def add(self, user_id: int):
+        if user_id in self:
+            return
+        self._removed.discard(user_id)
+        # Massivda bo'lsa, birlashtirish paytida _recent ga ham yoziladi: eski "o'chirilgan" nusxa uni olib tashlaydi
+        if self._merging is not None or not self._in_array(user_id):
+            self._recent.add(user_id)
+        self._maybe_merge()
+
+    def discard(self, user_id: int):
+        if user_id not in self:
+            return
+        self._recent.discard(user_id)
+        # Birlashtirilayotgan id ham yangi massivga tushadi: uni ham "o'chirilgan" deb belgilaymiz
+        if (self._merging is not None and user_id in self._merging) or self._in_array(user_id):
+            self._removed.add(user_id)
+        self._maybe_merge()
+
+    def _maybe_merge(self):
+        if len(self._recent) + len(self._removed) >= MERGE_THRESHOLD and self._merge_task is None:
+            self._merge_task = asyncio.get_running_loop().create_task(self._merge())
+
+    async def _merge(self):
+        snapshot = sorted(self._recent)
+        removed = set(self._removed)
+        self._merging = set(snapshot)
+        try:
+            merged = await asyncio.to_thread(_merge_sorted, self._ids, snapshot, removed)
+            self._ids = merged
+            self._recent.difference_update(snapshot)
+            # Birlashtirish paytida qo'shilgan/o'chirilganlar _recent / _removed da qoladi
+            self._removed.difference_update(removed)
+        except Exception as e:
+            log.error(f"{self.name} users merge failed: {e}")
+            # Massivga tushmagan idlar uchun "o'chirilgan" belgisi kerak emas
+            self._removed = {user_id for user_id in self._removed if self._in_array(user_id)}
+        finally:
+            self._merging = None
+            self._merge_task = None
+
+    async def load(self):
+        """Load every id page by page (pages come sorted by user_id)."""
+        ids = array("q")
+        last = 0
+        while True:
+            batch = await self._load_page(last, LOAD_BATCH_SIZE)
+            if not batch:
+                break
+            ids.extend(batch)
+            last = batch[-1]
+        self._ids = ids
+        self._recent.clear()
+        self._removed.clear()
+        log.info(f"Loaded {len(ids)} {self.name} users")
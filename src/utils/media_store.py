@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from src.utils.metrics import metrics
+
+log = logging.getLogger("media-store")
+
+Media = Tuple[List[Path], str, str]  # fayllar, sarlavha, tavsif
+Download = Callable[[str, Path], Awaitable[Media]]
+
+
+class _Entry:
+    __slots__ = ("media", "expires", "users")
+
+    def __init__(self, media: Media, expires: float):
+        self.media = media
+        self.expires = expires
+        self.users = 0
+
+
+class MediaStore:
+    """
+    Downloaded files shared by every tenant bot of the process.
+
+    Telegram file_ids only work for the bot that uploaded them, so the
+    download cache is per tenant; the files themselves are not. ``use``
+    keeps a download under a hash of its URL for ``ttl`` seconds after the
+    last user is done, and concurrent requests for the same URL wait for the
+    one download in flight — a reel sent to several brands is fetched from
+    Instagram once and uploaded once per bot.
+    """
+
+    def __init__(self, root: Path, ttl: float):
+        self.root = root
+        self.ttl = ttl
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _directory(self, url: str) -> Path:
+        return self.root / hashlib.sha1(url.encode()).hexdigest()
+
+    @contextlib.asynccontextmanager
+    async def use(self, url: str, download: Download) -> AsyncIterator[Media]:
+        """Yield the files of ``url``; they are not removed while the block runs."""
+        entry = await self._get(url, download)
+        entry.users += 1
+        try:
+            yield entry.media
+        finally:
+            entry.users -= 1
+            entry.expires = time.monotonic() + self.ttl
+            self.purge()
+
+    async def _get(self, url: str, download: Download) -> _Entry:
+        self.purge()
+        entry = self._entries.get(url)
+        if entry and all(path.exists() for path in entry.media[0]):
+            metrics.counter("media_store.hits").inc()
+            return entry
+
+        inflight = self._inflight.get(url)
+        if inflight:
+            metrics.counter("media_store.joined").inc()
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        directory = self._directory(url)
+        try:
+            # Qayta urinishda oldingi urinishdan qolgan fayllar aralashmasin
+            shutil.rmtree(directory, ignore_errors=True)
+            directory.mkdir(parents=True, exist_ok=True)
+            media = await download(url, directory)
+            if not media[0]:
+                raise Exception("Hech qanday media fayl yuklanmadi")
+        except BaseException as e:
+            shutil.rmtree(directory, ignore_errors=True)
+            # Kutayotgan boshqa tenant ishlari oddiy xato oladi va navbat orqali qayta uriniladi
+            future.set_exception(e if isinstance(e, Exception) else Exception("download cancelled"))
+            future.exception()  # kutuvchi bo'lmasa "never retrieved" ogohlantirishi chiqmasin
+            raise
+        else:
+            entry = self._entries[url] = _Entry(media, time.monotonic() + self.ttl)
+            future.set_result(entry)
+            return entry
+        finally:
+            del self._inflight[url]
+
+    def purge(self):
+        """Remove downloads nobody uses whose ``ttl`` has run out."""
+        now = time.monotonic()
+        for url, entry in list(self._entries.items()):
+            if entry.users == 0 and entry.expires <= now:
+                del self._entries[url]
+                shutil.rmtree(self._directory(url), ignore_errors=True)
+
+    def clear(self):
+        for url in list(self._entries):
+            self._entries.pop(url)
+            shutil.rmtree(self._directory(url), ignore_errors=True)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import ChatMember
+
+from config import MEMBERSHIP_TTL, MEMBERSHIP_NEGATIVE_TTL
+from src.utils.invalidation import invalidation_bus
+from src.utils.metrics import metrics
+
+log = logging.getLogger("membership")
+
+MAX_ENTRIES = 500_000
+
+
+def is_member(member: ChatMember) -> bool:
+    if member.status in ("creator", "administrator", "member"):
+        return True
+    return member.status == "restricted" and bool(getattr(member, "is_member", False))
+
+
+class MembershipCache:
+    """
+    (user_id, chat_id) -> is-member with a TTL.
+
+    Entries are pushed by ``chat_member`` updates from channels where the
+    bot is an admin, so members are trusted for ``ttl`` seconds; "not a
+    member" is kept only briefly. Misses are verified with concurrent
+    ``get_chat_member`` calls.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[Tuple[int, int], Tuple[bool, float]] = {}
+
+    def get(self, user_id: int, chat_id: int) -> Optional[bool]:
+        entry = self._entries.get((user_id, chat_id))
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, user_id: int, chat_id: int, member: bool):
+        if len(self._entries) >= MAX_ENTRIES:
+            self._evict()
+        ttl = self.ttl if member else self.negative_ttl
+        self._entries[(user_id, chat_id)] = (member, time.monotonic() + ttl)
+
+    def clear(self):
+        self._entries = {}
+
+    def _evict(self):
+        now = time.monotonic()
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[1] >= now}
+        # Hammasi hali yaroqli bo'lsa, eng eskilarining yarmini tashlaymiz (dict tartibi = qo'shilish tartibi)
+        if len(self._entries) >= MAX_ENTRIES:
+            keys = list(self._entries)[:MAX_ENTRIES // 2]
+            for key in keys:
+                del self._entries[key]
+
+    async def _verify(self, bot: Bot, user_id: int, chat_id: int) -> bool:
+        try:
+            member = is_member(await bot.get_chat_member(chat_id=chat_id, user_id=user_id))
+        except Exception as e:
+            # Bot kanalda admin bo'lmasa va h.k.: foydalanuvchini to'sib qo'ymaymiz, keshlamaymiz
+            log.warning(f"get_chat_member({chat_id}, {user_id}) failed: {e}")
+            return True
+        self.set(user_id, chat_id, member)
+        return member
+
+    async def missing_channels(self, bot: Bot, user_id: int, chat_ids: Iterable[int],
+                               fresh: bool = False) -> List[int]:
+        """Channels `user_id` has not joined; `fresh` re-checks cached "not a member" entries."""
+        chat_ids = list(chat_ids)
+        known = {chat_id: self.get(user_id, chat_id) for chat_id in chat_ids}
+        misses = [chat_id for chat_id, member in known.items() if member is None or (fresh and not member)]
+        metrics.counter("membership.hits").inc(len(chat_ids) - len(misses))
+        metrics.counter("membership.misses").inc(len(misses))
+        if misses:
+            results = await asyncio.gather(*(self._verify(bot, user_id, chat_id) for chat_id in misses))
+            known.update(zip(misses, results))
+        return [chat_id for chat_id in chat_ids if not known[chat_id]]
+
+
+membership = MembershipCache(MEMBERSHIP_TTL, MEMBERSHIP_NEGATIVE_TTL)
+
+
+def _apply_member(key: str):
+    user_id, chat_id, member = json.loads(key)
+    membership.set(user_id, chat_id, member)
+
+
+# chat_member yangilanishi faqat bitta nodega keladi; qolganlari shu hodisadan biladi
+invalidation_bus.subscribe("membership", _apply_member, membership.clear)
@@ -0,0 +1,79 @@
+import time
+from collections import deque
+from typing import Deque, Dict
+
+RESERVOIR_SIZE = 1024
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Histogram:
+    """Count/sum/max plus percentiles over the last ``RESERVOIR_SIZE`` observations."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Metrics:
+    """Process-local metrics registry; rendered for admins with /metrics."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[str, Counter] = {}
+        self.gauges: Dict[str, Gauge] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def counter(self, name: str) -> Counter:
+        return self.counters.setdefault(name, Counter())
+
+    def gauge(self, name: str) -> Gauge:
+        return self.gauges.setdefault(name, Gauge())
+
+    def histogram(self, name: str) -> Histogram:
+        return self.histograms.setdefault(name, Histogram())
+
+    def render(self) -> str:
+        lines = [f"uptime_s {int(time.time() - self.started)}"]
+        for name, counter in sorted(self.counters.items()):
+            lines.append(f"{name} {counter.value:g}")
+        for name, gauge in sorted(self.gauges.items()):
+            lines.append(f"{name} {gauge.value:g}")
+        for name, h in sorted(self.histograms.items()):
+            avg = h.sum / h.count if h.count else 0
+            lines.append(
+                f"{name} count={h.count} avg={avg:.1f} p50={h.percentile(0.5):.1f} "
+                f"p99={h.percentile(0.99):.1f} max={h.max:.1f}"
+            )
+        return "\n".join(lines)
+
+
+metrics = Metrics()
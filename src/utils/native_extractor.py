@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+log = logging.getLogger("native-extractor")
+
+SHORTCODE_PATTERN = re.compile(r"instagram\.com/(?:[A-Za-z0-9_.]+/)?(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)")
+# Embed sahifasida post ma'lumoti JSON satr ichidagi JSON sifatida keladi
+CONTEXT_JSON_PATTERN = re.compile(r'"contextJSON":("(?:[^"\\]|\\.)*")')
+IG_APP_ID = "936619743392459"  # instagram.com veb-ilovasi so'rovlarda yuboradigan ID
+CHUNK_SIZE = 64 * 1024
+MEDIA_PARALLELISM = 4  # bitta karusel uchun bir vaqtda yuklanadigan fayllar
+
+# (yuklash havolasi, fayl kengaytmasi)
+MediaRef = Tuple[str, str]
+
+
+class ExtractorError(Exception):
+    """The post can not be resolved natively; the next downloader should try."""
+
+
+class NativeExtractor:
+    """
+    Resolves public posts and reels to direct media URLs with plain HTTP
+    requests and streams the files into the job's workspace.
+
+    Tried in order: the embed page (no login, carries ``shortcode_media``
+    for most posts) and the web GraphQL endpoint (``doc_id`` from config;
+    skipped when empty). Everything goes through the caller's long-lived
+    ``aiohttp`` session, so connections to Instagram and the CDN are
+    reused between downloads. ``base_url`` points the page/API requests
+    elsewhere, e.g. at a local server replaying recorded responses; media
+    URLs are taken from the responses as they are.
+    """
+
+    def __init__(self, session: Callable[[], aiohttp.ClientSession], base_url: str, graphql_doc_id: str = ""):
+        self._session = session
+        self.base_url = base_url.rstrip("/")
+        self.graphql_doc_id = graphql_doc_id
+
+    @staticmethod
+    def shortcode(url: str) -> str:
+        match = SHORTCODE_PATTERN.search(url)
+        if not match:
+            # Story / highlight larni faqat login bilan olish mumkin
+            raise ExtractorError(f"Unsupported URL for native extractor: {url}")
+        return match.group(1)
+
+    async def download(self, url: str, temp_dir: Path,
+                       on_file: Optional[Callable[[Path], None]] = None) -> Tuple[List[Path], str, str]:
+        shortcode = self.shortcode(url)
+        media, refs = await self.resolve(shortcode)
+        semaphore = asyncio.Semaphore(MEDIA_PARALLELISM)
+
+        async def fetch(index: int, ref: MediaRef) -> Path:
+            # Tartib fayl nomida: karusel tartibi saqlanadi
+            path = temp_dir / f"{shortcode}_{index:02d}.{ref[1]}"
+            async with semaphore:
+                await self._stream_to(ref[0], path)
+            if on_file:
+                on_file(path)
+            return path
+
+        tasks = [asyncio.create_task(fetch(index, ref)) for index, ref in enumerate(refs)]
+        try:
+            files = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Keyingi yuklovchi shu papkaga yozadi: chala natija aralashmasin
+            for task in tasks:
+                if not task.cancelled() and task.exception() is None:
+                    task.result().unlink(missing_ok=True)
+            raise
+        owner = (media.get("owner") or {}).get("username") or "instagram"
+        caption = media_caption(media)
+        title = f"{owner} - {(caption[:50] + '...') if caption else 'Instagram media'}"
+        return list(files), title, caption
+
+    async def resolve(self, shortcode: str) -> Tuple[dict, List[MediaRef]]:
+        """Return the post's ``shortcode_media`` object and its media URLs."""
+        errors = []
+        for name, resolver in (("embed", self._from_embed), ("graphql", self._from_graphql)):
+            try:
+                media = await resolver(shortcode)
+                refs = media_refs(media) if media else []
+            except ExtractorError as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if refs:
+                return media, refs
+            errors.append(f"{name}: no media")
+        raise ExtractorError("; ".join(errors))
+
+    async def _from_embed(self, shortcode: str) -> Optional[dict]:
+        async with self._session().get(f"{self.base_url}/p/{shortcode}/embed/captioned/") as response:
+            _check_status(response)
+            html = await response.text()
+        match = CONTEXT_JSON_PATTERN.search(html)
+        if not match:
+            return None
+        try:
+            context = json.loads(json.loads(match.group(1)))
+        except ValueError as e:
+            raise ExtractorError(f"Unexpected embed page: {e}")
+        return (context.get("gql_data") or {}).get("shortcode_media")
+
+    async def _from_graphql(self, shortcode: str) -> Optional[dict]:
+        if not self.graphql_doc_id:
+            return None
+        params = {"doc_id": self.graphql_doc_id, "variables": json.dumps({"shortcode": shortcode})}
+        headers = {"X-IG-App-ID": IG_APP_ID, "X-Requested-With": "XMLHttpRequest"}
+        async with self._session().get(f"{self.base_url}/graphql/query/", params=params,
+                                       headers=headers) as response:
+            _check_status(response)
+            data = (await response.json(content_type=None)).get("data") or {}
+        return data.get("xdt_shortcode_media") or data.get("shortcode_media")
+
+    async def _stream_to(self, url: str, path: Path):
+        # Yarim yozilgan fayl hech qachon tayyor fayl nomi bilan ko'rinmaydi
+        part = path.with_name(path.name + ".part")
+        try:
+            async with self._session().get(url) as response:
+                _check_status(response)
+                # Disk sekin bo'lsa ham event loop (boshqa yuklashlar, webhook javoblari) to'xtab qolmaydi
+                file = await asyncio.to_thread(open, part, "wb")
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        await asyncio.to_thread(file.write, chunk)
+                finally:
+                    await asyncio.to_thread(file.close)
+            await asyncio.to_thread(os.replace, part, path)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+
+
+def _check_status(response: aiohttp.ClientResponse):
+    # Xabarlar download_jobs._user_error dagi iboralarga mos
+    if response.status == 404:
+        raise ExtractorError("Content not found")
+    if response.status in (401, 403) or urlsplit(str(response.url)).path.startswith("/accounts/login"):
+        raise ExtractorError("login required")
+    if response.status == 429:
+        raise ExtractorError("rate limit (429)")
+    if response.status >= 400:
+        raise ExtractorError(f"HTTP {response.status} for {urlsplit(str(response.url)).path}")
+
+
+def media_refs(media: dict) -> List[MediaRef]:
+    """Direct URLs of every item of a ``shortcode_media`` (carousel children in order)."""
+    children = (media.get("edge_sidecar_to_children") or {}).get("edges")
+    nodes = [edge["node"] for edge in children] if children else [media]
+    refs = []
+    for node in nodes:
+        if node.get("is_video"):
+            if not node.get("video_url"):
+                # Embed ba'zan videoning faqat muqovasini beradi: boshqa usul urinsin
+                raise ExtractorError("Video URL is missing")
+            refs.append((node["video_url"], "mp4"))
+        elif node.get("display_url"):
+            refs.append((node["display_url"], "jpg"))
+    return refs
+
+
+def media_caption(media: dict) -> str:
+    edges = (media.get("edge_media_to_caption") or {}).get("edges") or []
+    return edges[0]["node"].get("text", "") if edges else ""
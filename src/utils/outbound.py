@@ -0,0 +1,324 @@
+import asyncio
+import bisect
+import contextlib
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Set, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message
+
+from config import (
+    TG_GLOBAL_RATE, TG_CHAT_RATE, TG_CHAT_BURST, TG_GROUP_RATE, TG_STATUS_EDIT_INTERVAL, TG_STORAGE_BURST,
+    SENDING_PROCESSES,
+)
+
+log = logging.getLogger("outbound")
+
+# Telegram ushbu metodlarni "xabar yuborish" deb hisoblaydi va limitga kiritadi
+THROTTLED_METHODS = {
+    "sendMessage", "sendPhoto", "sendVideo", "sendAudio", "sendDocument", "sendAnimation",
+    "sendVoice", "sendVideoNote", "sendMediaGroup", "sendSticker", "sendLocation", "sendContact",
+    "copyMessage", "copyMessages", "forwardMessage", "forwardMessages",
+    "editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup",
+}
+MAX_RETRY_AFTER_ATTEMPTS = 3
+IDLE_BUCKET_LIMIT = 10000
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `capacity` stored."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (used on RetryAfter)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def available(self) -> float:
+        """Tokens that can be taken right now without waiting."""
+        now = time.monotonic()
+        if self.paused_until > now or self._lock.locked():
+            return 0.0
+        self._refill(now)
+        return max(0.0, self.tokens)
+
+    def is_idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self, cost: float = 1.0):
+        # capacity dan qimmat so'rov (masalan, 10 talik albom) "qarzga" oladi: keyingilar kutadi
+        need = min(cost, self.capacity)
+        async with self._lock:  # FIFO: navbatdagilar ketma-ket token oladi
+            while True:
+                now = time.monotonic()
+                if self.paused_until > now:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= need:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((need - self.tokens) / self.rate)
+
+
+class SlidingWindow:
+    """
+    At most `capacity` messages in any `capacity / rate` seconds.
+
+    A full TokenBucket lets ``capacity + rate * T`` through in T seconds, so
+    a group bucket with a burst would overshoot Telegram's 20 per minute.
+    Here a burst uses up the window instead, and no minute sees more than
+    ``rate * 60``. Takes the same calls as TokenBucket.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.capacity = max(1, int(round(capacity, 6)))  # 20/60*60/4 float xatosi bilan 4 bo'lib qolmasin
+        self.window = self.capacity / rate
+        self.sent: List[float] = []  # har xabar uchun vaqt, tartiblangan
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _expire(self, now: float):
+        expired = bisect.bisect_right(self.sent, now - self.window)
+        del self.sent[:expired]
+
+    def pause(self, seconds: float):
+        """Stop handing out slots for `seconds` (used on RetryAfter)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def available(self) -> float:
+        """Messages that can go right now without waiting."""
+        now = time.monotonic()
+        if self.paused_until > now or self._lock.locked():
+            return 0.0
+        self._expire(now)
+        return float(max(0, self.capacity - len(self.sent)))
+
+    def is_idle(self) -> bool:
+        self._expire(time.monotonic())
+        return not self.sent and not self._lock.locked()
+
+    async def acquire(self, cost: float = 1.0):
+        count = max(1, math.ceil(cost))
+        need = min(count, self.capacity)
+        async with self._lock:  # FIFO, TokenBucket dagidek
+            while True:
+                now = time.monotonic()
+                if self.paused_until > now:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._expire(now)
+                if len(self.sent) + need <= self.capacity:
+                    # capacity dan katta albomning ortig'i keyingi oynalarni band qiladi
+                    for index in range(count):
+                        bisect.insort(self.sent, now + self.window * (index // self.capacity))
+                    return
+                await asyncio.sleep(self.sent[len(self.sent) + need - self.capacity - 1] + self.window - now)
+
+
+ChatBucket = Union[TokenBucket, SlidingWindow]
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Single place where outgoing Bot API traffic is paced.
+
+    Registered as a session middleware, so every call made through the bot
+    (``message.answer``, ``bot.copy_message`` ...) passes the global and the
+    per-chat token buckets and gets TelegramRetryAfter handled here.
+    It also owns status-message edits (coalesced) and delayed deletes.
+
+    One scheduler serves every tenant bot of the process; Telegram counts
+    its limits per token, so buckets and pauses are kept per ``bot.id``.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float, group_rate: float,
+                 edit_interval: float, global_burst: float = 1, storage_burst: float = 20):
+        # Global limit "sekundiga N ta": burst katta bo'lsa, bitta sekundga rate + burst sig'ib qoladi
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.storage_burst = storage_burst
+        self.edit_interval = edit_interval
+        # Karusel yuklanadigan kanallar (bot.id -> chat_id lar): limit o'sha, zaxira bitta karuselga yetadi
+        self._storage_chats: DefaultDict[int, Set[int]] = defaultdict(set)
+        self._global_buckets: Dict[int, TokenBucket] = {}
+        self._chat_buckets: Dict[Tuple[int, int], ChatBucket] = {}
+        # Kalit: (bot.id, chat_id, message_id)
+        self._pending_edits: Dict[Tuple[int, int, int], Tuple[Bot, str, dict]] = {}
+        self._edit_tasks: Dict[Tuple[int, int, int], asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._delete_tasks: Set[asyncio.Task] = set()  # to'xtashda uyg'otiladi
+        # Bot RetryAfter olganda bular ham to'xtatiladi (masalan, broadcast engine bucketi)
+        self.linked_buckets: DefaultDict[int, Set[TokenBucket]] = defaultdict(set)
+
+    # ----------------------- Buckets -----------------------
+    def global_bucket(self, bot: Bot) -> TokenBucket:
+        bucket = self._global_buckets.get(bot.id)
+        if bucket is None:
+            bucket = self._global_buckets[bot.id] = TokenBucket(self.global_rate, self.global_burst)
+        return bucket
+
+    def add_storage_chats(self, bot: Bot, chat_ids):
+        self._storage_chats[bot.id].update(chat_ids)
+
+    def available(self, bot: Bot, chat_id: int) -> float:
+        """Messages that can go to `chat_id` right now without waiting for its bucket."""
+        return self._chat_bucket(bot, chat_id).available()
+
+    def _chat_bucket(self, bot: Bot, chat_id: int) -> ChatBucket:
+        key = (bot.id, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            if len(self._chat_buckets) > IDLE_BUCKET_LIMIT:
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_idle()}
+            # Guruh/kanal: 20 ta xabar / daqiqa. Burst oynani band qiladi, ustiga qo'shilmaydi
+            if chat_id in self._storage_chats[bot.id]:
+                bucket = SlidingWindow(self.group_rate, self.storage_burst)
+            elif chat_id < 0:
+                bucket = SlidingWindow(self.group_rate, self.group_rate * 60 / 4)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[key] = bucket
+        return bucket
+
+    @staticmethod
+    def _cost(method: TelegramMethod) -> float:
+        if media := getattr(method, "media", None):
+            if isinstance(media, list):
+                return float(len(media))
+        # copyMessages/forwardMessages bitta so'rov: 429 kelsa, RetryAfter baribir hammani to'xtatadi
+        return 1.0
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]):
+        throttled = method.__api_method__ in THROTTLED_METHODS
+        chat_id = getattr(method, "chat_id", None)
+        cost = self._cost(method)
+        global_bucket = self.global_bucket(bot)
+
+        for attempt in range(MAX_RETRY_AFTER_ATTEMPTS + 1):
+            if throttled:
+                if isinstance(chat_id, int):
+                    await self._chat_bucket(bot, chat_id).acquire(cost)
+                await global_bucket.acquire(cost)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= MAX_RETRY_AFTER_ATTEMPTS:
+                    raise
+                log.warning(f"RetryAfter {e.retry_after}s on {method.__api_method__} (chat {chat_id}), pausing")
+                # Telegram flood-limit: shu botning butun oqimini to'xtatamiz, bitta task emas
+                global_bucket.pause(e.retry_after)
+                for bucket in self.linked_buckets[bot.id]:
+                    bucket.pause(e.retry_after)
+                if isinstance(chat_id, int):
+                    self._chat_bucket(bot, chat_id).pause(e.retry_after)
+                if not throttled:
+                    await asyncio.sleep(e.retry_after)
+
+    # ----------------------- Background tasks --------------
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def edit_status(self, message: Message, text: str, **kwargs) -> None:
+        """
+        Schedule a status-message edit without waiting for it.
+        Edits of the same message are serialized, throttled to one per
+        `edit_interval` and intermediate texts are dropped (only the latest wins).
+        """
+        self.edit_status_by_id(message.bot, message.chat.id, message.message_id, text, **kwargs)
+
+    def edit_status_by_id(self, bot: Bot, chat_id: int, message_id: int, text: str, **kwargs) -> None:
+        """Same as ``edit_status`` for a message known only by ids (e.g. stored in the DB)."""
+        key = (bot.id, chat_id, message_id)
+        self._pending_edits[key] = (bot, text, kwargs)
+        if key not in self._edit_tasks:
+            self._edit_tasks[key] = self._spawn(self._flush_edits(key))
+
+    async def _flush_edits(self, key: Tuple[int, int, int]):
+        try:
+            while key in self._pending_edits:
+                bot, text, kwargs = self._pending_edits.pop(key)
+                try:
+                    await bot.edit_message_text(text=text, chat_id=key[1], message_id=key[2], **kwargs)
+                except TelegramBadRequest as e:
+                    if "not modified" not in str(e).lower():
+                        log.warning(f"Status edit failed for {key}: {e}")
+                except Exception as e:
+                    log.warning(f"Status edit failed for {key}: {e}")
+                if key in self._pending_edits:
+                    await asyncio.sleep(self.edit_interval)
+        finally:
+            self._edit_tasks.pop(key, None)
+
+    async def wait_edits(self, message: Message):
+        """Wait until the queued edits of `message` reach Telegram."""
+        await self._wait_edits((message.bot.id, message.chat.id, message.message_id))
+
+    async def _wait_edits(self, key: Tuple[int, int, int]):
+        task = self._edit_tasks.get(key)
+        if task:
+            with contextlib.suppress(Exception):
+                await asyncio.shield(task)
+
+    def delete_later(self, message: Message, delay: float) -> None:
+        """Delete `message` after `delay` seconds without holding the handler."""
+        self.delete_later_by_id(message.bot, message.chat.id, message.message_id, delay)
+
+    def delete_later_by_id(self, bot: Bot, chat_id: int, message_id: int, delay: float) -> None:
+        task = self._spawn(self._delete_after(bot, (bot.id, chat_id, message_id), delay))
+        self._delete_tasks.add(task)
+        task.add_done_callback(self._delete_tasks.discard)
+
+    async def _delete_after(self, bot: Bot, key: Tuple[int, int, int], delay: float):
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.sleep(delay)
+        await self._wait_edits(key)
+        self._pending_edits.pop(key, None)
+        with contextlib.suppress(Exception):
+            await bot.delete_message(chat_id=key[1], message_id=key[2])
+
+    async def close(self, timeout: float = 10):
+        """Flush pending edits/deletes on shutdown."""
+        if not self._tasks:
+            return
+        # Kechiktirilgan o'chirishlarni kutib o'tirmaymiz: uyqudan uyg'otamiz
+        for task in list(self._delete_tasks):
+            task.cancel()
+        await asyncio.wait(list(self._tasks), timeout=timeout)
+
+
+outbound = OutboundScheduler(
+    # Har bir jarayon token limitining o'z ulushini oladi: jami TG_GLOBAL_RATE dan oshmaydi
+    global_rate=TG_GLOBAL_RATE / SENDING_PROCESSES,
+    chat_rate=TG_CHAT_RATE,
+    chat_burst=TG_CHAT_BURST,
+    group_rate=TG_GROUP_RATE,
+    edit_interval=TG_STATUS_EDIT_INTERVAL,
+    storage_burst=TG_STORAGE_BURST,
+)
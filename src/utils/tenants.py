@@ -0,0 +1,145 @@
+import itertools
+import json
+from functools import partial
+from typing import Dict, Iterator, List, Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+
+from config import ADMIN_ID, BOT_SIGNATURE, BOT_TOKEN, STORAGE_CHAT_IDS, TENANTS_FILE
+from src.db.repository import AccountRepo
+from src.utils.channel_registry import ChannelRegistry
+from src.utils.invalidation import invalidation_bus
+from src.utils.known_users import UserIdSet
+from src.utils.outbound import outbound
+
+# Ko'p tenantli rejimdan oldingi qatorlar (ustun default qiymati) shu botniki
+MAIN_TENANT = "main"
+
+
+class Tenant:
+    """
+    One branded bot hosted by this process.
+
+    Everything tied to a bot token lives here: the ``Bot`` itself, its admins,
+    the caption signature, mandatory channels and the known / blocked user
+    sets. Per-bot tables carry ``name`` in their ``tenant`` column; the
+    downloader, the job queue and the outbound limiter are shared.
+    """
+
+    def __init__(self, name: str, token: str, admins: List[int], signature: str, storage_chats: List[int] = ()):
+        self.name = name
+        self.bot = Bot(token=token, default=DefaultBotProperties(link_preview_is_disabled=True))
+        self.admins = admins
+        self.signature = signature
+        # Navbat bilan: har bir kanalning daqiqalik limiti alohida
+        self._storage_chats = itertools.cycle(storage_chats) if storage_chats else None
+        outbound.add_storage_chats(self.bot, storage_chats)
+        self.channels = ChannelRegistry(name, self.bot)
+        self.known_users = UserIdSet(f"{name} known", partial(AccountRepo.user_ids_after, name))
+        # Botni bloklaganlar: ular yana yozsa, blok belgisi olib tashlanadi
+        self.blocked_users = UserIdSet(f"{name} blocked", partial(AccountRepo.blocked_user_ids_after, name))
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admins
+
+    def storage_chat(self) -> Optional[int]:
+        """Chat for carousel uploads (src/utils/downloader.py), None when not configured."""
+        return next(self._storage_chats) if self._storage_chats else None
+
+    async def load(self):
+        await self.known_users.load()
+        await self.blocked_users.load()
+        await self.channels.load()
+
+
+class TenantRegistry:
+    """Tenants of this process, found by name (DB rows) or by bot (incoming updates)."""
+
+    def __init__(self, tenants: List[Tenant]):
+        if not tenants:
+            raise ValueError("No bots configured: set BOT_TOKEN or TENANTS_FILE")
+        self._by_name: Dict[str, Tenant] = {}
+        self._by_bot_id: Dict[int, Tenant] = {}
+        for tenant in tenants:
+            if tenant.name in self._by_name or tenant.bot.id in self._by_bot_id:
+                raise ValueError(f"Duplicate tenant {tenant.name!r} or bot token")
+            self._by_name[tenant.name] = tenant
+            self._by_bot_id[tenant.bot.id] = tenant
+
+    def __iter__(self) -> Iterator[Tenant]:
+        return iter(self._by_name.values())
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def bots(self) -> List[Bot]:
+        return [tenant.bot for tenant in self]
+
+    def get(self, name: str) -> Optional[Tenant]:
+        return self._by_name.get(name)
+
+    def for_bot(self, bot: Bot) -> Tenant:
+        return self._by_bot_id[bot.id]
+
+    async def load(self):
+        for tenant in self:
+            await tenant.load()
+
+    async def close(self):
+        for bot in self.bots():
+            await bot.session.close()
+
+
+def _read_tenants() -> List[Tenant]:
+    if not TENANTS_FILE:
+        return [Tenant(MAIN_TENANT, BOT_TOKEN, ADMIN_ID, BOT_SIGNATURE, STORAGE_CHAT_IDS)]
+    with open(TENANTS_FILE, encoding="utf-8") as file:
+        entries = json.load(file)
+    return [
+        Tenant(entry["name"], entry["token"], [int(admin_id) for admin_id in entry.get("admins", ())],
+               entry.get("signature", BOT_SIGNATURE), [int(chat_id) for chat_id in entry.get("storage_chats", ())])
+        for entry in entries
+    ]
+
+
+tenants = TenantRegistry(_read_tenants())
+
+
+# Boshqa nodelardagi o'zgarishlar (src/utils/invalidation.py)
+def _apply_registered(key: str):
+    name, user_ids = json.loads(key)
+    tenant = tenants.get(name)
+    if tenant:
+        for user_id in user_ids:
+            tenant.known_users.add(user_id)
+
+
+def _apply_blocked(key: str):
+    for name, user_id, blocked in json.loads(key):
+        tenant = tenants.get(name)
+        if tenant is None:
+            continue
+        if blocked:
+            tenant.blocked_users.add(user_id)
+        else:
+            tenant.blocked_users.discard(user_id)
+
+
+async def _apply_channels(key: str):
+    tenant = tenants.get(key)
+    if tenant:
+        await tenant.channels.load()
+
+
+async def _resync(attribute: str):
+    for tenant in tenants:
+        await getattr(tenant, attribute).load()
+
+
+invalidation_bus.subscribe("known_users", _apply_registered, partial(_resync, "known_users"))
+invalidation_bus.subscribe("blocked", _apply_blocked, partial(_resync, "blocked_users"))
+invalidation_bus.subscribe("channels", _apply_channels, partial(_resync, "channels"))
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import WEBHOOK_DRAIN_TIMEOUT, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_PATH
+
+log = logging.getLogger("webhook")
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """
+    Answers Telegram with 200 right away and handles the update in a task.
+
+    On shutdown the server first stops accepting requests, then ``drain``
+    waits up to ``WEBHOOK_DRAIN_TIMEOUT`` for updates already acknowledged,
+    since Telegram will not send them again.
+    """
+
+    async def drain(self, app: web.Application):
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+        log.info(f"Draining {len(tasks)} in-flight updates")
+        _, pending = await asyncio.wait(tasks, timeout=WEBHOOK_DRAIN_TIMEOUT)
+        if pending:
+            log.warning(f"{len(pending)} updates still running after {WEBHOOK_DRAIN_TIMEOUT}s, cancelling")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def webhook_path(name: str) -> str:
+    """Every tenant bot gets its own URL: ``WEBHOOK_PATH/<tenant>``."""
+    return f"{WEBHOOK_PATH.rstrip('/')}/{name}"
+
+
+def build_app(dp: Dispatcher, bots: Dict[str, Bot], secret: str) -> web.Application:
+    app = web.Application()
+    handlers = []
+    for name, bot in bots.items():
+        handler = DrainingRequestHandler(dp, bot, handle_in_background=True, secret_token=secret)
+        app.router.add_post(webhook_path(name), handler.handle)
+        handlers.append(handler)
+    # Tartib: yangilanishlarni tugatish -> dp.shutdown (baza, buferlar) -> bot sessiyalarini yopish
+    for handler in handlers:
+        app.on_shutdown.append(handler.drain)
+    setup_application(app, dp)
+    for handler in handlers:
+        app.on_shutdown.append(handler._handle_close)
+    return app
+
+
+async def register_webhook(bot: Bot, url: str, secret: str, allowed_updates: List[str]):
+    await bot.set_webhook(url, secret_token=secret, allowed_updates=allowed_updates,
+                          max_connections=WEBHOOK_MAX_CONNECTIONS)
+    log.info(f"Webhook set to {url}")
+
+
+def serve(worker: Callable[[int], None], workers: int):
+    """
+    Run ``worker`` (a module-level function that starts the aiohttp app) in
+    ``workers`` processes sharing one port via SO_REUSEPORT; the kernel spreads
+    Telegram's connections between them. A worker that dies is restarted;
+    SIGTERM is passed on so every worker drains before exiting.
+
+    ``worker`` gets its index (0 .. workers - 1), which keeps across restarts,
+    so exactly one process can own the background jobs. Every process sends
+    with the same tokens: see ``SENDING_PROCESSES`` in config.py.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = False
+
+    def start(index: int):
+        process = context.Process(target=worker, args=(index,), name=f"webhook-{index}")
+        process.start()
+        processes[process.sentinel] = (index, process)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        if signum == signal.SIGTERM:
+            # Ctrl+C (SIGINT) guruhdagi hamma jarayonga o'zi yetib boradi
+            for _, process in processes.values():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        start(index)
+    log.info(f"Started {workers} webhook workers")
+
+    while processes:
+        for sentinel in wait(list(processes)):
+            index, process = processes.pop(sentinel)
+            process.join()
+            if not stopping:
+                log.error(f"Webhook worker {index} exited with code {process.exitcode}, restarting")
+                time.sleep(1)
+                start(index)
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# config.py muhitni import paytida o'qiydi: testlar Telegram/Postgres siz, vaqtinchalik SQLite bilan ishlaydi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ.setdefault("ADMINS_ID", "1")
+os.environ.setdefault("DB_TYPE", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="my-reels-tests-"), "test.db"))
+os.environ.setdefault("TENANTS_FILE", "")
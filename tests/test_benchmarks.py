@@ -0,0 +1,39 @@
+import contextlib
+import importlib.util
+import io
+import os
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+from src.utils.outbound import outbound
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+def load(name: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BENCHMARKS, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BenchmarkSmokeTest(unittest.IsolatedAsyncioTestCase):
+    """Benchmarklar kichik hajmda ishga tushadi: kod API si o'zgarsa shu yerda sinadi."""
+
+    async def run_bench(self, name: str, *argv: str) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            await load(name).main(list(argv))
+        return output.getvalue()
+
+    async def test_broadcast_bench(self):
+        output = await self.run_bench("broadcast_bench", "--users", "20", "--skip-legacy")
+        self.assertIn("sent=20 ", output)
+
+    async def test_carousel_bench(self):
+        # Benchmark umumiy outbound ni sozlaydi: qolgan testlarga ta'sir qilmasin
+        with mock.patch.multiple(outbound, _chat_buckets={}, _storage_chats=defaultdict(set),
+                                 storage_burst=outbound.storage_burst):
+            output = await self.run_bench("carousel_bench", "--items", "3", "--download", "0", "--upload", "0")
+        self.assertEqual(output.count("items=3 "), 3)
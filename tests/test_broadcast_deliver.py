@@ -0,0 +1,33 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.utils.broadcast import deliver
+
+
+class DeliverTest(unittest.IsolatedAsyncioTestCase):
+    def tenant(self, **bot_methods):
+        bot = SimpleNamespace(copy_message=mock.AsyncMock(return_value=SimpleNamespace(message_id=501)),
+                              delete_messages=mock.AsyncMock(), **bot_methods)
+        return SimpleNamespace(name="main", bot=bot)
+
+    async def test_delete_runs_once_after_send(self):
+        tenant = self.tenant()
+        self.assertIsNone(await deliver(tenant, "copy", 7, -100, [3], delete=True))
+        tenant.bot.copy_message.assert_awaited_once()
+        tenant.bot.delete_messages.assert_awaited_once_with(chat_id=7, message_ids=[501])
+
+    async def test_delete_failure_does_not_resend(self):
+        tenant = self.tenant()
+        tenant.bot.delete_messages.side_effect = RuntimeError("boom")
+        # Xabar yetkazildi: o'chirish xatosi yuborish xatosi hisoblanmaydi
+        self.assertIsNone(await deliver(tenant, "copy", 7, -100, [3], delete=True))
+        tenant.bot.copy_message.assert_awaited_once()
+
+    async def test_send_failure_skips_delete(self):
+        tenant = self.tenant()
+        tenant.bot.copy_message.side_effect = RuntimeError("down")
+        with mock.patch("src.utils.broadcast.asyncio.sleep", new_callable=mock.AsyncMock):
+            self.assertEqual(await deliver(tenant, "copy", 7, -100, [3], delete=True), "down")
+        self.assertEqual(tenant.bot.copy_message.await_count, 5)
+        tenant.bot.delete_messages.assert_not_awaited()
@@ -0,0 +1,74 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from src.utils import downloader
+from src.utils.downloader import CarouselUploader
+
+
+class _Bot:
+    id = 1
+
+    def __init__(self):
+        self.stored = []
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.stored.append((chat_id, Path(photo.path).name))
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"id-{Path(photo.path).stem}")])
+
+
+class CarouselUploaderTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.files = []
+        for index in range(4):
+            path = Path(directory.name) / f"p{index}.jpg"
+            path.write_bytes(b"x")
+            self.files.append(path)
+        self.bot = _Bot()
+        self.available = mock.patch.object(downloader.outbound, "available", return_value=20.0)
+        self.available.start()
+        self.addCleanup(self.available.stop)
+        self.direct = mock.AsyncMock(return_value=(["direct"], ["photo"]))
+        self.albums = mock.AsyncMock()
+        for patcher in (mock.patch.object(downloader, "send_media_files", self.direct),
+                        mock.patch.object(downloader, "send_albums", self.albums)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_pipelines_from_the_second_file(self):
+        uploader = CarouselUploader(self.bot, -100)
+        uploader.submit(self.files[0])
+        await asyncio.sleep(0)
+        self.assertEqual(self.bot.stored, [])
+        for path in self.files[1:]:
+            uploader.submit(path)
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.bot.stored), 4)
+        file_ids, _ = await uploader.send(7, self.files, "t", "d", "s")
+        self.assertEqual(file_ids, ["id-p0", "id-p1", "id-p2", "id-p3"])
+        self.albums.assert_awaited_once()
+        self.direct.assert_not_awaited()
+
+    async def test_sends_directly_when_storage_tokens_run_out(self):
+        uploader = CarouselUploader(self.bot, -100)
+        downloader.outbound.available.return_value = 1.0
+        for path in self.files:
+            uploader.submit(path)
+        await asyncio.sleep(0)
+        # 4 ta fayl 1 ta tokenga sig'maydi: kanalga hech narsa yuklanmaydi
+        self.assertEqual(self.bot.stored, [])
+        self.assertEqual(await uploader.send(7, self.files, "t", "d", "s"), (["direct"], ["photo"]))
+        self.albums.assert_not_awaited()
+
+    async def test_without_storage_chat(self):
+        uploader = CarouselUploader(self.bot, None)
+        for path in self.files:
+            uploader.submit(path)
+        await uploader.send(7, self.files, "t", "d", "s")
+        self.assertEqual(self.bot.stored, [])
+        self.direct.assert_awaited_once()
@@ -0,0 +1,23 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.utils import channel_registry
+from src.utils.channel_registry import ChannelRegistry
+
+
+class ChannelRegistryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_extra_invite_link_is_revoked(self):
+        bot = mock.Mock()
+        bot.create_chat_invite_link = mock.AsyncMock(return_value=SimpleNamespace(invite_link="https://t.me/+mine"))
+        bot.revoke_chat_invite_link = mock.AsyncMock()
+        repo = mock.patch.multiple(
+            channel_registry.ChannelRepo,
+            all=mock.AsyncMock(return_value=[(-100, None)]),
+            set_invite_link=mock.AsyncMock(return_value="https://t.me/+theirs"),
+        )
+        with repo:
+            registry = ChannelRegistry("main", bot)
+            await registry.load()
+        self.assertEqual(registry.link(-100), "https://t.me/+theirs")
+        bot.revoke_chat_invite_link.assert_awaited_once_with(chat_id=-100, invite_link="https://t.me/+mine")
@@ -0,0 +1,49 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.utils import chat_info
+from src.utils.chat_info import ChatInfoCache
+
+
+class _Bot:
+    def __init__(self, bot_id: int):
+        self.id = bot_id
+        self.calls = 0
+
+    async def get_chat(self, chat_id: int):
+        self.calls += 1
+        if chat_id == 0:
+            raise RuntimeError("chat not found")
+        return SimpleNamespace(id=chat_id, bot_id=self.id)
+
+
+class ChatInfoCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_entries_are_per_bot(self):
+        cache = ChatInfoCache(ttl=60, concurrency=2)
+        first, second = _Bot(1), _Bot(2)
+        self.assertEqual((await cache.get_many(first, [-100]))[-100].bot_id, 1)
+        self.assertEqual((await cache.get_many(second, [-100]))[-100].bot_id, 2)
+        await cache.get_many(first, [-100])
+        self.assertEqual((first.calls, second.calls), (1, 1))
+
+        cache.invalidate(first, -100)
+        await cache.get_many(first, [-100])
+        await cache.get_many(second, [-100])
+        self.assertEqual((first.calls, second.calls), (2, 1))
+
+    async def test_errors_are_not_cached(self):
+        cache = ChatInfoCache(ttl=60, concurrency=2)
+        bot = _Bot(1)
+        result = await cache.get_many(bot, [0, -100])
+        self.assertIsInstance(result[0], RuntimeError)
+        await cache.get_many(bot, [0])
+        self.assertEqual(bot.calls, 3)
+
+    async def test_size_is_capped(self):
+        cache = ChatInfoCache(ttl=60, concurrency=2)
+        bot = _Bot(1)
+        with mock.patch.object(chat_info, "ENTRY_LIMIT", 3):
+            await cache.get_many(bot, [-1, -2, -3, -4])
+        self.assertEqual(len(cache._entries), 3)
+        self.assertNotIn((1, -1), cache._entries)
@@ -0,0 +1,38 @@
+import importlib
+import os
+import unittest
+from unittest import mock
+
+import config
+
+
+class DbTypeTest(unittest.TestCase):
+    def load(self, **env):
+        with mock.patch.dict(os.environ, env), mock.patch("dotenv.load_dotenv"):
+            try:
+                return importlib.reload(config)
+            finally:
+                self.addCleanup(importlib.reload, config)
+
+    def test_explicit_values(self):
+        self.assertEqual(self.load(DB_TYPE="SQLite").DB_TYPE, "sqlite")
+        self.assertEqual(self.load(DB_TYPE="postgres").DB_TYPE, "postgres")
+
+    def test_unknown_value_is_rejected(self):
+        for value in ("0", "1", "mysql", ""):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                self.load(DB_TYPE=value)
+
+    def test_legacy_variable_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.load(DBTYPE="0")
+
+
+class SendingProcessesTest(unittest.TestCase):
+    load = DbTypeTest.load
+    def test_polling_is_one_process(self):
+        self.assertEqual(self.load(BOT_MODE="polling", WEBHOOK_WORKERS="8").SENDING_PROCESSES, 1)
+
+    def test_webhook_workers_and_download_nodes_share_the_token(self):
+        loaded = self.load(BOT_MODE="webhook", WEBHOOK_WORKERS="4", DOWNLOAD_NODES="2")
+        self.assertEqual(loaded.SENDING_PROCESSES, 6)
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.utils import download_jobs
+from src.utils.download_jobs import DownloadWorker
+
+
+def _job(attempts: int) -> dict:
+    return {"id": 7, "tenant": "main", "url": "https://instagram.com/p/x", "user_id": 1, "chat_id": 1,
+            "status_message_id": 9, "attempts": attempts}
+
+
+class DownloadWorkerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repo = mock.patch.multiple(
+            download_jobs.DownloadJobRepo,
+            heartbeat=mock.AsyncMock(return_value=True),
+            release=mock.AsyncMock(return_value=True),
+            finish=mock.AsyncMock(),
+        )
+        self.repo.start()
+        self.addCleanup(self.repo.stop)
+        tenant = SimpleNamespace(name="main", admins=[], bot=mock.Mock())
+        for patcher in (mock.patch.object(download_jobs.tenants, "get", return_value=tenant),
+                        mock.patch.object(download_jobs, "outbound")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.worker = DownloadWorker()
+
+    def process(self, side_effect):
+        patcher = mock.patch.object(download_jobs, "process_download", side_effect=side_effect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_failure_is_requeued_until_max_attempts(self):
+        self.process(RuntimeError("rate limit (429)"))
+        await self.worker._execute(_job(1))
+        download_jobs.DownloadJobRepo.release.assert_awaited_once_with(
+            7, self.worker.name, "rate limit (429)", download_jobs.RETRY_DELAY)
+        download_jobs.DownloadJobRepo.finish.assert_not_awaited()
+
+        await self.worker._execute(_job(download_jobs.MAX_ATTEMPTS))
+        self.assertEqual(download_jobs.DownloadJobRepo.release.await_count, 1)
+        download_jobs.DownloadJobRepo.finish.assert_awaited_once_with(
+            7, self.worker.name, "failed", "rate limit (429)")
+
+    async def test_success(self):
+        self.process(None)
+        await self.worker._execute(_job(1))
+        download_jobs.DownloadJobRepo.finish.assert_awaited_once_with(7, self.worker.name, "done")
+
+    async def test_lost_lease_cancels_the_download(self):
+        cancelled = asyncio.Event()
+
+        async def download(tenant, job):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        self.process(download)
+        download_jobs.DownloadJobRepo.heartbeat.return_value = False
+        with mock.patch.object(download_jobs, "HEARTBEAT_INTERVAL", 0.01):
+            await asyncio.wait_for(self.worker._execute(_job(1)), 5)
+        self.assertTrue(cancelled.is_set())
+        # Ish endi boshqa workerniki: yakunlanmaydi ham, navbatga qaytarilmaydi ham
+        download_jobs.DownloadJobRepo.finish.assert_not_awaited()
+        download_jobs.DownloadJobRepo.release.assert_not_awaited()
+
+
+class FakeListener:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class DownloadWorkerListenTest(unittest.IsolatedAsyncioTestCase):
+    async def test_lost_listen_connection_is_reopened(self):
+        listeners = []
+
+        async def listen(channel, callback):
+            listeners.append(FakeListener())
+            return listeners[-1]
+
+        worker = DownloadWorker()
+        with mock.patch.object(download_jobs, "POLL_INTERVAL", 0.01), \
+                mock.patch.object(download_jobs.database, "listen", side_effect=listen), \
+                mock.patch.object(download_jobs.database, "dialect", "postgres"):
+            await worker.start(0)
+            self.assertEqual(len(listeners), 1)
+            listeners[0].closed = True
+            for _ in range(50):
+                if len(listeners) > 1:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(len(listeners), 2)
+            # Qayta ulangandan keyin navbat darhol tekshiriladi
+            self.assertTrue(worker._wakeup.is_set())
+            await worker._close_listener()
+            worker._listen_task.cancel()
+            await asyncio.gather(worker._listen_task, return_exceptions=True)
+        self.assertTrue(listeners[1].closed)
@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+
+from src.utils import invalidation
+from src.utils.invalidation import InvalidationBus
+
+
+class FakeLog:
+    """cache_events jadvali: `purged` dan kichik versiyalar tozalangan."""
+
+    def __init__(self, versions, purged=0):
+        self.versions = versions
+        self.purged = purged
+
+    async def after(self, version, limit):
+        return [{"version": v, "topic": "channels", "key": str(v), "origin": "other"}
+                for v in self.versions if v > version and v >= self.purged][:limit]
+
+    async def oldest(self):
+        retained = [v for v in self.versions if v >= self.purged]
+        return min(retained) if retained else None
+
+    async def latest(self):
+        return max(self.versions)
+
+
+class CatchUpTest(unittest.IsolatedAsyncioTestCase):
+    def bus(self, log: FakeLog, version: int):
+        for name in ("after", "oldest", "latest"):
+            patcher = mock.patch.object(invalidation.CacheEventRepo, name, side_effect=getattr(log, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        bus = InvalidationBus()
+        bus._version = version
+        self.applied = []
+        self.resyncs = 0
+
+        def resync():
+            self.resyncs += 1
+
+        bus.subscribe("channels", self.applied.append, resync)
+        return bus
+
+    async def test_sequence_gaps_are_applied_in_order(self):
+        # 3 va 6 bekor qilingan tranzaksiyalar
+        bus = self.bus(FakeLog([1, 2, 4, 5, 7]), version=2)
+        await bus._catch_up()
+        self.assertEqual(self.applied, ["4", "5", "7"])
+        self.assertEqual(self.resyncs, 0)
+        self.assertEqual(bus._version, 7)
+
+    async def test_gap_after_purge_is_not_a_loss(self):
+        bus = self.bus(FakeLog([1, 2, 4, 5], purged=2), version=2)
+        await bus._catch_up()
+        self.assertEqual(self.applied, ["4", "5"])
+        self.assertEqual(self.resyncs, 0)
+
+    async def test_purged_past_our_version_resyncs(self):
+        bus = self.bus(FakeLog(list(range(1, 11)), purged=8), version=3)
+        await bus._catch_up()
+        self.assertEqual(self.resyncs, 1)
+        self.assertEqual(self.applied, [])
+        self.assertEqual(bus._version, 10)
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from src.utils import known_users
+from src.utils.known_users import UserIdSet
+
+
+def _pages(ids):
+    ids = sorted(ids)
+
+    async def load_page(last: int, limit: int):
+        return [user_id for user_id in ids if user_id > last][:limit]
+
+    return load_page
+
+
+class UserIdSetTest(unittest.IsolatedAsyncioTestCase):
+    async def loaded(self, ids) -> UserIdSet:
+        users = UserIdSet("test", _pages(ids))
+        with mock.patch.object(known_users, "LOAD_BATCH_SIZE", 2):
+            await users.load()
+        return users
+
+    async def test_load_pages(self):
+        users = await self.loaded([5, 1, 3, 9, 7])
+        self.assertEqual(list(users._ids), [1, 3, 5, 7, 9])
+        self.assertEqual(len(users), 5)
+        self.assertIn(7, users)
+        self.assertNotIn(4, users)
+
+    async def test_add_and_discard(self):
+        users = await self.loaded([1, 2])
+        users.add(3)
+        users.add(3)
+        users.discard(1)
+        users.discard(42)
+        self.assertEqual(len(users), 2)
+        self.assertNotIn(1, users)
+        self.assertIn(3, users)
+        users.add(1)
+        self.assertIn(1, users)
+        self.assertEqual(len(users), 3)
+
+    async def test_merge_folds_changes_into_array(self):
+        users = await self.loaded([1, 2, 3])
+        users.add(10)
+        users.discard(2)
+        await users._merge()
+        self.assertEqual(list(users._ids), [1, 3, 10])
+        self.assertFalse(users._recent)
+        self.assertFalse(users._removed)
+
+    async def test_threshold_starts_merge(self):
+        users = await self.loaded([])
+        with mock.patch.object(known_users, "MERGE_THRESHOLD", 3):
+            for user_id in (3, 1, 2):
+                users.add(user_id)
+            await users._merge_task
+        self.assertEqual(list(users._ids), [1, 2, 3])
+
+    async def merge_with(self, users: UserIdSet, during):
+        """Run `during()` while the merge thread is in progress."""
+        release = threading.Event()
+        original = known_users._merge_sorted
+
+        def blocked(*args):
+            release.wait(5)
+            return original(*args)
+
+        with mock.patch.object(known_users, "_merge_sorted", blocked):
+            task = asyncio.create_task(users._merge())
+            await asyncio.sleep(0.05)
+            during()
+            release.set()
+            await task
+
+    async def test_discard_during_merge_of_recent_id(self):
+        users = await self.loaded([1])
+        users.add(5)
+        # 5 birlashtirilayotgan nusxada: massivga tushsa ham yo'q bo'lib qolishi kerak
+        await self.merge_with(users, lambda: users.discard(5))
+        self.assertNotIn(5, users)
+        self.assertEqual(len(users), 1)
+        await users._merge()
+        self.assertEqual(list(users._ids), [1])
+
+    async def test_readd_during_merge_of_removed_id(self):
+        users = await self.loaded([1, 2])
+        users.discard(2)
+        await self.merge_with(users, lambda: users.add(2))
+        self.assertIn(2, users)
+        await users._merge()
+        self.assertEqual(list(users._ids), [1, 2])
+
+    async def test_discard_then_readd_during_merge(self):
+        users = await self.loaded([1])
+        users.add(5)
+
+        def during():
+            users.discard(5)
+            users.add(5)
+
+        await self.merge_with(users, during)
+        self.assertIn(5, users)
+        await users._merge()
+        self.assertEqual(list(users._ids), [1, 5])
+
+    async def test_failed_merge_keeps_state(self):
+        users = await self.loaded([1, 2])
+        users.add(3)
+        users.discard(2)
+        with mock.patch.object(known_users, "_merge_sorted", side_effect=RuntimeError("boom")):
+            await users._merge()
+        self.assertEqual(sorted(user_id for user_id in (1, 2, 3) if user_id in users), [1, 3])
+        self.assertEqual(len(users), 2)
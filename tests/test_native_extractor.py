@@ -0,0 +1,114 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from src.utils.native_extractor import ExtractorError, NativeExtractor
+
+FIXTURES = Path(__file__).parent / "fixtures" / "instagram"
+EMBEDS = {"SINGLE1": "embed_single.html", "CAROUSEL1": "embed_carousel.html", "REEL1": "embed_reel.html",
+          "BROKEN1": "embed_broken.html"}
+GRAPHQL = {"REEL1": "graphql_reel.json"}
+
+
+class FakeInstagram:
+    """Serves the fixtures as instagram.com and the CDN; `{base}` in them points back here."""
+
+    def __init__(self):
+        self.requests = []
+
+    def _fixture(self, name: str) -> str:
+        return (FIXTURES / name).read_text().replace("{base}", self.base_url)
+
+    async def embed(self, request: web.Request) -> web.Response:
+        self.requests.append(request.path)
+        name = EMBEDS.get(request.match_info["shortcode"])
+        if not name:
+            raise web.HTTPNotFound()
+        return web.Response(text=self._fixture(name), content_type="text/html")
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        self.requests.append(request.path)
+        shortcode = json.loads(request.query["variables"])["shortcode"]
+        if shortcode not in GRAPHQL:
+            return web.json_response({"data": {"xdt_shortcode_media": None}})
+        return web.Response(text=self._fixture(GRAPHQL[shortcode]), content_type="application/json")
+
+    async def media(self, request: web.Request) -> web.StreamResponse:
+        name = request.match_info["name"]
+        if name == "broken.jpg":
+            # Uzilgan yuklash: e'lon qilingan hajmning bir qismi kelib, ulanish yopiladi
+            await asyncio.sleep(0.05)
+            response = web.StreamResponse(headers={"Content-Length": "100000"})
+            await response.prepare(request)
+            await response.write(b"x" * 1000)
+            request.transport.close()
+            return response
+        return web.Response(body=name.encode() * 100)
+
+    async def start(self) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_get("/p/{shortcode}/embed/captioned/", self.embed)
+        app.router.add_get("/graphql/query/", self.graphql)
+        app.router.add_get("/media/{name}", self.media)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return runner
+
+
+class NativeExtractorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeInstagram()
+        runner = await self.server.start()
+        self.addAsyncCleanup(runner.cleanup)
+        session = aiohttp.ClientSession()
+        self.addAsyncCleanup(session.close)
+        self.extractor = NativeExtractor(lambda: session, self.server.base_url, graphql_doc_id="123")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    async def test_single_post(self):
+        seen = []
+        files, title, caption = await self.extractor.download(
+            "https://www.instagram.com/p/SINGLE1/?igsh=abc", self.directory, seen.append)
+        self.assertEqual([path.name for path in files], ["SINGLE1_00.jpg"])
+        self.assertEqual(files[0].read_bytes(), b"single.jpg" * 100)
+        self.assertEqual(seen, files)
+        self.assertEqual((title, caption), ("natgeo - Sunrise over the Pamirs...", "Sunrise over the Pamirs"))
+        self.assertEqual(self.server.requests, ["/p/SINGLE1/embed/captioned/"])
+
+    async def test_carousel_keeps_order(self):
+        files, title, _ = await self.extractor.download(
+            "https://www.instagram.com/natgeo/p/CAROUSEL1/", self.directory)
+        self.assertEqual([path.name for path in files], ["CAROUSEL1_00.jpg", "CAROUSEL1_01.mp4", "CAROUSEL1_02.jpg"])
+        self.assertEqual(files[1].read_bytes(), b"c2.mp4" * 100)
+        self.assertEqual(title, "natgeo - Instagram media")
+
+    async def test_unsupported_url(self):
+        with self.assertRaises(ExtractorError):
+            await self.extractor.download("https://www.instagram.com/stories/natgeo/123/", self.directory)
+        self.assertEqual(self.server.requests, [])
+
+    async def test_missing_video_url_falls_back_to_graphql(self):
+        files, _, _ = await self.extractor.download("https://www.instagram.com/reel/REEL1/", self.directory)
+        self.assertEqual([path.name for path in files], ["REEL1_00.mp4"])
+        self.assertEqual(files[0].read_bytes(), b"reel.mp4" * 100)
+        self.assertEqual(self.server.requests, ["/p/REEL1/embed/captioned/", "/graphql/query/"])
+
+    async def test_not_found(self):
+        with self.assertRaisesRegex(ExtractorError, "Content not found"):
+            await self.extractor.download("https://www.instagram.com/p/MISSING1/", self.directory)
+
+    async def test_failed_download_leaves_no_files(self):
+        with self.assertRaises(aiohttp.ClientPayloadError):
+            await self.extractor.download("https://www.instagram.com/p/BROKEN1/", self.directory)
+        # Na .part, na tayyor bo'lgan birinchi fayl qolmaydi
+        self.assertEqual(list(self.directory.iterdir()), [])
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import unittest
+
+from src.utils.outbound import OutboundScheduler, SlidingWindow, TokenBucket
+
+
+class _Bot:
+    def __init__(self, bot_id: int = 1):
+        self.id = bot_id
+        self.deleted = []
+
+    async def delete_message(self, chat_id: int, message_id: int):
+        self.deleted.append((chat_id, message_id))
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_is_free_then_paced(self):
+        bucket = TokenBucket(rate=50, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.01)
+        await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.015)
+
+    async def test_expensive_request_borrows(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        started = time.monotonic()
+        # 10 talik albom capacity dan oshadi: darhol o'tadi, lekin qarz qoladi
+        await bucket.acquire(10)
+        self.assertLess(time.monotonic() - started, 0.01)
+        self.assertAlmostEqual(bucket.tokens, -8, delta=0.5)
+        await bucket.acquire()
+        # qarz (8) + bitta token = 9 / 100 sekund
+        self.assertGreaterEqual(time.monotonic() - started, 0.085)
+
+    async def test_pause_blocks_and_empties(self):
+        bucket = TokenBucket(rate=1000, capacity=5)
+        bucket.pause(0.1)
+        self.assertEqual(bucket.tokens, 0)
+        started = time.monotonic()
+        await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.095)
+
+    async def test_pause_never_shortens(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        bucket.pause(5)
+        until = bucket.paused_until
+        bucket.pause(0.1)
+        self.assertEqual(bucket.paused_until, until)
+
+    async def test_available(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        await bucket.acquire(2)
+        self.assertAlmostEqual(bucket.available(), 1, places=2)
+        bucket.pause(60)
+        self.assertEqual(bucket.available(), 0)
+
+    async def test_is_idle(self):
+        bucket = TokenBucket(rate=1000, capacity=1)
+        self.assertTrue(bucket.is_idle())
+        await bucket.acquire()
+        self.assertFalse(bucket.is_idle())
+        await asyncio.sleep(0.01)
+        self.assertTrue(bucket.is_idle())
+
+
+class SlidingWindowTest(unittest.IsolatedAsyncioTestCase):
+    async def sent_within(self, limiter: SlidingWindow, seconds: float) -> int:
+        sent = 0
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                await asyncio.wait_for(limiter.acquire(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                return sent
+            sent += 1
+
+    async def test_burst_does_not_add_to_refill(self):
+        # 5 ta / 0.1 s: TokenBucket(50, 5) 0.1 s da 5 + 5 ta o'tkazardi
+        limiter = SlidingWindow(rate=50, capacity=5)
+        self.assertEqual(limiter.available(), 5)
+        self.assertEqual(await self.sent_within(limiter, 0.09), 5)
+        self.assertEqual(limiter.available(), 0)
+        await asyncio.sleep(0.02)
+        self.assertEqual(limiter.available(), 5)
+        self.assertTrue(limiter.is_idle())
+
+    async def test_any_window_stays_within_rate(self):
+        limiter = SlidingWindow(rate=100, capacity=5)  # 5 ta / 0.05 s
+        stamps = []
+        for _ in range(20):
+            await limiter.acquire()
+            stamps.append(limiter.sent[-1])
+        for index, stamp in enumerate(stamps):
+            self.assertLessEqual(sum(1 for other in stamps[index:] if other - stamp < 0.05), 5)
+
+    async def test_album_larger_than_capacity_reserves_next_window(self):
+        limiter = SlidingWindow(rate=100, capacity=2)
+        await limiter.acquire(4)
+        started = time.monotonic()
+        await limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.035)
+
+
+class OutboundSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def scheduler(self) -> OutboundScheduler:
+        return OutboundScheduler(global_rate=30, chat_rate=1, chat_burst=5, group_rate=20 / 60, edit_interval=0.01)
+
+    async def test_buckets_are_per_bot(self):
+        outbound = self.scheduler()
+        first, second = _Bot(1), _Bot(2)
+        self.assertIsNot(outbound.global_bucket(first), outbound.global_bucket(second))
+        self.assertIs(outbound.global_bucket(first), outbound.global_bucket(_Bot(1)))
+        self.assertIsNot(outbound._chat_bucket(first, 5), outbound._chat_bucket(second, 5))
+
+    async def test_storage_chat_has_its_own_burst(self):
+        outbound = self.scheduler()
+        bot = _Bot()
+        outbound.add_storage_chats(bot, [-100])
+        self.assertEqual(outbound.available(bot, -100), 20)
+        self.assertEqual(outbound.available(bot, -200), 5)  # oddiy guruh
+        self.assertEqual(outbound.available(_Bot(2), -100), 5)  # boshqa botning kanali emas
+        for _ in range(20):
+            await outbound._chat_bucket(bot, -100).acquire()
+        self.assertLess(outbound.available(bot, -100), 1)
+
+    async def test_close_runs_delayed_deletes_now(self):
+        outbound = self.scheduler()
+        bot = _Bot()
+        outbound.delete_later_by_id(bot, 10, 20, delay=60)
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        await outbound.close(timeout=1)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(bot.deleted, [(10, 20)])
+        self.assertFalse(outbound._delete_tasks)
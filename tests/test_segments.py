@@ -0,0 +1,55 @@
+import unittest
+from datetime import date
+
+from src.db.segments import Segment
+
+
+class SegmentParseTest(unittest.TestCase):
+    def test_empty_means_everyone(self):
+        segment = Segment.parse("  ")
+        self.assertEqual(segment, Segment())
+        self.assertEqual(segment.describe(), "hamma")
+        self.assertEqual(segment.sql(3), ("", []))
+
+    def test_uzbek_and_english_keys(self):
+        expected = Segment(langs=("en", "ru"), active_days=30, joined_from=date(2024, 1, 1),
+                           joined_to=date(2024, 6, 30))
+        self.assertEqual(Segment.parse("til=RU,en, faol=30\ndan=2024-01-01 gacha=2024-06-30"), expected)
+        self.assertEqual(Segment.parse("lang=en,ru,ru active=30 from=2024-01-01 to=2024-06-30"), expected)
+
+    def test_invalid_input(self):
+        for text in ("til", "faol=0", "faol=abc", "dan=01.01.2024", "yosh=18", "til="):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                Segment.parse(text)
+
+    def test_json_round_trip(self):
+        segment = Segment.parse("til=uz faol=7 dan=2024-02-01")
+        self.assertEqual(Segment.from_json(segment.to_json()), segment)
+        self.assertEqual(Segment.from_json(None), Segment())
+
+    def test_describe(self):
+        self.assertEqual(Segment.parse("til=uz,ru gacha=2024-03-01").describe(),
+                         "til: ru, uz; ro'yxatdan o'tgan: … — 2024-03-01")
+
+
+class SegmentSqlTest(unittest.TestCase):
+    segment = Segment(langs=("ru", "uz"), active_days=14, joined_from=date(2024, 1, 1), joined_to=date(2024, 2, 1))
+
+    def test_postgres_params_numbered_from_first(self):
+        sql, args = self.segment.sql(4)
+        self.assertEqual(sql, " AND lang_code = ANY($4::varchar[])"
+                              " AND last_active_at >= now() - make_interval(days => $5)"
+                              " AND date >= $6::date"
+                              " AND date < $7::date + 1")
+        self.assertEqual(args, [["ru", "uz"], 14, date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_sqlite_dialect(self):
+        sql, args = self.segment.sql(2, "sqlite")
+        self.assertIn("lang_code IN (SELECT value FROM json_each($2))", sql)
+        self.assertIn("last_active_at >= datetime('now', '-' || $3 || ' days')", sql)
+        self.assertIn("date < date($5, '+1 day')", sql)
+        self.assertEqual(len(args), 4)
+
+    def test_only_set_filters(self):
+        sql, args = Segment(active_days=3).sql(1)
+        self.assertEqual((sql, args), (" AND last_active_at >= now() - make_interval(days => $1)", [3]))
@@ -0,0 +1,255 @@
+import json
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from src.db.database import database
+from src.db.init_db import create_all_base
+from src.db.repository import (AccountRepo, BroadcastDraftRepo, BroadcastJobRepo, CacheEventRepo, ChannelRepo,
+                               DownloadJobRepo, DownloadRepo, FsmRepo, StatsRepo)
+from src.db.segments import Segment
+
+TABLES = ("accounts", "stats_daily", "downloads", "broadcast_jobs", "broadcast_failures", "download_jobs",
+          "fsm_states", "cache_events", "broadcast_drafts", "mandatorys")
+
+
+class SQLiteRepoTestCase(unittest.IsolatedAsyncioTestCase):
+    """Repositories on the SQLite backend (tests/conftest.py points SQLITE_PATH at a temp file)."""
+
+    async def asyncSetUp(self):
+        await database.connect()
+        await create_all_base()
+        for table in TABLES:
+            await database.execute(f"DELETE FROM {table}")
+
+    async def asyncTearDown(self):
+        await database.close()
+
+
+class BroadcastDraftRepoTest(SQLiteRepoTestCase):
+    async def test_latest_draft_takes_the_batch(self):
+        first = await BroadcastDraftRepo.add("main", 1, 12)
+        last = await BroadcastDraftRepo.add("main", 1, 11)
+        await BroadcastDraftRepo.add("main", 2, 13)  # boshqa admin
+        await BroadcastDraftRepo.add("other", 1, 14)  # boshqa bot
+        # Yangiroq qism kelgan: birinchi handler hech narsa olmaydi
+        self.assertEqual(await BroadcastDraftRepo.take_if_latest("main", 1, first, 60), [])
+        self.assertEqual(await BroadcastDraftRepo.take_if_latest("main", 1, last, 60), [11, 12])
+        self.assertEqual(await BroadcastDraftRepo.take_if_latest("main", 1, last, 60), [])
+
+    async def test_stale_drafts_are_dropped(self):
+        await database.execute(
+            "INSERT INTO broadcast_drafts (tenant, chat_id, message_id, created_at) "
+            "VALUES ('main', 1, 5, datetime('now', '-1 hour'))")
+        draft_id = await BroadcastDraftRepo.add("main", 1, 6)
+        self.assertEqual(await BroadcastDraftRepo.take_if_latest("main", 1, draft_id, 60), [6])
+        self.assertEqual(await database.fetchval("SELECT count(*) FROM broadcast_drafts"), 0)
+
+
+class ChannelRepoTest(SQLiteRepoTestCase):
+    async def test_first_invite_link_wins(self):
+        await ChannelRepo.add("main", -100, "")
+        self.assertEqual(await ChannelRepo.set_invite_link("main", -100, "https://t.me/+a"), "https://t.me/+a")
+        # Ikkinchi node ning havolasi yozilmaydi, saqlangani qaytadi
+        self.assertEqual(await ChannelRepo.set_invite_link("main", -100, "https://t.me/+b"), "https://t.me/+a")
+        self.assertEqual(await ChannelRepo.all("main"), [(-100, "https://t.me/+a")])
+
+    async def test_admin_link_takes_precedence(self):
+        await ChannelRepo.add("main", -100, "https://t.me/channel")
+        await ChannelRepo.add("other", -100, "")
+        self.assertEqual(await ChannelRepo.all("main"), [(-100, "https://t.me/channel")])
+        self.assertEqual(await ChannelRepo.all("other"), [(-100, None)])
+
+
+class AccountRepoTest(SQLiteRepoTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await AccountRepo.register_many([
+            ("main", 10, "uz", date(2024, 1, 1)),
+            ("main", 20, "ru", date(2024, 3, 1)),
+            ("main", 30, "en", date(2024, 6, 30)),
+            ("other", 10, "uz", date(2024, 1, 1)),
+        ])
+
+    async def test_register_skips_known_users_and_counts_signups(self):
+        await AccountRepo.register_many([("main", 10, "uz", date(2024, 1, 1)), ("main", 40, None, date(2024, 1, 1))])
+        self.assertEqual(await AccountRepo.user_ids_after("main", 0, 10), [10, 20, 30, 40])
+        self.assertEqual(await AccountRepo.user_ids_after("main", 20, 1), [30])
+        rows = await StatsRepo.rollup("main", date(2024, 1, 1))
+        self.assertIn((date(2024, 1, 1), "uz", 2, 0), rows)  # 40: til noma'lum -> 'uz'
+        self.assertEqual(sum(row[2] for row in rows), 4)
+
+    async def test_blocked_users_are_unreachable(self):
+        await AccountRepo.set_blocked([("main", 20, True), ("other", 10, True)])
+        self.assertEqual(await AccountRepo.blocked_user_ids_after("main", 0, 10), [20])
+        self.assertEqual(await AccountRepo.count_reachable("main"), 2)
+        await AccountRepo.set_blocked([("main", 20, False)])
+        self.assertEqual(await AccountRepo.count_reachable("main"), 3)
+
+    async def test_segments(self):
+        self.assertEqual(await AccountRepo.count_reachable("main", Segment(langs=("ru", "en"))), 2)
+        self.assertEqual(await AccountRepo.count_reachable("main", Segment.parse("dan=2024-03-01 gacha=2024-06-30")), 2)
+        self.assertEqual(await AccountRepo.count_reachable("main", Segment(active_days=1)), 3)
+        await database.execute("UPDATE accounts SET last_active_at = datetime('now', '-10 days') WHERE user_id = 30")
+        self.assertEqual(await AccountRepo.count_reachable("main", Segment(active_days=7)), 2)
+        await AccountRepo.touch_many([("main", 30)])
+        self.assertEqual(await AccountRepo.count_reachable("main", Segment(active_days=7)), 3)
+
+    async def test_sample(self):
+        sample = await AccountRepo.sample_user_ids("main", Segment(langs=("uz", "ru")), 5, 2)
+        self.assertEqual(sorted(sample), [10, 20])
+
+    async def test_stream_accounts(self):
+        rows = [row async for row in AccountRepo.stream_accounts("main", batch_size=2)]
+        self.assertEqual([user_id for _, user_id in rows], [10, 20, 30])
+        ids = [account_id for account_id, _ in rows]
+        # Watermarkdan keyingi, oldinda tugaganlari tashlab
+        resumed = [row async for row in AccountRepo.stream_accounts("main", after_id=ids[0], skip_ids=[ids[2]])]
+        self.assertEqual(resumed, [rows[1]])
+        filtered = [row async for row in AccountRepo.stream_accounts("main", segment=Segment(langs=("en",)))]
+        self.assertEqual(filtered, [rows[2]])
+
+
+class DownloadRepoTest(SQLiteRepoTestCase):
+    async def test_upsert_per_tenant(self):
+        await AccountRepo.register_many([("main", 10, "ru", date(2024, 1, 1))])
+        now = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+        await DownloadRepo.upsert("main", 10, "u1", "a", '["f1"]', '["photo"]', now, now.date())
+        await DownloadRepo.upsert("main", 10, "u1", "b", '["f2"]', '["video"]', now, now.date())
+        await DownloadRepo.upsert("other", 10, "u1", "c", '["f3"]', '["photo"]', now, now.date())
+        row = await DownloadRepo.get("main", "u1")
+        self.assertEqual((row["file_id"], row["title"]), ('["f2"]', "b"))
+        self.assertEqual(await DownloadRepo.count_by_user("main", 10), 1)
+        self.assertEqual(await DownloadRepo.count_all("other"), 1)
+        self.assertIn((date(2024, 5, 1), "ru", 0, 2), await StatsRepo.rollup("main", date(2024, 5, 1)))
+        await DownloadRepo.delete("main", "u1")
+        self.assertIsNone(await DownloadRepo.get("main", "u1"))
+
+
+class StatsRepoTest(SQLiteRepoTestCase):
+    async def test_older_days_are_folded(self):
+        await AccountRepo.register_many([
+            ("main", 1, "uz", date(2024, 1, 1)), ("main", 2, "uz", date(2024, 1, 2)), ("main", 3, "uz", date(2024, 2, 1)),
+        ])
+        self.assertEqual(sorted(await StatsRepo.rollup("main", date(2024, 2, 1)), key=lambda row: row[0] or date.min),
+                         [(None, "uz", 2, 0), (date(2024, 2, 1), "uz", 1, 0)])
+
+
+class BroadcastJobRepoTest(SQLiteRepoTestCase):
+    async def create(self, tenant="main", scheduled_at=None) -> int:
+        scheduled_at = scheduled_at or datetime.now(timezone.utc) - timedelta(seconds=5)
+        return await BroadcastJobRepo.create(tenant, "copy", 1, [5, 6], Segment(langs=("uz",)), scheduled_at,
+                                             1, 100, 1, 7)
+
+    async def test_claim_due_job_of_own_tenants(self):
+        await self.create(scheduled_at=datetime.now(timezone.utc) + timedelta(hours=1))
+        await self.create(tenant="other")
+        job_id = await self.create()
+        self.assertIsNone(await BroadcastJobRepo.claim_next(60, ["third"]))
+        job = await BroadcastJobRepo.claim_next(60, ["main"])
+        self.assertEqual((job["id"], job["status"]), (job_id, "running"))
+        self.assertEqual(job["message_ids"], [5, 6])
+        self.assertEqual(Segment.from_json(job["segment"]), Segment(langs=("uz",)))
+        self.assertIsNone(await BroadcastJobRepo.claim_next(60, ["main"]))
+
+    async def test_expired_lease_is_reclaimed(self):
+        job_id = await self.create()
+        await BroadcastJobRepo.claim_next(60, ["main"])
+        await database.execute("UPDATE broadcast_jobs SET lease_until = datetime('now', '-1 seconds')")
+        self.assertEqual((await BroadcastJobRepo.claim_next(60, ["main"]))["id"], job_id)
+
+    async def test_checkpoint(self):
+        job_id = await self.create()
+        await BroadcastJobRepo.claim_next(60, ["main"])
+        status = await BroadcastJobRepo.checkpoint(job_id, 3, 2, 40, [60], [(41, 410, "Forbidden"), (50, 500, "x")], 60)
+        self.assertEqual(status, "running")
+        # Qayta yozilgan xato ikki marta sanalmaydi, watermark orqaga qaytmaydi
+        await BroadcastJobRepo.checkpoint(job_id, 0, 0, 30, [], [(41, 410, "Forbidden")], 60)
+        job = await BroadcastJobRepo.get(job_id)
+        self.assertEqual((job["sent"], job["failed"], job["last_account_id"]), (3, 2, 40))
+        self.assertEqual(await BroadcastJobRepo.failed_user_ids(job_id, 0, 10), [(41, 410), (50, 500)])
+        self.assertEqual(await BroadcastJobRepo.failed_user_ids(job_id, 41, 10), [(50, 500)])
+
+    async def test_pause_resume_cancel(self):
+        job_id = await self.create()
+        await BroadcastJobRepo.claim_next(60, ["main"])
+        self.assertTrue(await BroadcastJobRepo.pause(job_id))
+        self.assertEqual(await BroadcastJobRepo.checkpoint(job_id, 1, 0, 1, [], [], 60), "paused")
+        self.assertIsNone((await BroadcastJobRepo.get(job_id))["lease_until"])
+        await BroadcastJobRepo.finish(job_id, "done")  # pauza ustun
+        self.assertEqual((await BroadcastJobRepo.get(job_id))["status"], "paused")
+        self.assertTrue(await BroadcastJobRepo.resume(job_id))
+        self.assertFalse(await BroadcastJobRepo.resume(job_id))
+        self.assertTrue(await BroadcastJobRepo.cancel(job_id))
+        self.assertFalse(await BroadcastJobRepo.cancel(job_id))
+        self.assertEqual([job["id"] for job in await BroadcastJobRepo.recent("main")], [job_id])
+
+
+class FsmRepoTest(SQLiteRepoTestCase):
+    async def test_state_and_data(self):
+        await FsmRepo.set_state("k", "MsgState:send_msg", 60)
+        await FsmRepo.set_data("k", '{"kind": "copy"}', 60)
+        state, data = await FsmRepo.get("k")
+        self.assertEqual((state, json.loads(data)), ("MsgState:send_msg", {"kind": "copy"}))
+
+    async def test_expired_rows_are_invisible_and_purged(self):
+        await FsmRepo.set_state("k", "s", 60)
+        await FsmRepo.set_data("k", '{"a": 1}', 60)
+        await database.execute("UPDATE fsm_states SET expires_at = datetime('now', '-1 seconds')")
+        self.assertIsNone(await FsmRepo.get("k"))
+        # Muddati o'tgan qatorning eski ma'lumoti yangi holat bilan tirilmaydi
+        await FsmRepo.set_state("k", "t", 60)
+        state, data = await FsmRepo.get("k")
+        self.assertEqual((state, json.loads(data)), ("t", {}))
+        await FsmRepo.set_state("k", None, 60)
+        await FsmRepo.set_state("gone", "s", 60)
+        await database.execute("UPDATE fsm_states SET expires_at = datetime('now', '-1 seconds') WHERE key = 'gone'")
+        self.assertEqual(await FsmRepo.purge(), 2)
+
+
+class DownloadJobRepoTest(SQLiteRepoTestCase):
+    async def test_claim_heartbeat_finish(self):
+        await DownloadJobRepo.enqueue("other", 1, 1, "u0", 9)
+        job_id = await DownloadJobRepo.enqueue("main", 1, 1, "u1", 9)
+        job = await DownloadJobRepo.claim("w1", 60, ["main"])
+        self.assertEqual((job["id"], job["worker"], job["attempts"]), (job_id, "w1", 1))
+        self.assertIsNone(await DownloadJobRepo.claim("w2", 60, ["main"]))
+        self.assertTrue(await DownloadJobRepo.heartbeat(job_id, "w1", 60))
+        self.assertFalse(await DownloadJobRepo.heartbeat(job_id, "w2", 60))
+
+        # w1 to'xtab qoldi: w2 oladi, w1 endi yakunlay olmaydi
+        await database.execute("UPDATE download_jobs SET lease_until = datetime('now', '-1 seconds')")
+        job = await DownloadJobRepo.claim("w2", 60, ["main"])
+        self.assertEqual((job["worker"], job["attempts"]), ("w2", 2))
+        self.assertFalse(await DownloadJobRepo.heartbeat(job_id, "w1", 60))
+        await DownloadJobRepo.finish(job_id, "w1", "failed", "x")
+        await DownloadJobRepo.finish(job_id, "w2", "done")
+        job = await database.fetchrow("SELECT status, error FROM download_jobs WHERE id = $1", job_id)
+        self.assertEqual((job["status"], job["error"]), ("done", None))
+
+        await database.execute("UPDATE download_jobs SET finished_at = datetime('now', '-2 hours')")
+        self.assertEqual(await DownloadJobRepo.purge_finished(3600), 1)
+
+
+class CacheEventRepoTest(SQLiteRepoTestCase):
+    async def test_log(self):
+        self.assertEqual(await CacheEventRepo.latest(), 0)
+        first = await CacheEventRepo.publish("channels", "main", "node-a")
+        second = await CacheEventRepo.publish("downloads", None, "node-b")
+        self.assertEqual(await CacheEventRepo.latest(), second)
+        self.assertEqual(await CacheEventRepo.oldest(), first)
+        events = await CacheEventRepo.after(first, 10)
+        self.assertEqual([(e["version"], e["topic"], e["key"], e["origin"]) for e in events],
+                         [(second, "downloads", None, "node-b")])
+        await database.execute("UPDATE cache_events SET created_at = datetime('now', '-2 hours')")
+        self.assertEqual(await CacheEventRepo.purge(3600), 2)
+        self.assertIsNone(await CacheEventRepo.oldest())
+
+    async def test_released_job_waits_for_its_delay(self):
+        job_id = await DownloadJobRepo.enqueue("main", 1, 1, "u1", 9)
+        await DownloadJobRepo.claim("w1", 60, ["main"])
+        self.assertFalse(await DownloadJobRepo.release(job_id, "w2", "x", 0))
+        self.assertTrue(await DownloadJobRepo.release(job_id, "w1", "rate limit", 30))
+        self.assertIsNone(await DownloadJobRepo.claim("w2", 60, ["main"]))
+        await database.execute("UPDATE download_jobs SET lease_until = datetime('now', '-1 seconds')")
+        job = await DownloadJobRepo.claim("w2", 60, ["main"])
+        self.assertEqual((job["worker"], job["attempts"], job["error"]), ("w2", 2, "rate limit"))
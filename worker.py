@@ -0,0 +1,52 @@
+"""
+Download worker: takes jobs from public.download_jobs and sends the results to users.
+
+    python worker.py
+
+Runs next to the bot (DOWNLOAD_IN_BOT=0 there) on as many nodes as needed;
+every node only needs the same .env (database + BOT_TOKEN or TENANTS_FILE)
+and takes the jobs of the tenant bots configured there. Parallel downloads
+per process: DOWNLOAD_CONCURRENCY.
+
+Every node sends with the bot tokens too, so DOWNLOAD_NODES (the total number
+of worker.py processes) must be set on all nodes and the bot: each process
+then keeps to its share of TG_GLOBAL_RATE (config.SENDING_PROCESSES).
+"""
+import asyncio
+import logging
+import signal
+
+from config import DOWNLOAD_CONCURRENCY, DOWNLOAD_NODES
+from src.db.database import database
+from src.db.init_db import create_all_base
+from src.utils.download_jobs import download_worker
+from src.utils.outbound import outbound
+from src.utils.tenants import tenants
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    if not DOWNLOAD_NODES:
+        logging.warning("DOWNLOAD_NODES=0: this node does not count against TG_GLOBAL_RATE, set it on every node")
+    for bot in tenants.bots():
+        bot.session.middleware(outbound)
+
+    await database.connect()
+    await create_all_base()
+    await download_worker.start(DOWNLOAD_CONCURRENCY)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logging.info("Stopping download worker")
+    await download_worker.stop()
+    await outbound.close()
+    await tenants.close()
+    await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())